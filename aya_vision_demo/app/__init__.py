@@ -23,13 +23,35 @@ def create_app(config_name=None):
     
     # Configure logging
     log_level = getattr(logging, app.config['LOG_LEVEL'])
-    logging.basicConfig(level=log_level)
+    logging.basicConfig(level=log_level, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     app.logger.setLevel(log_level)
     
     # Check for required configuration
     if not app.config.get('COHERE_API_KEY'):
         app.logger.warning("COHERE_API_KEY is not set. API calls will fail.")
     
+    # Apply the thumbnail encoding settings
+    from app import thumbnails
+    thumbnails.init_app(app)
+    
+    # Fingerprint static asset URLs and compress responses
+    from app import assets, compression
+    assets.init_app(app)
+    compression.init_app(app)
+    
+    # Trace jobs stage by stage
+    from app import tracing
+    tracing.init_app(app)
+    
+    # Profile requests and jobs when asked to
+    from app import profiling
+    profiling.init_app(app)
+    
+    # Share the model-call workers fairly across sessions, and bound the batches running and queued at once
+    from app import admission, scheduler
+    scheduler.init_app(app)
+    admission.init_app(app)
+    
     # Register custom Jinja2 filters
     register_jinja_filters(app)
     
@@ -62,6 +84,12 @@ def register_jinja_filters(app):
         text = markupsafe.escape(text)
         result = text.replace('\n', markupsafe.Markup('<br>\n'))
         return markupsafe.Markup(result)
+    
+    @app.template_filter('timestamp')
+    def timestamp_filter(seconds):
+        """Format seconds into a video as HH:MM:SS.mmm."""
+        from app.video import format_timestamp
+        return format_timestamp(seconds)
 
 def register_error_handlers(app):
     """Register error handlers for the application."""
@@ -0,0 +1,264 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+from app.profiling import profiler
+from app.progress import progress_snapshot
+from app.scheduler import DEFAULT_FLOW, FairScheduler
+from app.tracing import tracer
+from app.usage import usage_scope
+
+class Overloaded(Exception):
+    """Raised when a submission is refused because the server is at capacity."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _Job:
+    """A submitted batch: its progress entry, size, flow and the function that runs it."""
+
+    def __init__(self, job_id: str, progress: Dict[str, Any], image_count: int,
+                 target: Callable[..., None], args: Tuple, flow: Hashable = DEFAULT_FLOW):
+        self.job_id = job_id
+        self.progress = progress
+        self.image_count = image_count
+        self.target = target
+        self.args = args
+        self.flow = flow
+        self.submitted_ns = time.time_ns()
+        # Jobs submitted by a profiled request are profiled too
+        self.profiled = profiler.job_requested()
+
+class AdmissionController:
+    """
+    Bounds the work the app takes on at once.
+
+    At most max_running_jobs batches run at a time, which bounds the model calls
+    in flight to that many times the workers per batch. Further batches wait in a
+    queue, with their position shown in their progress entry as 'queue_position',
+    and start as running batches finish: first the batches of the flows (clients)
+    with the fewest batches running, then of the flow that started one longest
+    ago, and within a flow in order of submission. Submissions are
+    refused with Overloaded once the images of all admitted batches, running or
+    queued, would exceed max_pending_images; a single batch is always admitted
+    when nothing else is. The check and the charge are made under one lock, so
+    concurrent submissions cannot overshoot the limit together.
+
+    A batch runs inside its flow of the scheduler, so its model calls are
+    interleaved fairly with those of other clients' batches, inside a usage
+    scope that charges them to the batch's job ID and the client, and as the
+    root span of the job's trace, after a span for the time it spent queued.
+    A batch submitted by a profiled request is profiled as a whole.
+    """
+
+    def __init__(self, max_running_jobs: int = 4, max_pending_images: int = 1000, retry_after: int = 10,
+                 scheduler: Optional[FairScheduler] = None):
+        self.max_running_jobs = max_running_jobs
+        self.max_pending_images = max_pending_images
+        self.retry_after = retry_after
+        self.scheduler = scheduler or FairScheduler()
+        self._lock = threading.Lock()
+        self.running: Dict[str, _Job] = {}
+        self.queue: deque = deque()
+        self.pending_images = 0
+        self._counts = {'admitted': 0, 'queued': 0, 'rejected': 0}
+        self._starts = 0
+        self._last_started: Dict[Hashable, int] = {}
+
+    def _retry_after(self) -> int:
+        """Seconds until capacity is likely to free up: the shortest ETA of a running batch."""
+        etas = [progress_snapshot(job.progress).get('eta_seconds') for job in self.running.values()]
+        etas = [eta for eta in etas if eta is not None]
+        if not etas:
+            return self.retry_after
+        return max(1, min(int(min(etas)) + 1, 300))
+
+    def _drop_cancelled(self):
+        """Forget queued batches that were cancelled before they started."""
+        for job in [job for job in self.queue if job.progress.get('status') == 'cancelled']:
+            self.queue.remove(job)
+            self.pending_images -= job.image_count
+
+    def _queue_order(self):
+        """The queued batches in the order they will start; the caller holds the lock."""
+        running = {}
+        for job in self.running.values():
+            running[job.flow] = running.get(job.flow, 0) + 1
+        last_started = dict(self._last_started)
+        starts = self._starts
+        waiting = list(self.queue)
+        order = []
+        while waiting:
+            # min keeps submission order within a flow
+            job = min(waiting, key=lambda queued: (running.get(queued.flow, 0), last_started.get(queued.flow, -1)))
+            waiting.remove(job)
+            running[job.flow] = running.get(job.flow, 0) + 1
+            starts += 1
+            last_started[job.flow] = starts
+            order.append(job)
+        return order
+
+    def _renumber(self):
+        for position, job in enumerate(self._queue_order(), 1):
+            job.progress['queue_position'] = position
+
+    def _admit(self, image_count: int, sync: bool = False):
+        """
+        Check that a batch can be taken on; the caller holds the lock and charges it.
+
+        Args:
+            image_count: Images in the batch
+            sync: The batch would run inside the request, so it needs a free
+                running slot rather than a place in the queue
+
+        Raises:
+            Overloaded: If the batch must be refused
+        """
+        self._drop_cancelled()
+        busy = bool(self.running or self.queue)
+        if sync and len(self.running) >= self.max_running_jobs:
+            reason = 'All analysis slots are busy'
+        elif busy and self.pending_images + image_count > self.max_pending_images:
+            reason = f'Too many images are waiting to be analyzed ({self.pending_images})'
+        else:
+            return
+        self._counts['rejected'] += 1
+        raise Overloaded(f'{reason}; please try again shortly', self._retry_after())
+
+    def submit(self, job_id: str, progress: Dict[str, Any], image_count: int,
+               target: Callable[..., None], args: Tuple = (), flow: Hashable = DEFAULT_FLOW):
+        """
+        Run a batch in a background thread now, or queue it until a slot frees up.
+
+        Args:
+            job_id: The batch's job or progress ID
+            progress: Its progress entry; set to 'queued' while it waits
+            image_count: Images in the batch, at most; see resize()
+            target: Runs the batch, e.g. process_image_batch_background
+            args: Arguments for target
+            flow: The client the batch belongs to, e.g. its session
+
+        Raises:
+            Overloaded: If the batch is refused; nothing is charged for it
+        """
+        job = _Job(job_id, progress, image_count, target, args, flow)
+        with self._lock:
+            self._admit(image_count)
+            self.pending_images += image_count
+            self._counts['admitted'] += 1
+            if len(self.running) < self.max_running_jobs:
+                self._start(job)
+            else:
+                self._counts['queued'] += 1
+                progress.set_status('queued')
+                self.queue.append(job)
+                self._renumber()
+
+    def resize(self, job_id: str, image_count: int):
+        """
+        Charge a running batch for its actual size once known, e.g. after its videos were sampled.
+
+        Args:
+            job_id: The batch's job or progress ID
+            image_count: Images the batch analyzes
+        """
+        with self._lock:
+            job = self.running.get(job_id)
+            if job is not None:
+                self.pending_images += image_count - job.image_count
+                job.image_count = image_count
+
+    def _start(self, job: _Job):
+        """Start a batch; the caller holds the lock."""
+        job.progress.pop('queue_position', None)
+        self.running[job.job_id] = job
+        self._starts += 1
+        self._last_started[job.flow] = self._starts
+        thread = threading.Thread(target=self._run, args=(job,), name=f'batch-{job.job_id[:8]}')
+        thread.daemon = True  # Daemonize thread to avoid blocking app shutdown
+        thread.start()
+
+    def _run(self, job: _Job):
+        try:
+            profile = profiler.profile('job', f'{job.target.__name__}-{job.job_id[:8]}') if job.profiled else nullcontext()
+            with profile, tracer.trace(job.job_id, job.target.__name__, images=job.image_count, client=job.flow):
+                tracer.record('admission.queued', job.submitted_ns)
+                with self.scheduler.flow(job.flow), usage_scope(job.job_id, job.flow):
+                    job.target(*job.args)
+        finally:
+            self._finished(job)
+
+    def _finished(self, job: _Job):
+        with self._lock:
+            self.running.pop(job.job_id, None)
+            self.pending_images -= job.image_count
+            self._drop_cancelled()
+            while self.queue and len(self.running) < self.max_running_jobs:
+                queued = self._queue_order()[0]
+                self.queue.remove(queued)
+                self._start(queued)
+            # Only flows with batches running or queued need their turn remembered
+            active = {waiting.flow for waiting in self.queue} | {running.flow for running in self.running.values()}
+            self._last_started = {flow: start for flow, start in self._last_started.items() if flow in active}
+            self._renumber()
+
+    @contextmanager
+    def reserve(self, job_id: str, image_count: int, flow: Hashable = DEFAULT_FLOW) -> Iterator[None]:
+        """
+        Hold a running slot for work done inside a request, in the client's flow.
+
+        Args:
+            job_id: Identifies the work, e.g. a request ID
+            image_count: Images analyzed
+            flow: The client the work belongs to
+
+        Raises:
+            Overloaded: If no slot is free
+        """
+        job = _Job(job_id, {}, image_count, lambda: None, (), flow)
+        with self._lock:
+            self._admit(image_count, sync=True)
+            self.running[job_id] = job
+            self.pending_images += image_count
+            self._counts['admitted'] += 1
+        try:
+            with tracer.trace(job_id, 'request', images=image_count, client=flow), \
+                    self.scheduler.flow(flow), usage_scope(job_id, flow):
+                yield
+        finally:
+            self._finished(job)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the admission counters.
+
+        Returns:
+            Dict[str, int]: Batches 'running' and 'waiting' now, 'pending_images',
+            and the running totals of batches 'admitted', 'queued' and 'rejected'
+        """
+        with self._lock:
+            return {
+                'running': len(self.running),
+                'waiting': len(self.queue),
+                'pending_images': self.pending_images,
+                **self._counts
+            }
+
+def init_app(app):
+    """
+    Create the app's admission controller from its ADMISSION_* settings.
+
+    Batches run in the flows of the app's model-call scheduler, so scheduler.init_app
+    must have been called first.
+
+    Args:
+        app: The Flask application
+    """
+    app.extensions['admission'] = AdmissionController(
+        max_running_jobs=app.config.get('ADMISSION_MAX_RUNNING_JOBS', 4),
+        max_pending_images=app.config.get('ADMISSION_MAX_PENDING_IMAGES', 1000),
+        retry_after=app.config.get('ADMISSION_RETRY_AFTER', 10),
+        scheduler=app.extensions['scheduler']
+    )
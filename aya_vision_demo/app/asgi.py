@@ -0,0 +1,235 @@
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from werkzeug.exceptions import HTTPException
+from app.progress import FINISHED_STATUSES, progress_snapshot
+
+# Endpoints whose views only read the in-memory progress stores. They can be
+# long-polled with ?wait=<seconds>, waiting on the event loop rather than in a
+# worker thread; the value names the progress store the endpoint reads.
+PROGRESS_ENDPOINTS = {
+    'main.get_analysis_progress': 'analysis_progress',
+    'main.api_job_status': 'analysis_progress',
+    'main.get_enhanced_analysis_progress': 'enhanced_analysis_progress'
+}
+STREAM_ENDPOINT = 'main.stream_enhanced_analysis'
+
+def progress_version(progress_data: Optional[Dict[str, Any]]) -> Tuple:
+    """The fields of a progress entry whose change ends a long poll."""
+    if not progress_data:
+        return (None,)
+    progress_data = progress_snapshot(progress_data)
+    return (
+        progress_data.get('status'),
+        progress_data.get('completed'),
+        progress_data.get('percent'),
+        progress_data.get('current_file'),
+        progress_data.get('queue_position')
+    )
+
+def wsgi_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """
+    Build the WSGI environ for an ASGI HTTP request.
+
+    Args:
+        scope: The ASGI connection scope
+        body: The complete request body
+
+    Returns:
+        Dict[str, Any]: The WSGI environ
+    """
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'CONTENT_LENGTH': str(len(body))
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+class AsgiApp:
+    """
+    ASGI application serving a Flask app, with its progress endpoints handled asynchronously.
+
+    Progress, job status and enhanced analysis event stream requests are routed with
+    the Flask app's own URL map. A status poll with ?wait first waits on the event
+    loop for the progress to change; the event stream is produced by an async loop
+    around the blueprint's enhanced_stream_events. Either way an idle watcher holds
+    a coroutine rather than a thread. The Flask app itself, with its logging and
+    request hooks, always runs on a thread pool, as under a WSGI server, so a burst
+    of polls cannot stall the event loop.
+    """
+
+    def __init__(self, flask_app, threads: int = 16, max_wait: float = 30.0):
+        self.flask_app = flask_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-wsgi')
+        self.max_wait = max_wait
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[[], Awaitable], send: Callable[[Dict], Awaitable]):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        endpoint, view_args = self._match(scope)
+        if endpoint == STREAM_ENDPOINT:
+            await self._stream(view_args['progress_id'], scope, receive, send)
+        else:
+            if endpoint in PROGRESS_ENDPOINTS:
+                await self._long_poll(endpoint, view_args, scope)
+            await self._call_wsgi(scope, receive, send)
+
+    def _match(self, scope: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, Any]]:
+        if scope['method'] != 'GET':
+            return None, {}
+        adapter = self.flask_app.url_map.bind('localhost', script_name=scope.get('root_path') or None)
+        try:
+            return adapter.match(scope['path'], method='GET')
+        except HTTPException:
+            return None, {}
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _long_poll(self, endpoint: str, view_args: Dict[str, Any], scope: Dict[str, Any]):
+        """Wait, up to the 'wait' query parameter in seconds, for a progress entry to change."""
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        try:
+            wait = min(float(query.get('wait', ['0'])[0]), self.max_wait)
+        except ValueError:
+            wait = 0
+        if wait <= 0:
+            return
+
+        from app import routes
+        store = getattr(routes, PROGRESS_ENDPOINTS[endpoint])
+        key = view_args.get('progress_id') or view_args.get('job_id')
+        initial = progress_version(store.get(key))
+        if initial == (None,) or initial[0] in FINISHED_STATUSES:
+            return
+
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(routes.STREAM_POLL_INTERVAL)
+            if progress_version(store.get(key)) != initial:
+                return
+
+    async def _stream(self, progress_id: str, scope: Dict[str, Any], receive, send):
+        from app import routes
+        if 'partials' not in routes.enhanced_analysis_progress.get(progress_id, {}):
+            # Let the blueprint produce its usual 404
+            await self._call_wsgi(scope, receive, send)
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache, no-store, must-revalidate'),
+                (b'x-accel-buffering', b'no')
+            ]
+        })
+        disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        try:
+            sent = {}
+            while not disconnected.done():
+                events, finished = routes.enhanced_stream_events(progress_id, sent)
+                if events:
+                    await send({'type': 'http.response.body', 'body': ''.join(events).encode('utf-8'), 'more_body': True})
+                if finished:
+                    break
+                await asyncio.sleep(routes.STREAM_POLL_INTERVAL)
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+
+    @staticmethod
+    async def _wait_for_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        return b''.join(chunks)
+
+    async def _call_wsgi(self, scope: Dict[str, Any], receive, send):
+        """
+        Run the Flask app for one request on the thread pool and send its response.
+
+        Args:
+            scope: The ASGI connection scope
+            receive: The ASGI receive callable
+            send: The ASGI send callable
+        """
+        loop = asyncio.get_running_loop()
+        environ = wsgi_environ(scope, await self._read_body(receive))
+        started: Dict[str, Any] = {}
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+        async def run(function, *args):
+            return await loop.run_in_executor(self.executor, function, *args)
+
+        iterable = await run(self.flask_app, environ, start_response)
+        iterator = iter(iterable)
+        response_started = False
+        try:
+            while True:
+                chunk = await run(next, iterator, None)
+                if chunk is None:
+                    break
+                if not response_started:
+                    await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+                    response_started = True
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not response_started:
+                await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(iterable, 'close'):
+                await run(iterable.close)
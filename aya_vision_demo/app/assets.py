@@ -0,0 +1,92 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from flask import current_app, request, url_for
+
+# Query parameter carrying the content hash of a fingerprinted static URL
+FINGERPRINT_PARAM = 'v'
+
+class AssetFingerprints:
+    """
+    Content hashes of the files under a static folder, computed on first use.
+
+    Hashes are keyed by file path and invalidated when the file's modification time
+    or size changes, so an edited asset gets a new URL without a restart.
+    """
+
+    def __init__(self, static_folder: str):
+        self.static_folder = static_folder
+        self._hashes: Dict[str, Tuple[Tuple[float, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def fingerprint(self, filename: str) -> Optional[str]:
+        """
+        Return a short content hash of a static file.
+
+        Args:
+            filename: Path of the file relative to the static folder
+
+        Returns:
+            Optional[str]: The first 12 hex digits of its SHA-256, or None if it does not exist
+        """
+        path = os.path.join(self.static_folder, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        version = (stat.st_mtime, stat.st_size)
+
+        with self._lock:
+            cached = self._hashes.get(filename)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(65536), b''):
+                digest.update(block)
+        value = digest.hexdigest()[:12]
+        with self._lock:
+            self._hashes[filename] = (version, value)
+        return value
+
+def static_url(filename: str) -> str:
+    """
+    Build the URL of a static file, fingerprinted with its content hash.
+
+    Fingerprinted URLs change whenever the file does, so they are served with a
+    year-long immutable Cache-Control and browsers never revalidate them.
+
+    Args:
+        filename: Path of the file relative to the static folder
+
+    Returns:
+        str: The URL
+    """
+    fingerprint = current_app.extensions['asset_fingerprints'].fingerprint(filename)
+    if fingerprint is None:
+        return url_for('static', filename=filename)
+    return url_for('static', filename=filename, **{FINGERPRINT_PARAM: fingerprint})
+
+def init_app(app):
+    """
+    Register the static_url template helper and long-lived caching of fingerprinted assets.
+
+    Args:
+        app: The Flask application
+    """
+    fingerprints = AssetFingerprints(app.static_folder)
+    app.extensions['asset_fingerprints'] = fingerprints
+    app.add_template_global(static_url)
+    max_age = app.config.get('STATIC_MAX_AGE', 365 * 24 * 3600)
+
+    @app.after_request
+    def cache_fingerprinted_assets(response):
+        if request.endpoint != 'static' or response.status_code not in (200, 304):
+            return response
+        requested = request.args.get(FINGERPRINT_PARAM)
+        # Only the current fingerprint is immutable; a stale one is served normally
+        if requested and requested == fingerprints.fingerprint(request.view_args['filename']):
+            response.headers['Cache-Control'] = f'public, max-age={max_age}, immutable'
+        return response
@@ -0,0 +1,324 @@
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app.export import CSV_COLUMNS, export_row
+from app.utils import is_valid_file_extension, process_enhanced_analysis, process_image_batch
+
+# Columns written by the runner: the export columns plus the source path
+RUN_COLUMNS = ['path'] + CSV_COLUMNS
+
+def iter_input_paths(source: str, extensions: List[str]) -> Iterator[str]:
+    """
+    Yield image paths from a directory tree or a manifest file, lazily.
+
+    A manifest lists one path per line; relative paths are resolved against the
+    manifest's directory, and blank lines and lines starting with '#' are skipped.
+
+    Args:
+        source: A directory or a manifest file
+        extensions: Allowed image file extensions
+
+    Yields:
+        str: Absolute image paths, in a stable order
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if is_valid_file_extension(name, extensions):
+                    yield os.path.abspath(os.path.join(root, name))
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8') as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if is_valid_file_extension(line, extensions):
+                yield os.path.abspath(os.path.join(base, line))
+
+class JsonlResultWriter:
+    """
+    Appends result rows to a JSON Lines file, one flush per write.
+
+    A path written again, e.g. when a failed image is retried, supersedes its
+    earlier row: the last row of a path is the one that counts, and close()
+    rewrites the file with only that row per path.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._repair_tail()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _repair_tail(self):
+        """Drop a partially written last line left behind by an interrupted run."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as output:
+            data = output.read()
+            if data and not data.endswith(b'\n'):
+                output.truncate(data.rfind(b'\n') + 1)
+
+    def _rows(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield the (line number, row) of each readable row in the file."""
+        with open(self.path, 'r', encoding='utf-8') as output:
+            for number, line in enumerate(output):
+                try:
+                    yield number, json.loads(line)
+                except ValueError:
+                    continue
+
+    def processed_paths(self, include_failed: bool = True) -> Set[str]:
+        """Return the paths already written, optionally leaving out those whose last row failed."""
+        succeeded = {row['path']: bool(row.get('success')) for _, row in self._rows()}
+        return {path for path, success in succeeded.items() if include_failed or success}
+
+    def write(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            self._file.write(json.dumps(row) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def compact(self):
+        """Rewrite the file with only the last row of each path, if any path has several."""
+        last = {row['path']: number for number, row in self._rows()}
+        with open(self.path, 'r', encoding='utf-8') as output:
+            if sum(1 for _ in output) == len(last):
+                return
+        kept = set(last.values())
+        compacted = self.path + '.tmp'
+        with open(self.path, 'r', encoding='utf-8') as output, open(compacted, 'w', encoding='utf-8') as rewritten:
+            for number, line in enumerate(output):
+                if number in kept:
+                    rewritten.write(line)
+            rewritten.flush()
+            os.fsync(rewritten.fileno())
+        os.replace(compacted, self.path)
+
+    def close(self):
+        self._file.close()
+        self.compact()
+
+class SqliteResultWriter:
+    """Upserts result rows into a SQLite table keyed by path, one transaction per write."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        columns = ', '.join(f'"{c}" PRIMARY KEY' if c == 'path' else f'"{c}"' for c in RUN_COLUMNS)
+        self._connection.execute(f'CREATE TABLE IF NOT EXISTS results ({columns})')
+        self._connection.commit()
+
+    def processed_paths(self, include_failed: bool = True) -> Set[str]:
+        """Return the paths already written, optionally leaving out failed images."""
+        query = 'SELECT path FROM results' if include_failed else 'SELECT path FROM results WHERE success'
+        return {row[0] for row in self._connection.execute(query)}
+
+    def write(self, rows: List[Dict[str, Any]]):
+        placeholders = ', '.join('?' for _ in RUN_COLUMNS)
+        with self._connection:
+            self._connection.executemany(
+                f'INSERT OR REPLACE INTO results VALUES ({placeholders})',
+                [[row.get(c) for c in RUN_COLUMNS] for row in rows]
+            )
+
+    def close(self):
+        self._connection.close()
+
+def open_result_writer(path: str):
+    """
+    Open the writer for an output path, chosen by its extension.
+
+    Args:
+        path: Output file ending in .jsonl, .sqlite or .db
+
+    Returns:
+        JsonlResultWriter or SqliteResultWriter
+    """
+    if path.endswith(('.sqlite', '.sqlite3', '.db')):
+        return SqliteResultWriter(path)
+    if path.endswith(('.jsonl', '.ndjson')):
+        return JsonlResultWriter(path)
+    raise ValueError(f"Unsupported output format for {path}; use .jsonl or .sqlite")
+
+class RunStats:
+    """Counters for a batch run, with throughput and ETA."""
+
+    def __init__(self, total: Optional[int] = None):
+        self.started_at = time.time()
+        self.total = total
+        self.skipped = 0
+        self.processed = 0
+        self.detected = 0
+        self.failed = 0
+
+    @property
+    def rate(self) -> float:
+        """Images processed per second in this run."""
+        elapsed = time.time() - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated seconds until the remaining images are processed, if known."""
+        if self.total is None or self.rate == 0:
+            return None
+        remaining = self.total - self.skipped - self.processed
+        return max(0.0, remaining / self.rate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'total': self.total,
+            'skipped': self.skipped,
+            'processed': self.processed,
+            'detected': self.detected,
+            'failed': self.failed,
+            'rate': round(self.rate, 3),
+            'eta': round(self.eta, 1) if self.eta is not None else None,
+            'elapsed': round(time.time() - self.started_at, 1)
+        }
+
+def make_chunk_analyzer(
+    api_key: str,
+    model_name: str,
+    prompt: str,
+    enhanced_prompt: Optional[str] = None,
+    max_workers: int = 8,
+    max_tokens: Optional[int] = None,
+    options: Optional[Dict[str, Any]] = None
+) -> Callable[[List[Dict]], List[Any]]:
+    """
+    Build the function that analyzes one chunk of loaded images.
+
+    Args:
+        api_key: Cohere API key
+        model_name: Model to use
+        prompt: The detection prompt
+        enhanced_prompt: If given, positive detections also get an enhanced analysis
+        max_workers: Parallel API calls per chunk
+        max_tokens: Token limit for enhanced analyses
+        options: Tiling and pre-filter arguments for process_image_batch, see detection_options
+
+    Returns:
+        Callable: Takes image dicts and returns (record, enhanced record or None) pairs
+    """
+    def analyze(images):
+        records = process_image_batch(
+            images=images,
+            api_key=api_key,
+            model_name=model_name,
+            prompt=prompt,
+            max_workers=max_workers,
+            **(options or {})
+        )
+        enhanced_by_id = {}
+        detected = [r for r in records if r.detection_result is True]
+        if enhanced_prompt and detected:
+            enhanced = process_enhanced_analysis(
+                images=detected,
+                api_key=api_key,
+                model_name=model_name,
+                prompt=enhanced_prompt,
+                max_workers=max_workers,
+                max_tokens=max_tokens
+            )
+            enhanced_by_id = {e.id: e for e in enhanced}
+        return [(r, enhanced_by_id.get(r.id)) for r in records]
+
+    return analyze
+
+def run_batch(
+    paths: Iterable[str],
+    writer: Any,
+    analyze: Callable[[List[Dict]], List[Any]],
+    subject: str,
+    chunk_size: int = 32,
+    total: Optional[int] = None,
+    retry_failed: bool = False,
+    progress_callback: Optional[Callable[[RunStats], None]] = None
+) -> RunStats:
+    """
+    Analyze images with a bounded window in flight, writing each result as it completes.
+
+    At most chunk_size images are read and analyzed at a time; as soon as one is
+    done its row is written and the next image takes its place, so one slow image
+    does not leave the others' workers idle. The output doubles as the checkpoint:
+    paths it already holds are skipped, so an interrupted run resumes where it
+    stopped.
+
+    Args:
+        paths: Image paths (may be a lazy iterator)
+        writer: An open result writer
+        analyze: Analyzer from make_chunk_analyzer, called with one image at a time
+        subject: Detection subject recorded with each row
+        chunk_size: Images in flight, and held in memory, at a time
+        total: Total number of input paths, for the ETA
+        retry_failed: Re-analyze images whose earlier attempt failed
+        progress_callback: Called with the stats after each write
+
+    Returns:
+        RunStats: The final counters
+    """
+    done = writer.processed_paths(include_failed=not retry_failed)
+    stats = RunStats(total=total)
+
+    def pending():
+        index = len(done)
+        for path in paths:
+            if path in done:
+                stats.skipped += 1
+            else:
+                yield index, path
+                index += 1
+
+    def analyze_path(index, path):
+        try:
+            with open(path, 'rb') as image_file:
+                image = {'filename': os.path.basename(path), 'data': image_file.read()}
+        except OSError as e:
+            return {'path': path, 'filename': os.path.basename(path), 'subject': subject,
+                    'success': False, 'error': str(e), 'index': index}, None
+        [(record, enhanced)] = analyze([image])
+        row = export_row(index, record, enhanced, subject)
+        row['path'] = path
+        return row, record
+
+    window = max(1, chunk_size)
+    waiting = pending()
+    in_flight = set()
+    executor = ThreadPoolExecutor(max_workers=window, thread_name_prefix='batch')
+
+    def hand_over_next():
+        item = next(waiting, None)
+        if item is not None:
+            in_flight.add(executor.submit(analyze_path, *item))
+
+    try:
+        for _ in range(window):
+            hand_over_next()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            in_flight.difference_update(finished)
+            errors = [future.exception() for future in finished if future.exception() is not None]
+            results = [future.result() for future in finished if future.exception() is None]
+            # Write what did complete before an interrupt or error ends the run
+            writer.write([row for row, _ in results])
+            for row, record in results:
+                stats.processed += 1
+                stats.failed += record is None or not record.success
+                stats.detected += record is not None and record.detection_result is True
+            if errors:
+                raise errors[0]
+            for _ in finished:
+                hand_over_next()
+            if progress_callback:
+                progress_callback(stats)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return stats
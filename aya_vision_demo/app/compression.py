@@ -0,0 +1,136 @@
+import gzip
+import threading
+from typing import Callable, Dict, Optional, Tuple
+from flask import request
+
+# Response types worth compressing; images, video and archives are already compressed
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson', 'image/svg+xml'
+}
+
+def _brotli_compressor(quality: int) -> Optional[Callable[[bytes], bytes]]:
+    """Return a Brotli compressor at the given quality, or None if brotli is not installed."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return lambda data: brotli.compress(data, quality=quality)
+
+def choose_encoding(accept_encoding: str, available: Tuple[str, ...]) -> Optional[str]:
+    """
+    Pick the content coding to use from an Accept-Encoding header.
+
+    Codings are tried in the order given by available; a coding is acceptable if it
+    (or '*') is listed with a non-zero quality.
+
+    Args:
+        accept_encoding: The Accept-Encoding request header
+        available: Supported codings, most preferred first
+
+    Returns:
+        Optional[str]: The coding, or None to send the response uncompressed
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name] = quality
+
+    for encoding in available:
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+class Compressor:
+    """
+    Compresses eligible responses of an app with Brotli or gzip.
+
+    Dynamic responses are compressed at a fast level on every request. Static files
+    are compressed once at a high level and kept, keyed by their ETag and coding,
+    since fingerprinted assets are the same bytes for as long as the ETag holds.
+    """
+
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.codecs = {}
+        self.static_codecs = {}
+        brotli_fast = _brotli_compressor(brotli_quality)
+        if brotli_fast is not None:
+            self.codecs['br'] = brotli_fast
+            self.static_codecs['br'] = _brotli_compressor(11)
+        self.codecs['gzip'] = lambda data: gzip.compress(data, compresslevel=self.gzip_level)
+        self.static_codecs['gzip'] = lambda data: gzip.compress(data, compresslevel=9)
+        self._static_cache: Dict[Tuple[str, str], bytes] = {}
+        self._lock = threading.Lock()
+
+    def _compress_static(self, etag: Optional[str], encoding: str, data: bytes) -> bytes:
+        if not etag:
+            return self.static_codecs[encoding](data)
+        key = (etag, encoding)
+        with self._lock:
+            cached = self._static_cache.get(key)
+        if cached is None:
+            cached = self.static_codecs[encoding](data)
+            with self._lock:
+                self._static_cache[key] = cached
+        return cached
+
+    def __call__(self, response):
+        """Compress a response in place if the client accepts it and it is worth it (an after_request hook)."""
+        if (response.status_code != 200
+                or (response.is_streamed and not response.direct_passthrough)
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'Content-Encoding' in response.headers
+                or 'Range' in request.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''), tuple(self.codecs))
+        if encoding is None:
+            return response
+
+        # Static files are sent as a passthrough file wrapper; read them into memory to compress
+        is_static = response.direct_passthrough
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        etag, _ = response.get_etag()
+        if is_static:
+            compressed = self._compress_static(etag, encoding, data)
+        else:
+            compressed = self.codecs[encoding](data)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        response.headers.pop('Accept-Ranges', None)
+        if etag:
+            # The compressed body is a different representation of the same resource
+            response.set_etag(etag, weak=True)
+        return response
+
+def init_app(app):
+    """
+    Compress the app's responses according to its COMPRESS_* settings.
+
+    Args:
+        app: The Flask application
+    """
+    if not app.config.get('COMPRESS_RESPONSES', True):
+        return
+    compressor = Compressor(
+        min_size=app.config.get('COMPRESS_MIN_SIZE', 1024),
+        gzip_level=app.config.get('COMPRESS_LEVEL', 6)
+    )
+    app.extensions['compressor'] = compressor
+    app.after_request(compressor)
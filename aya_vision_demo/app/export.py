@@ -0,0 +1,197 @@
+import csv
+import io
+import json
+import time
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Optional
+from app.models import DetectionRecord, EnhancedRecord
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'zip': 'application/zip'
+}
+
+CSV_COLUMNS = [
+    'index', 'id', 'filename', 'subject', 'mime_type', 'detection_result', 'success', 'error',
+    'response_text', 'latency', 'frame_time', 'prefilter_score', 'skipped',
+    'enhanced_analysis', 'enhanced_success', 'enhanced_error'
+]
+
+def detection_folder(detection_result: Optional[bool]) -> str:
+    """
+    Map a detection result to its export folder name.
+
+    Args:
+        detection_result: True, False or None
+
+    Returns:
+        str: 'detected', 'not_detected' or 'unknown'
+    """
+    if detection_result is True:
+        return 'detected'
+    if detection_result is False:
+        return 'not_detected'
+    return 'unknown'
+
+def export_row(
+    index: int,
+    record: DetectionRecord,
+    enhanced: Optional[EnhancedRecord],
+    subject: str
+) -> Dict:
+    """
+    Build the flat export row for one detection record and its enhanced result.
+
+    Args:
+        index: Position of the record in the batch
+        record: The detection record
+        enhanced: The enhanced record for this image, if any
+        subject: The detection subject of the batch
+
+    Returns:
+        Dict: The export row
+    """
+    row = record.to_dict(include_images=False)
+    row.update({
+        'index': index,
+        'subject': subject,
+        'enhanced_analysis': enhanced.enhanced_analysis if enhanced else None,
+        'enhanced_success': enhanced.success if enhanced else None,
+        'enhanced_error': enhanced.error if enhanced else None
+    })
+    return row
+
+def _iter_rows(
+    results: List[DetectionRecord],
+    enhanced_results: Iterable[EnhancedRecord],
+    subject: str
+) -> Iterator[Dict]:
+    """Yield export rows, joining enhanced records to their source detection record."""
+    enhanced_by_id = {e.id: e for e in enhanced_results}
+    for index, record in enumerate(results):
+        yield export_row(index, record, enhanced_by_id.get(record.id), subject)
+
+def iter_results_csv(
+    results: List[DetectionRecord],
+    enhanced_results: Iterable[EnhancedRecord] = (),
+    subject: str = ''
+) -> Iterator[str]:
+    """
+    Stream a batch as CSV, one line per chunk.
+
+    Args:
+        results: The detection records of the batch
+        enhanced_results: Enhanced records produced from this batch
+        subject: The detection subject of the batch
+
+    Yields:
+        str: CSV text chunks
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for row in _iter_rows(results, enhanced_results, subject):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+def iter_results_jsonl(
+    results: List[DetectionRecord],
+    enhanced_results: Iterable[EnhancedRecord] = (),
+    subject: str = ''
+) -> Iterator[str]:
+    """
+    Stream a batch as JSON Lines, one record per chunk.
+
+    Args:
+        results: The detection records of the batch
+        enhanced_results: Enhanced records produced from this batch
+        subject: The detection subject of the batch
+
+    Yields:
+        str: JSON Lines chunks
+    """
+    for row in _iter_rows(results, enhanced_results, subject):
+        yield json.dumps(row) + '\n'
+
+class _ChunkSink:
+    """Write-only, unseekable file object that collects bytes written by zipfile."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def iter_results_zip(
+    results: List[DetectionRecord],
+    enhanced_results: Iterable[EnhancedRecord] = (),
+    subject: str = ''
+) -> Iterator[bytes]:
+    """
+    Stream a batch as a ZIP archive of the original images and a JSONL manifest.
+
+    Images are grouped into detected/, not_detected/ and unknown/ folders and
+    stored uncompressed (they are already compressed formats). The archive is
+    written to an unseekable sink, so each member is yielded as soon as it is
+    written and the whole archive is never held in memory.
+
+    Args:
+        results: The detection records of the batch
+        enhanced_results: Enhanced records produced from this batch
+        subject: The detection subject of the batch
+
+    Yields:
+        bytes: ZIP archive chunks
+    """
+    # Empty chunks would terminate a chunked transfer early, so skip them
+    for chunk in _iter_zip_chunks(results, list(enhanced_results), subject):
+        if chunk:
+            yield chunk
+
+def _iter_zip_chunks(
+    results: List[DetectionRecord],
+    enhanced_results: List[EnhancedRecord],
+    subject: str
+) -> Iterator[bytes]:
+    """Write the archive for iter_results_zip, yielding whatever the sink holds after each member."""
+    sink = _ChunkSink()
+    used_names = set()
+    date_time = time.localtime(time.time())[:6]
+
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for index, record in enumerate(results):
+            if not record.image_data:
+                continue
+
+            name = f"{detection_folder(record.detection_result)}/{record.filename}"
+            if name in used_names:
+                name = f"{detection_folder(record.detection_result)}/{index:05d}_{record.filename}"
+            used_names.add(name)
+
+            archive.writestr(zipfile.ZipInfo(name, date_time=date_time), record.image_data)
+            yield sink.drain()
+
+        manifest_info = zipfile.ZipInfo('results.jsonl', date_time=date_time)
+        manifest_info.compress_type = zipfile.ZIP_DEFLATED
+        with archive.open(manifest_info, mode='w') as manifest:
+            for line in iter_results_jsonl(results, enhanced_results, subject):
+                manifest.write(line.encode('utf-8'))
+                yield sink.drain()
+
+    # Central directory is written when the archive is closed
+    yield sink.drain()
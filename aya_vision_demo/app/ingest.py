@@ -0,0 +1,314 @@
+import collections
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.models import DetectionRecord, ResultSet
+from app.pagination import ResultIndex
+from app.utils import is_valid_file_extension, process_image_batch, detection_options
+
+logger = logging.getLogger('app.ingest')
+
+# (absolute path, size in bytes, modification time in ns)
+FileKey = Tuple[str, int, int]
+
+class ProcessedLedger:
+    """
+    Append-only JSON Lines record of image files that have already been analyzed.
+
+    A file is identified by its path, size and modification time, so a frame that
+    is overwritten in place is analyzed again. The ledger survives restarts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._keys = set()
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as ledger:
+                for line in ledger:
+                    try:
+                        entry = json.loads(line)
+                        self._keys.add((entry['path'], entry['size'], entry['mtime_ns']))
+                    except (ValueError, KeyError):
+                        logger.warning(f"Skipping malformed ledger line in {path}")
+
+    def __contains__(self, key: FileKey) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def record(self, entries: List[Dict[str, Any]]):
+        """
+        Append entries for processed files and flush them to disk.
+
+        Args:
+            entries: Dicts with at least 'path', 'size' and 'mtime_ns'
+        """
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as ledger:
+                for entry in entries:
+                    ledger.write(json.dumps(entry) + '\n')
+                ledger.flush()
+                os.fsync(ledger.fileno())
+            self._keys.update((e['path'], e['size'], e['mtime_ns']) for e in entries)
+
+class DirectoryWatcher:
+    """
+    Polls directories for new image files and analyzes them in micro-batches.
+
+    A file is picked up once its size and modification time are unchanged between
+    two polls, so frames still being written are not read half-finished. Ready
+    files are queued and handed to process_batch when batch_size files are waiting
+    or the oldest has waited batch_window seconds, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        directories: List[str],
+        process_batch: Callable[[List[Dict]], Tuple[str, List[DetectionRecord]]],
+        ledger: ProcessedLedger,
+        extensions: List[str],
+        batch_size: int = 8,
+        batch_window: float = 10.0,
+        poll_interval: float = 1.0
+    ):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.process_batch = process_batch
+        self.ledger = ledger
+        self.extensions = extensions
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+
+        self._last_seen = {}
+        self._queue = collections.deque()
+        self._queued = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.stats = {
+            'files_processed': 0,
+            'files_failed': 0,
+            'batches': 0,
+            'last_batch_at': None,
+            'recent_batches': collections.deque(maxlen=20)
+        }
+
+    def scan(self) -> List[FileKey]:
+        """
+        List files that are ready to be analyzed.
+
+        Returns:
+            List[FileKey]: Files that are stable, unprocessed and not yet queued
+        """
+        seen = {}
+        ready = []
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                logger.warning(f"Cannot scan {directory}: {str(e)}")
+                continue
+
+            for entry in sorted(entries, key=lambda e: e.name):
+                if not entry.is_file() or not is_valid_file_extension(entry.name, self.extensions):
+                    continue
+                stat = entry.stat()
+                key = (entry.path, stat.st_size, stat.st_mtime_ns)
+                seen[entry.path] = key
+
+                # Only take files whose size and mtime held still since the last poll
+                if self._last_seen.get(entry.path) != key:
+                    continue
+                if key in self.ledger or key in self._queued:
+                    continue
+                ready.append(key)
+
+        self._last_seen = seen
+        return ready
+
+    def poll_once(self, now: Optional[float] = None) -> int:
+        """
+        Scan once and process any micro-batches that are due.
+
+        Args:
+            now: Current time (defaults to time.time())
+
+        Returns:
+            int: Number of files processed
+        """
+        now = time.time() if now is None else now
+        for key in self.scan():
+            self._queue.append((key, now))
+            self._queued.add(key)
+
+        processed = 0
+        while self._queue and (
+            len(self._queue) >= self.batch_size or now - self._queue[0][1] >= self.batch_window
+        ):
+            batch = [self._queue.popleft()[0] for _ in range(min(self.batch_size, len(self._queue)))]
+            processed += self.flush(batch)
+        return processed
+
+    def flush(self, keys: List[FileKey]) -> int:
+        """
+        Analyze a micro-batch of files and record them in the ledger.
+
+        Args:
+            keys: The files to analyze
+
+        Returns:
+            int: Number of files analyzed
+        """
+        images = []
+        read_keys = []
+        for key in keys:
+            self._queued.discard(key)
+            try:
+                with open(key[0], 'rb') as image_file:
+                    images.append({'filename': os.path.basename(key[0]), 'data': image_file.read()})
+                read_keys.append(key)
+            except OSError as e:
+                # Leave it out of the ledger so it is retried if it reappears
+                logger.warning(f"Cannot read {key[0]}: {str(e)}")
+
+        if not images:
+            return 0
+
+        start_time = time.time()
+        result_id, results = self.process_batch(images)
+
+        entries = []
+        for key, result in zip(read_keys, results):
+            entries.append({
+                'path': key[0],
+                'size': key[1],
+                'mtime_ns': key[2],
+                'result_id': result_id,
+                'image_id': result.id,
+                'detection_result': result.detection_result,
+                'success': result.success,
+                'error': result.error,
+                'processed_at': time.time()
+            })
+        self.ledger.record(entries)
+
+        failed = sum(1 for e in entries if not e['success'])
+        self.stats['files_processed'] += len(entries)
+        self.stats['files_failed'] += failed
+        self.stats['batches'] += 1
+        self.stats['last_batch_at'] = time.time()
+        self.stats['recent_batches'].appendleft({
+            'result_id': result_id,
+            'count': len(entries),
+            'detected': sum(1 for e in entries if e['detection_result'] is True),
+            'failed': failed,
+            'seconds': round(time.time() - start_time, 3)
+        })
+        logger.info(f"Ingested {len(entries)} files as result batch {result_id} ({failed} failed)")
+        return len(entries)
+
+    def run(self):
+        """Poll until stop() is called, then process whatever is still queued."""
+        logger.info(f"Watching {', '.join(self.directories)} (batch size {self.batch_size}, window {self.batch_window}s)")
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"Error during ingestion poll: {str(e)}")
+            self._stop.wait(self.poll_interval)
+
+        while self._queue:
+            batch = [self._queue.popleft()[0] for _ in range(min(self.batch_size, len(self._queue)))]
+            self.flush(batch)
+
+    def start(self) -> threading.Thread:
+        """Run the watcher in a daemon thread."""
+        self._thread = threading.Thread(target=self.run, name='directory-watcher', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop polling and wait for queued files to be processed."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        """Return a JSON-serializable view of the watcher state."""
+        return {
+            'directories': self.directories,
+            'batch_size': self.batch_size,
+            'batch_window': self.batch_window,
+            'queued': len(self._queue),
+            'ledger_size': len(self.ledger),
+            'files_processed': self.stats['files_processed'],
+            'files_failed': self.stats['files_failed'],
+            'batches': self.stats['batches'],
+            'last_batch_at': self.stats['last_batch_at'],
+            'recent_batches': list(self.stats['recent_batches'])
+        }
+
+def create_watcher(app) -> DirectoryWatcher:
+    """
+    Build a DirectoryWatcher that stores each micro-batch in the app's result store.
+
+    Uses the WATCH_* settings of the app config. The watcher is registered as
+    app.extensions['ingest_watcher'] so the status endpoint can report on it.
+    Only the newest WATCH_KEEP_BATCHES batches, with their images and
+    thumbnails, are kept in the result store; the ledger records every file.
+
+    Args:
+        app: The Flask application
+
+    Returns:
+        DirectoryWatcher: The (not yet started) watcher
+    """
+    from app.routes import DEFAULT_SUBJECT, results_storage
+
+    config = app.config
+    kept = collections.deque()
+
+    def process_batch(images):
+        results = process_image_batch(
+            images=images,
+            api_key=config['COHERE_API_KEY'],
+            model_name=config['MODEL_NAME'],
+            prompt=config['PROMPT'],
+            **detection_options(config)
+        )
+        result_id = str(uuid.uuid4())
+        result_set = ResultSet(results)
+        results_storage[result_id] = {
+            'results': result_set,
+            'subject': config.get('WATCH_SUBJECT') or DEFAULT_SUBJECT,
+            'index': ResultIndex(result_set),
+            'source': 'watch',
+            'prompt': config['PROMPT'],
+            'model': config['MODEL_NAME']
+        }
+        kept.append(result_id)
+        while len(kept) > config['WATCH_KEEP_BATCHES']:
+            results_storage.pop(kept.popleft(), None)
+        return result_id, results
+
+    watcher = DirectoryWatcher(
+        directories=config['WATCH_DIRS'],
+        process_batch=process_batch,
+        ledger=ProcessedLedger(config['WATCH_LEDGER']),
+        extensions=config['UPLOAD_EXTENSIONS'],
+        batch_size=config['WATCH_BATCH_SIZE'],
+        batch_window=config['WATCH_BATCH_WINDOW'],
+        poll_interval=config['WATCH_POLL_INTERVAL']
+    )
+    app.extensions['ingest_watcher'] = watcher
+    return watcher
@@ -0,0 +1,363 @@
+import base64
+import threading
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Aggregate counters kept per batch; the names double as the result filters
+COUNT_KEYS = ('all', 'detected', 'not-detected', 'unknown', 'error', 'skipped')
+
+class ModelResponse:
+    """
+    The fields we keep from a Cohere chat response.
+
+    Holding the whole SDK response object per image keeps the request echo,
+    logprobs and pydantic bookkeeping alive for the lifetime of a batch, so only
+    the text, response ID and billed token usage are retained.
+    """
+    __slots__ = ('id', 'text', 'input_tokens', 'output_tokens')
+
+    def __init__(
+        self,
+        text: str,
+        id: Optional[str] = None,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None
+    ):
+        self.id = id
+        self.text = text
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+    @classmethod
+    def from_usage(cls, text: str, id: Optional[str], usage: Any) -> 'ModelResponse':
+        """
+        Build a ModelResponse from response text, ID and an SDK usage object.
+
+        Args:
+            text: The generated text
+            id: The response ID reported by the API
+            usage: The SDK usage object (may be None)
+
+        Returns:
+            ModelResponse: The compact response
+        """
+        billed_units = getattr(usage, 'billed_units', None)
+        input_tokens = getattr(billed_units, 'input_tokens', None)
+        output_tokens = getattr(billed_units, 'output_tokens', None)
+        return cls(
+            text=text,
+            id=id,
+            input_tokens=int(input_tokens) if input_tokens is not None else None,
+            output_tokens=int(output_tokens) if output_tokens is not None else None
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serializable representation."""
+        return {
+            'id': self.id,
+            'text': self.text,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens
+        }
+
+def sniff_image_mime_type(data: Optional[bytes]) -> Optional[str]:
+    """
+    Identify the encoding of image bytes from their signature.
+
+    Args:
+        data: Encoded image bytes
+
+    Returns:
+        Optional[str]: The MIME type, or None if the format is not recognised
+    """
+    if not data:
+        return None
+    if data[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    return None
+
+class DetectionRecord:
+    """
+    Result of the initial binary classification for one image.
+
+    Image and thumbnail are stored as raw bytes; the base64 forms used by the
+    templates and the API are produced on access and never kept. Each record has
+    a stable ID that identifies the image for deletion and in the API.
+    """
+    __slots__ = (
+        'id', 'filename', 'image_data', 'mime_type', 'thumbnail_data',
+        'detection_result', 'success', 'error', 'model_response', 'latency', 'frame_time', 'tile',
+        'prefilter_score', 'skipped'
+    )
+
+    def __init__(
+        self,
+        filename: str,
+        image_data: Optional[bytes] = None,
+        mime_type: Optional[str] = None,
+        thumbnail_data: Optional[bytes] = None,
+        detection_result: Optional[bool] = None,
+        success: bool = False,
+        error: Optional[str] = None,
+        model_response: Optional[ModelResponse] = None,
+        latency: Optional[float] = None,
+        id: Optional[str] = None,
+        frame_time: Optional[float] = None,
+        tile: Optional[Dict[str, Any]] = None,
+        prefilter_score: Optional[float] = None,
+        skipped: bool = False
+    ):
+        self.id = id or uuid.uuid4().hex
+        self.filename = filename
+        self.image_data = image_data
+        self.mime_type = mime_type
+        self.thumbnail_data = thumbnail_data
+        self.detection_result = detection_result
+        self.success = success
+        self.error = error
+        self.model_response = model_response
+        self.latency = latency
+        # Seconds into the source video, for frames sampled from an uploaded video
+        self.frame_time = frame_time
+        # Tiled detection: which tile matched ('index', 'box') out of 'tiles', and how many were 'analyzed'
+        self.tile = tile
+        # Local pre-filter score, and whether the image was marked negative on it without an API call
+        self.prefilter_score = prefilter_score
+        self.skipped = skipped
+
+    @property
+    def full_image(self) -> Optional[str]:
+        """Base64 encoded full image."""
+        return base64.b64encode(self.image_data).decode('utf-8') if self.image_data else None
+
+    @property
+    def thumbnail(self) -> Optional[str]:
+        """Base64 encoded thumbnail."""
+        return base64.b64encode(self.thumbnail_data).decode('utf-8') if self.thumbnail_data else None
+
+    @property
+    def thumbnail_mime_type(self) -> Optional[str]:
+        """MIME type of the thumbnail, read from its encoding."""
+        return sniff_image_mime_type(self.thumbnail_data)
+
+    @property
+    def response_text(self) -> Optional[str]:
+        """Raw text returned by the model, if the call succeeded."""
+        return self.model_response.text if self.model_response else None
+
+    @property
+    def storage_bytes(self) -> int:
+        """Bytes held by the image payloads of this record."""
+        return len(self.image_data or b'') + len(self.thumbnail_data or b'')
+
+    def to_dict(self, include_images: bool = True) -> Dict[str, Any]:
+        """
+        Return a JSON-serializable representation.
+
+        Args:
+            include_images: Whether to include the base64 image and thumbnail
+
+        Returns:
+            Dict[str, Any]: The record as a dictionary
+        """
+        data = {
+            'id': self.id,
+            'filename': self.filename,
+            'mime_type': self.mime_type,
+            'detection_result': self.detection_result,
+            'success': self.success,
+            'error': self.error,
+            'response_text': self.response_text,
+            'latency': self.latency,
+            'frame_time': self.frame_time,
+            'tile': self.tile,
+            'prefilter_score': self.prefilter_score,
+            'skipped': self.skipped
+        }
+        if include_images:
+            data['thumbnail'] = self.thumbnail
+            data['thumbnail_mime_type'] = self.thumbnail_mime_type
+            data['full_image'] = self.full_image
+        return data
+
+class EnhancedRecord:
+    """
+    Result of the enhanced analysis for one image.
+
+    References the DetectionRecord it was produced from instead of copying its
+    image data; image attributes are read through to the source record.
+    """
+    __slots__ = ('source', 'enhanced_analysis', 'success', 'error', 'model_response', 'latency')
+
+    def __init__(
+        self,
+        source: DetectionRecord,
+        enhanced_analysis: Optional[str] = None,
+        success: bool = False,
+        error: Optional[str] = None,
+        model_response: Optional[ModelResponse] = None,
+        latency: Optional[float] = None
+    ):
+        self.source = source
+        self.enhanced_analysis = enhanced_analysis
+        self.success = success
+        self.error = error
+        self.model_response = model_response
+        self.latency = latency
+
+    @property
+    def id(self) -> str:
+        return self.source.id
+
+    @property
+    def filename(self) -> str:
+        return self.source.filename
+
+    @property
+    def mime_type(self) -> Optional[str]:
+        return self.source.mime_type
+
+    @property
+    def detection_result(self) -> Optional[bool]:
+        return self.source.detection_result
+
+    @property
+    def image_data(self) -> Optional[bytes]:
+        return self.source.image_data
+
+    @property
+    def full_image(self) -> Optional[str]:
+        return self.source.full_image
+
+    @property
+    def thumbnail(self) -> Optional[str]:
+        return self.source.thumbnail
+
+    @property
+    def thumbnail_mime_type(self) -> Optional[str]:
+        return self.source.thumbnail_mime_type
+
+    def to_dict(self, include_images: bool = True) -> Dict[str, Any]:
+        """
+        Return a JSON-serializable representation.
+
+        Args:
+            include_images: Whether to include the base64 image and thumbnail
+
+        Returns:
+            Dict[str, Any]: The record as a dictionary
+        """
+        data = self.source.to_dict(include_images=include_images)
+        data.update({
+            'enhanced_analysis': self.enhanced_analysis,
+            'success': self.success,
+            'error': self.error,
+            'response_text': self.model_response.text if self.model_response else None,
+            'latency': self.latency
+        })
+        return data
+
+def record_filters(record: Any) -> Tuple[str, ...]:
+    """
+    Return the names of the counters (other than 'all') a record is counted under.
+
+    Args:
+        record: A DetectionRecord or EnhancedRecord
+
+    Returns:
+        Tuple[str, ...]: The matching names from COUNT_KEYS
+    """
+    if record.detection_result is True:
+        names = ('detected',)
+    elif record.detection_result is False:
+        names = ('not-detected',)
+    else:
+        names = ('unknown',)
+    if getattr(record, 'skipped', False):
+        names += ('skipped',)
+    return names if record.success else names + ('error',)
+
+class ResultSet:
+    """
+    Ordered collection of one batch's records, keyed by their stable image IDs.
+
+    Lookups and deletes by ID are O(1), and the per-batch counters in COUNT_KEYS
+    are updated as records are added or removed instead of being recounted.
+    Mutations take a lock so concurrent deletes from several tabs stay consistent;
+    iteration walks a snapshot, so it is safe while another request deletes.
+    """
+
+    def __init__(self, records: Iterable[Any] = ()):
+        self._records = {}
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(COUNT_KEYS, 0)
+        for record in records:
+            self.add(record)
+
+    def add(self, record: Any):
+        """
+        Add a record, replacing any record with the same ID.
+
+        Args:
+            record: A DetectionRecord or EnhancedRecord
+        """
+        with self._lock:
+            if record.id in self._records:
+                self._uncount(self._records[record.id])
+            self._records[record.id] = record
+            self.counts['all'] += 1
+            for name in record_filters(record):
+                self.counts[name] += 1
+
+    def remove(self, image_ids: Iterable[str]) -> List[Any]:
+        """
+        Remove the records with the given IDs, ignoring IDs that are not present.
+
+        Args:
+            image_ids: IDs of the records to remove
+
+        Returns:
+            List[Any]: The records that were removed
+        """
+        removed = []
+        with self._lock:
+            for image_id in image_ids:
+                record = self._records.pop(image_id, None)
+                if record is not None:
+                    self._uncount(record)
+                    removed.append(record)
+        return removed
+
+    def _uncount(self, record: Any):
+        self.counts['all'] -= 1
+        for name in record_filters(record):
+            self.counts[name] -= 1
+
+    def get(self, image_id: str) -> Optional[Any]:
+        """Return the record with the given ID, or None."""
+        return self._records.get(image_id)
+
+    def snapshot(self) -> List[Any]:
+        """Return the records, in insertion order, as a list."""
+        with self._lock:
+            return list(self._records.values())
+
+    def counts_snapshot(self) -> Dict[str, int]:
+        """Return a copy of the aggregate counters."""
+        with self._lock:
+            return dict(self.counts)
+
+    def __contains__(self, image_id: str) -> bool:
+        return image_id in self._records
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.snapshot())
+
+    def __len__(self) -> int:
+        return len(self._records)
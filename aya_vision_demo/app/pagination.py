@@ -0,0 +1,195 @@
+import math
+import threading
+from typing import Any, Dict, List, Mapping, Optional
+from app.models import COUNT_KEYS, ResultSet, record_filters
+
+RESULT_FILTERS = COUNT_KEYS
+RESULT_SORTS = (
+    'filename-asc', 'filename-desc',
+    'status-asc', 'status-desc',
+    'latency-asc', 'latency-desc'
+)
+DEFAULT_FILTER = 'all'
+DEFAULT_SORT = 'filename-asc'
+
+# Status sort order: no detection, unknown, detected
+_STATUS_RANK = {False: 0, None: 1, True: 2}
+
+class ResultIndex:
+    """
+    Precomputed filter memberships and sort orders for one batch of results.
+
+    The three base sort orders are computed once when the index is built. Each
+    (filter, sort) combination is materialized the first time it is requested
+    and memoized, so paging through a view costs a slice. Orders hold image IDs;
+    deleted IDs are dropped in O(1) and swept from the orders on the next view.
+    """
+
+    def __init__(self, results: ResultSet):
+        records = results.snapshot()
+        self.size = len(records)
+        self._lock = threading.Lock()
+
+        self._members = {name: set() for name in RESULT_FILTERS if name != 'all'}
+        for record in records:
+            for name in record_filters(record):
+                self._members[name].add(record.id)
+
+        # sorted() is stable, so ties keep batch order
+        self._base_orders = {
+            'filename': [r.id for r in sorted(records, key=lambda r: r.filename.lower())],
+            'status': [r.id for r in sorted(records, key=lambda r: _STATUS_RANK[r.detection_result])],
+            'latency': [
+                r.id for r in sorted(records, key=lambda r: (r.latency is None, r.latency or 0.0))
+            ]
+        }
+        self._orders = {}
+        self._removed = set()
+
+    def discard(self, image_id: str):
+        """
+        Drop a deleted image from the index.
+
+        Args:
+            image_id: ID of the removed record
+        """
+        with self._lock:
+            for members in self._members.values():
+                members.discard(image_id)
+            self._removed.add(image_id)
+            self.size -= 1
+
+    def order(self, filter_name: str, sort_name: str) -> List[str]:
+        """
+        Return image IDs matching a filter, in sort order.
+
+        Args:
+            filter_name: One of RESULT_FILTERS
+            sort_name: One of RESULT_SORTS
+
+        Returns:
+            List[str]: IDs of the matching records
+        """
+        with self._lock:
+            if self._removed:
+                removed = self._removed
+                self._base_orders = {
+                    key: [i for i in order if i not in removed]
+                    for key, order in self._base_orders.items()
+                }
+                self._orders = {}
+                self._removed = set()
+
+            key = (filter_name, sort_name)
+            if key in self._orders:
+                return self._orders[key]
+
+            sort_key, direction = sort_name.rsplit('-', 1)
+            base_order = self._base_orders[sort_key]
+            if direction == 'desc':
+                base_order = base_order[::-1]
+
+            if filter_name == 'all':
+                order = base_order
+            else:
+                members = self._members[filter_name]
+                order = [i for i in base_order if i in members]
+
+            self._orders[key] = order
+            return order
+
+    def page(
+        self,
+        filter_name: str,
+        sort_name: str,
+        page: int,
+        per_page: int,
+        offset: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Return one page of image IDs for a filter and sort.
+
+        An offset, when given, takes precedence over the page number. Clients that
+        append pages as the user scrolls pass the number of results they already
+        show, so images deleted in the meantime do not shift results past them.
+
+        Args:
+            filter_name: One of RESULT_FILTERS
+            sort_name: One of RESULT_SORTS
+            page: 1-based page number (clamped to the last page)
+            per_page: Number of results per page
+            offset: Index of the first result to return, if any
+
+        Returns:
+            Dict[str, Any]: ids, page, per_page, offset, next_offset (None after the
+                last result), total and pages
+        """
+        order = self.order(filter_name, sort_name)
+        total = len(order)
+        pages = max(1, math.ceil(total / per_page))
+        if offset is None:
+            page = min(page, pages)
+            start = (page - 1) * per_page
+        else:
+            start = min(offset, total)
+            page = min(start // per_page + 1, pages)
+        end = min(start + per_page, total)
+
+        return {
+            'ids': order[start:end],
+            'page': page,
+            'per_page': per_page,
+            'offset': start,
+            'next_offset': end if end < total else None,
+            'total': total,
+            'pages': pages
+        }
+
+def parse_page_args(
+    args: Mapping[str, str],
+    default_per_page: int,
+    max_per_page: int,
+    defaults: Optional[Mapping[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Validate filter, sort and paging query parameters.
+
+    Unknown filter or sort values fall back to the defaults rather than erroring,
+    so stale bookmarks and saved preferences keep working.
+
+    Args:
+        args: The request query parameters
+        default_per_page: Page size when none is given
+        max_per_page: Largest allowed page size
+        defaults: Fallback filter/sort (e.g. saved session preferences)
+
+    Returns:
+        Dict[str, Any]: filter, sort, page, per_page and offset (None unless given)
+    """
+    defaults = defaults or {}
+
+    filter_name = args.get('filter') or defaults.get('filter') or DEFAULT_FILTER
+    if filter_name not in RESULT_FILTERS:
+        filter_name = DEFAULT_FILTER
+
+    sort_name = args.get('sort') or defaults.get('sort') or DEFAULT_SORT
+    if sort_name not in RESULT_SORTS:
+        sort_name = DEFAULT_SORT
+
+    try:
+        page = max(1, int(args.get('page', 1)))
+    except (TypeError, ValueError):
+        page = 1
+
+    try:
+        per_page = int(args.get('per_page', default_per_page))
+    except (TypeError, ValueError):
+        per_page = default_per_page
+    per_page = max(1, min(per_page, max_per_page))
+
+    try:
+        offset = max(0, int(args['offset'])) if args.get('offset') else None
+    except (TypeError, ValueError):
+        offset = None
+
+    return {'filter': filter_name, 'sort': sort_name, 'page': page, 'per_page': per_page, 'offset': offset}
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import importlib
+import io
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+# Pillow is imported where images are scored, not with the module
+if TYPE_CHECKING:
+    from PIL import Image
+
+# A scorer maps an image to a score in [0, 1]: how likely it is to show the subject.
+# Images scoring below PREFILTER_THRESHOLD are marked negative without an API call.
+Scorer = Callable[['Image.Image'], float]
+
+# Images are scored on a copy no larger than this on either side
+SCORING_SIZE = 256
+
+def _mask(band: Image.Image, minimum: int) -> Image.Image:
+    """Binary mask of the pixels of a single band that are at least minimum."""
+    return band.point(lambda v: 255 if v >= minimum else 0).convert('1')
+
+def _fraction(mask: Image.Image) -> float:
+    """Fraction of set pixels in a binary mask."""
+    histogram = mask.convert('L').histogram()
+    return histogram[255] / float(mask.size[0] * mask.size[1])
+
+def flame_colour_score(image: Image.Image) -> float:
+    """
+    Fraction of pixels that are bright and flame coloured (red dominant, ahead of green and blue).
+
+    Args:
+        image: The image to score
+
+    Returns:
+        float: The flame-coloured fraction of the image
+    """
+    from PIL import ImageChops
+
+    red, green, blue = image.convert('RGB').split()
+    mask = ImageChops.logical_and(_mask(red, 180), _mask(ImageChops.subtract(red, blue), 60))
+    mask = ImageChops.logical_and(mask, _mask(ImageChops.subtract(red, green, offset=1), 1))
+    return _fraction(mask)
+
+def bright_spot_score(image: Image.Image) -> float:
+    """
+    Fraction of near-saturated pixels, for subjects that are light sources at night.
+
+    Args:
+        image: The image to score
+
+    Returns:
+        float: The near-white fraction of the image
+    """
+    return _fraction(_mask(image.convert('L'), 240))
+
+# Built-in scorers selectable by name in PREFILTER
+PREFILTERS: Dict[str, Scorer] = {
+    'flame-colour': flame_colour_score,
+    'bright-spot': bright_spot_score
+}
+
+def load_scorer(name: str) -> Scorer:
+    """
+    Resolve a PREFILTER setting to a scorer.
+
+    Args:
+        name: A built-in scorer name, or 'package.module:function' for a custom
+            scorer (for example one wrapping a small local ONNX model)
+
+    Returns:
+        Scorer: The scorer function
+
+    Raises:
+        ValueError: If the name is neither built in nor an importable 'module:function'
+    """
+    if name in PREFILTERS:
+        return PREFILTERS[name]
+    module_name, _, attribute = name.partition(':')
+    if not attribute:
+        raise ValueError(f"Unknown pre-filter '{name}'. Use one of {', '.join(PREFILTERS)} or 'module:function'.")
+    return getattr(importlib.import_module(module_name), attribute)
+
+def score_image(scorer: Scorer, image_data: bytes) -> float:
+    """
+    Score encoded image data on a downscaled copy.
+
+    Args:
+        scorer: The scorer function
+        image_data: The binary image data
+
+    Returns:
+        float: The scorer's result
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_data))
+    # draft() lets JPEG decode straight to a reduced size, which is most of the saving
+    image.draft('RGB', (SCORING_SIZE, SCORING_SIZE))
+    image.thumbnail((SCORING_SIZE, SCORING_SIZE))
+    return float(scorer(image))
+
+def prefilter_options(config: Any) -> Dict[str, Optional[Any]]:
+    """
+    Map the PREFILTER_* settings of an app config to process_image_batch arguments.
+
+    Args:
+        config: The app config
+
+    Returns:
+        Dict[str, Optional[Any]]: prefilter (None when disabled) and prefilter_threshold
+    """
+    name = config.get('PREFILTER')
+    return {
+        'prefilter': load_scorer(name) if name else None,
+        'prefilter_threshold': config.get('PREFILTER_THRESHOLD', 0.0)
+    }
@@ -0,0 +1,226 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from flask import request
+
+# Profiling modes: never, for requests carrying the PROFILE_HEADER, or for every request
+MODES = ('off', 'header', 'all')
+
+# Request header that asks for a profile in 'header' mode
+PROFILE_HEADER = 'X-Profile'
+
+# Profile files are named <timestamp>-<kind>-<label>.prof, which sort oldest first
+_NAME_PATTERN = re.compile(r'^(\d{8}T\d{6}\.\d{6})-(request|job)-([\w.-]+)\.prof$')
+
+class _Collector:
+    """The per-thread profiles of one profiled request or job."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profiles: List[cProfile.Profile] = []
+
+    def add(self, profile: cProfile.Profile):
+        with self._lock:
+            self.profiles.append(profile)
+
+    def stats(self) -> pstats.Stats:
+        with self._lock:
+            first, *others = self.profiles
+            stats = pstats.Stats(first)
+            for profile in others:
+                stats.add(profile)
+        return stats
+
+# The profile the current context's work is added to, if it is being profiled
+_collector: ContextVar[Optional[_Collector]] = ContextVar('profile_collector', default=None)
+
+def profiled_call(function: Callable[..., Any], *args: Any) -> Any:
+    """
+    Call function, profiling it into the current profile if there is one.
+
+    The scheduler's workers make their calls through this, so a profiled job
+    includes the time its model calls spend on other threads.
+    """
+    collector = _collector.get()
+    if collector is None:
+        return function(*args)
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        return function(*args)
+    finally:
+        profile.disable()
+        collector.add(profile)
+
+class Profiler:
+    """
+    Opt-in deterministic profiling of requests and background jobs.
+
+    In 'header' mode a request is profiled when it carries X-Profile equal to
+    `token`; in 'all' mode every request is. A background job
+    is profiled when the request that submitted it was. Each profile is saved
+    as a cProfile stats file in `directory`, which keeps the newest `keep`
+    files. In 'off' mode no hooks are installed and nothing is checked.
+    """
+
+    def __init__(self, mode: str = 'off', directory: str = 'data/profiles', keep: int = 50,
+                 token: Optional[str] = None):
+        self.mode = mode
+        self.directory = directory
+        self.keep = keep
+        self.token = token
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'off'
+
+    def wants_request(self) -> bool:
+        """Return whether the current request should be profiled."""
+        if self.mode == 'all':
+            return True
+        value = request.headers.get(PROFILE_HEADER)
+        return self.mode == 'header' and bool(value) and self.authorized(value)
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """Return whether token grants access to profiling; none does when no token is configured."""
+        return bool(self.token) and hmac.compare_digest(token or '', self.token)
+
+    def job_requested(self) -> bool:
+        """Return whether a job submitted now should be profiled: the current request is."""
+        return self.enabled and _collector.get() is not None
+
+    @contextmanager
+    def profile(self, kind: str, label: str) -> Iterator[None]:
+        """
+        Profile the current thread, and calls made through profiled_call, and save the result.
+
+        Args:
+            kind: 'request' or 'job'
+            label: E.g. the endpoint or the job's function and ID
+        """
+        collector = _Collector()
+        token = _collector.set(collector)
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            _collector.reset(token)
+            collector.add(profile)
+            self.save(collector.stats(), kind, label)
+
+    def save(self, stats: pstats.Stats, kind: str, label: str) -> str:
+        """
+        Write a profile into the ring, dropping the oldest beyond `keep`.
+
+        Returns:
+            str: The profile's file name
+        """
+        now = time.time()
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.localtime(now)) + f'.{int(now % 1 * 1e6):06d}'
+        label = re.sub(r'[^\w.-]+', '_', label)[:80]
+        name = f'{stamp}-{kind}-{label}.prof'
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            stats.dump_stats(os.path.join(self.directory, name))
+            for stale in [entry['name'] for entry in self.list()][self.keep:]:
+                try:
+                    os.remove(os.path.join(self.directory, stale))
+                except OSError:
+                    pass
+        return name
+
+    def list(self) -> List[Dict[str, Any]]:
+        """
+        List the stored profiles, newest first.
+
+        Returns:
+            List[Dict[str, Any]]: 'name', 'kind', 'label', 'created' (ISO time) and 'bytes'
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            match = _NAME_PATTERN.match(name)
+            if not match:
+                continue
+            stamp, kind, label = match.groups()
+            try:
+                size = os.path.getsize(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            created = time.strftime('%Y-%m-%dT%H:%M:%S', time.strptime(stamp[:15], '%Y%m%dT%H%M%S'))
+            profiles.append({'name': name, 'kind': kind, 'label': label, 'created': created, 'bytes': size})
+        return profiles
+
+    def path(self, name: str) -> Optional[str]:
+        """Return the path of a stored profile, or None for names that are not profiles."""
+        if not _NAME_PATTERN.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+def profile_text(path: str, limit: int = 60) -> str:
+    """
+    Render a stored profile as pstats text, sorted by cumulative time.
+
+    Args:
+        path: The profile file
+        limit: Functions listed
+
+    Returns:
+        str: The report
+    """
+    output = io.StringIO()
+    pstats.Stats(path, stream=output).sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+# The process's profiler; configured from the PROFILING_* settings by init_app
+profiler = Profiler()
+
+def init_app(app):
+    """
+    Configure the profiler from the app's PROFILING_* settings.
+
+    The request hooks are only installed when profiling is enabled, which
+    requires a PROFILING_TOKEN: the profiles and the admin endpoints serving them
+    are never open to any client.
+
+    Args:
+        app: The Flask application
+    """
+    mode = app.config.get('PROFILING_MODE', 'off')
+    if mode not in MODES:
+        raise ValueError(f"PROFILING_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+    if mode != 'off' and not app.config.get('PROFILING_TOKEN'):
+        raise ValueError(f"PROFILING_MODE {mode!r} requires a PROFILING_TOKEN")
+    profiler.mode = mode
+    profiler.directory = app.config.get('PROFILING_DIR', 'data/profiles')
+    profiler.keep = app.config.get('PROFILING_KEEP', 50)
+    profiler.token = app.config.get('PROFILING_TOKEN') or None
+    app.extensions['profiler'] = profiler
+    if not profiler.enabled:
+        return
+
+    @app.before_request
+    def start_request_profile():
+        if profiler.wants_request():
+            request_profile = profiler.profile('request', request.endpoint or 'unknown')
+            request_profile.__enter__()
+            request.environ['profiling.profile'] = request_profile
+
+    @app.teardown_request
+    def finish_request_profile(error=None):
+        request_profile = request.environ.pop('profiling.profile', None)
+        if request_profile is not None:
+            request_profile.__exit__(None, None, None)
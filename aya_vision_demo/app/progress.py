@@ -0,0 +1,204 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Per-image states kept in JobProgress.states
+PENDING = 0
+RUNNING = 1
+DONE = 2
+
+# Finished images averaged for the rolling latency
+LATENCY_WINDOW = 20
+
+# Statuses after which a job does no more work
+FINISHED_STATUSES = ('complete', 'error', 'cancelled')
+
+class JobCancelled(Exception):
+    """Raised inside a job's background work once the job has been cancelled."""
+
+class JobProgress(dict):
+    """
+    Progress entry of one analysis job, safe to update from the worker threads.
+
+    It is the job's dict in analysis_progress or enhanced_analysis_progress, so
+    fields such as 'status', 'result_id' or 'partials' are set on it as before.
+    The counters are different: workers report through start_image and
+    finish_image, which update a per-image state map and the counts under the
+    entry's own lock, so images finishing out of order can never make progress
+    go backwards or reach 100% early. The counter fields of the dict itself
+    ('completed', 'percent', 'current_file' and the throughput figures) are only
+    republished every few images; status endpoints read snapshot(), which is
+    always current.
+
+    Status changes go through set_status() (or cancel()), which take the same
+    lock, so they are never interleaved with a cancel or a snapshot. cancel()
+    sets the cancelled event, which the batch functions check before starting
+    each image.
+    """
+
+    def __init__(self, total: int = 0, publish_every: int = 5, publish_interval: float = 1.0, **fields: Any):
+        super().__init__(status='initialized', current_file='', **fields)
+        self.publish_every = publish_every
+        self.publish_interval = publish_interval
+        self._lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.start(total)
+
+    def start(self, total: int):
+        """
+        (Re)start counting, e.g. once videos are expanded and the image count is known.
+
+        Args:
+            total: Number of images in the job
+        """
+        with self._lock:
+            self.total = total
+            self.states = bytearray(total)
+            self.completed = 0
+            self.running = 0
+            self.current_file = ''
+            self.started_at = time.monotonic()
+            self.latencies = deque(maxlen=LATENCY_WINDOW)
+            self._image_started: Dict[int, float] = {}
+            self._published_count = 0
+            self._published_at = 0.0
+            self._publish()
+
+    def start_image(self, index: int):
+        """Mark an image as picked up by a worker."""
+        with self._lock:
+            if index < len(self.states) and self.states[index] == PENDING:
+                self.states[index] = RUNNING
+                self.running += 1
+                self._image_started[index] = time.monotonic()
+
+    def finish_image(self, index: int, filename: str = ''):
+        """
+        Mark an image as finished; usable directly as a progress_callback.
+
+        Reporting the same image twice counts it once.
+
+        Args:
+            index: Position of the image in the job
+            filename: Name of the image, shown as the current file
+        """
+        now = time.monotonic()
+        with self._lock:
+            if index >= len(self.states) or self.states[index] == DONE:
+                return
+            if self.states[index] == RUNNING:
+                self.running -= 1
+                self.latencies.append(now - self._image_started.pop(index))
+            self.states[index] = DONE
+            self.completed += 1
+            self.current_file = filename
+            if (self.completed - self._published_count >= self.publish_every
+                    or now - self._published_at >= self.publish_interval
+                    or self.completed == self.total):
+                self._publish()
+
+    __call__ = finish_image
+
+    def set_status(self, status: str, **fields: Any) -> bool:
+        """
+        Change the job's status, together with any fields that go with it, and publish the counters.
+
+        A finished job keeps its status, so a cancel that lands just before the
+        background work marks the job as processing is not overwritten.
+
+        Args:
+            status: The new status, e.g. 'processing' or 'complete'
+            **fields: Fields set along with it, e.g. error='...'
+
+        Returns:
+            bool: Whether the status was changed
+        """
+        with self._lock:
+            if self.get('status') in FINISHED_STATUSES:
+                return False
+            self.update(fields)
+            self['status'] = status
+            self._publish()
+            return True
+
+    def cancel(self) -> bool:
+        """
+        Cancel the job unless it has already finished.
+
+        Images not yet started are skipped; calls in flight are left to return and
+        their results discarded.
+
+        Returns:
+            bool: Whether the job was cancelled by this call
+        """
+        with self._lock:
+            if self.get('status') in FINISHED_STATUSES:
+                return False
+            self.cancelled.set()
+            self['status'] = 'cancelled'
+            self._publish()
+            return True
+
+    def check_cancelled(self):
+        """Raise JobCancelled if the job has been cancelled."""
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+    def _counters(self) -> Dict[str, Any]:
+        """The counter fields; the caller holds the lock."""
+        elapsed = time.monotonic() - self.started_at
+        rate = self.completed / elapsed if self.completed and elapsed > 0 else None
+        remaining = self.total - self.completed
+        if self.get('status') == 'complete':
+            percent = 100
+        else:
+            percent = int(self.completed * 100 / self.total) if self.total else 0
+        return {
+            'total': self.total,
+            'completed': self.completed,
+            'running': self.running,
+            'percent': percent,
+            'current_file': self.current_file,
+            'images_per_second': round(rate, 3) if rate else None,
+            'latency': round(sum(self.latencies) / len(self.latencies), 3) if self.latencies else None,
+            'eta_seconds': round(remaining / rate, 1) if rate and remaining else (0 if rate else None),
+            'elapsed': round(elapsed, 3)
+        }
+
+    def _publish(self):
+        self.update(self._counters())
+        self._published_count = self.completed
+        self._published_at = time.monotonic()
+
+    def publish(self):
+        """Write the current counters into the dict, e.g. before logging it."""
+        with self._lock:
+            self._publish()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return a copy of the entry with up-to-date counters.
+
+        Returns:
+            Dict[str, Any]: The entry's fields plus 'running', 'images_per_second',
+            'latency' (rolling mean seconds per image), 'eta_seconds' and 'elapsed'
+        """
+        with self._lock:
+            data = dict(self)
+            data.update(self._counters())
+        return data
+
+def progress_snapshot(progress_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Read a progress entry, with fresh counters if it is a JobProgress.
+
+    Args:
+        progress_data: An entry of a progress store, or None
+
+    Returns:
+        Dict[str, Any]: A copy of the entry, or an empty dict
+    """
+    if isinstance(progress_data, JobProgress):
+        return progress_data.snapshot()
+    return dict(progress_data or {})
@@ -0,0 +1,102 @@
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from app.models import DetectionRecord, ResultSet
+from app.pagination import ResultIndex
+
+# (model name, prompt) identifying one classification of a batch
+RunKey = Tuple[str, str]
+
+def batch_runs(batch_data: Dict[str, Any]) -> Dict[RunKey, Dict[str, DetectionRecord]]:
+    """
+    Return the per-prompt record cache of a stored batch, seeding it with the current run.
+
+    The cache maps (model, prompt) to the records computed under it, keyed by image
+    ID. Records share their image bytes, so each cached run costs only its results.
+
+    Args:
+        batch_data: An entry of results_storage
+
+    Returns:
+        Dict[RunKey, Dict[str, DetectionRecord]]: The cache, stored in batch_data['runs']
+    """
+    runs = batch_data.setdefault('runs', {})
+    if batch_data.get('prompt'):
+        current_key = (batch_data.get('model'), batch_data['prompt'])
+        if current_key not in runs:
+            runs[current_key] = {record.id: record for record in batch_data['results']}
+    return runs
+
+def forget_images(batch_data: Dict[str, Any], image_ids: List[str]):
+    """Drop deleted images from every cached run so a re-run cannot bring them back."""
+    for records in batch_data.get('runs', {}).values():
+        for image_id in image_ids:
+            records.pop(image_id, None)
+
+def rerun_batch(
+    batch_data: Dict[str, Any],
+    model_name: str,
+    prompt: str,
+    subject: str,
+    classify: Callable[[List[DetectionRecord]], List[DetectionRecord]]
+) -> Dict[str, Any]:
+    """
+    Re-classify a stored batch under a new prompt, calling the model only where needed.
+
+    Images already classified under (model_name, prompt) reuse the cached record;
+    only the rest, and those whose classification failed, are passed to classify. The batch's results and index are then
+    replaced, and the detections that changed are recorded as batch_data['rerun'].
+
+    Args:
+        batch_data: An entry of results_storage
+        model_name: The model to classify with
+        prompt: The detection prompt
+        subject: The detection subject
+        classify: Classifies records again, e.g. a partial of reclassify_records
+
+    Returns:
+        Dict[str, Any]: The re-run summary, with the flipped detections in 'changed'
+    """
+    runs = batch_runs(batch_data)
+    previous_prompt = batch_data.get('prompt')
+    before = batch_data['results'].snapshot()
+    cached = runs.setdefault((model_name, prompt), {})
+
+    # Failed classifications are retried rather than reused
+    pending = [record for record in before if not getattr(cached.get(record.id), 'success', False)]
+    for record in classify(pending):
+        cached[record.id] = record
+
+    # Leave out images deleted while the re-run was in progress
+    current = batch_data['results']
+    after = [cached[record.id] for record in before if record.id in current]
+    changed = [
+        {
+            'id': new.id,
+            'filename': new.filename,
+            'before': old.detection_result,
+            'after': new.detection_result
+        }
+        for old, new in zip(before, (cached[record.id] for record in before))
+        if old.id in current and old.detection_result != new.detection_result
+    ]
+
+    results = ResultSet(after)
+    summary = {
+        'previous_prompt': previous_prompt,
+        'prompt': prompt,
+        'previous_subject': batch_data.get('subject'),
+        'subject': subject,
+        'reused': len(before) - len(pending),
+        'analyzed': len(pending),
+        'changed': changed,
+        'completed_at': time.time()
+    }
+    batch_data.update({
+        'results': results,
+        'index': ResultIndex(results),
+        'prompt': prompt,
+        'model': model_name,
+        'subject': subject,
+        'rerun': summary
+    })
+    return summary
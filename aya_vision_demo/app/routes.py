@@ -3,15 +3,28 @@ import os
 import uuid
 import time
 import re
+import json
 from flask import (
     Blueprint, render_template, request, redirect, 
-    url_for, flash, current_app, session, jsonify
+    url_for, flash, current_app, session, jsonify, Response, stream_with_context, g, send_file
 )
 from werkzeug.utils import secure_filename
 from app.forms import ImageUploadForm, SettingsForm, EnhancedAnalysisForm
+from app.models import EnhancedRecord, ResultSet
+from app.admission import Overloaded
+from app.export import EXPORT_FORMATS, iter_results_csv, iter_results_jsonl, iter_results_zip
+from app.pagination import ResultIndex, parse_page_args
+from app.profiling import profile_text, profiler
+from app.progress import FINISHED_STATUSES, JobCancelled, JobProgress, progress_snapshot
+from app.rerun import forget_images, rerun_batch
+from app.tracing import critical_path, otlp_trace_id, tracer, waterfall
+from app import thumbnails
 from app.utils import (
-    is_valid_file_extension, process_image_batch, process_enhanced_analysis
+    is_valid_file_extension, process_image_batch, process_enhanced_analysis, detection_options,
+    reclassify_records, model_calls, usage_ledger
 )
+from app.usage import add_usage
+from app.video import expand_videos, frame_budget
 
 # Create a blueprint for the main routes
 main_bp = Blueprint('main', __name__)
@@ -28,6 +41,12 @@ DEFAULT_INITIAL_PROMPT = "Is a flare burning in this image? Answer with only 'tr
 DEFAULT_ENHANCED_PROMPT = "Describe in detail what you see in this image, focusing on [subject]. Provide information about its appearance, surroundings, and any notable characteristics."
 DEFAULT_SUBJECT = "Flare"
 
+# Seconds between checks for new text in the enhanced analysis event streams
+STREAM_POLL_INTERVAL = 0.25
+
+# Throughput fields of a JobProgress snapshot passed on by the progress endpoints
+THROUGHPUT_FIELDS = ('running', 'images_per_second', 'latency', 'eta_seconds')
+
 # Helper function to check if a word is already plural
 def get_plural_suffix(word):
     """
@@ -65,6 +84,262 @@ def get_plural_suffix(word):
     
     return 's'
 
+def allowed_upload_extensions():
+    """
+    File extensions accepted by the upload form and the analyze API.
+    
+    Returns:
+        list: Image extensions followed by video extensions
+    """
+    return current_app.config['UPLOAD_EXTENSIONS'] + current_app.config['VIDEO_EXTENSIONS']
+
+def get_result_index(batch_data):
+    """
+    Return the precomputed ResultIndex for a stored batch, building it if needed.
+    
+    Indexes are cached on the batch and rebuilt when the batch changes size.
+    Batches that are still streaming are indexed per request and not cached.
+    
+    Args:
+        batch_data (dict): An entry of results_storage or enhanced_results_storage
+        
+    Returns:
+        ResultIndex: The index for the batch's results
+    """
+    results = batch_data['results']
+    index = batch_data.get('index')
+    if index is None or index.size != len(results):
+        index = ResultIndex(results)
+        if not batch_data.get('streaming'):
+            batch_data['index'] = index
+    return index
+
+def paginate_batch(batch_data, preference_key=None):
+    """
+    Apply the request's filter, sort and paging parameters to a stored batch.
+    
+    Args:
+        batch_data (dict): An entry of results_storage or enhanced_results_storage
+        preference_key (str): Session key used to remember the filter and sort, if any
+        
+    Returns:
+        dict: filter, sort, page, per_page, offset, next_offset, total, pages,
+            counts and the page's records as items
+    """
+    saved = session.get(preference_key, {}) if preference_key else {}
+    page_args = parse_page_args(
+        request.args,
+        current_app.config['RESULTS_PER_PAGE'],
+        current_app.config['MAX_RESULTS_PER_PAGE'],
+        defaults=saved
+    )
+    if preference_key:
+        session[preference_key] = {'filter': page_args['filter'], 'sort': page_args['sort']}
+    
+    index = get_result_index(batch_data)
+    page_info = index.page(
+        page_args['filter'], page_args['sort'], page_args['page'], page_args['per_page'], page_args['offset']
+    )
+    results = batch_data['results']
+    
+    return {
+        'filter': page_args['filter'],
+        'sort': page_args['sort'],
+        'page': page_info['page'],
+        'per_page': page_info['per_page'],
+        'offset': page_info['offset'],
+        'next_offset': page_info['next_offset'],
+        'total': page_info['total'],
+        'pages': page_info['pages'],
+        'counts': results.counts_snapshot(),
+        # An image deleted after the page was sliced is simply left out
+        'items': [r for r in map(results.get, page_info['ids']) if r is not None]
+    }
+
+def paginated_json(pagination, subject, batch_id):
+    """
+    Format a paginate_batch result as a JSON-serializable API payload.
+    
+    Each result carries the URLs of its thumbnail and full image; base64
+    thumbnails are included only when the 'thumbnails' query parameter is true.
+    
+    Args:
+        pagination (dict): The result of paginate_batch
+        subject (str): The detection subject of the batch
+        batch_id (str): The ID of the batch in results_storage or enhanced_results_storage
+        
+    Returns:
+        dict: The API payload
+    """
+    include_thumbnails = request.args.get('thumbnails') == 'true'
+    items = []
+    for record in pagination['items']:
+        item = record.to_dict(include_images=False)
+        item['thumbnail_url'] = url_for('main.thumbnail', batch_id=batch_id, image_id=record.id)
+        item['image_url'] = url_for('main.full_image', batch_id=batch_id, image_id=record.id)
+        if include_thumbnails:
+            item['thumbnail'] = record.thumbnail
+            item['thumbnail_mime_type'] = record.thumbnail_mime_type
+        items.append(item)
+    
+    return {
+        'results': items,
+        'subject': subject,
+        'filter': pagination['filter'],
+        'sort': pagination['sort'],
+        'page': pagination['page'],
+        'per_page': pagination['per_page'],
+        'offset': pagination['offset'],
+        'next_offset': pagination['next_offset'],
+        'total': pagination['total'],
+        'pages': pagination['pages'],
+        'counts': pagination['counts']
+    }
+
+@main_bp.app_template_global()
+def page_url(**changes):
+    """
+    Build a URL for the current view with some query parameters replaced.
+    
+    Returns:
+        str: The URL
+    """
+    args = request.args.to_dict()
+    args.update(changes)
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+def cancel_job(job_id):
+    """
+    Cancel a running job of either progress store.
+    
+    Args:
+        job_id (str): A job or progress ID
+        
+    Returns:
+        tuple: (the job's progress entry or None, whether it was cancelled now)
+    """
+    for store in (analysis_progress, enhanced_analysis_progress):
+        progress_data = store.get(job_id)
+        if progress_data is not None:
+            queued = progress_data.get('status') == 'queued'
+            cancelled = isinstance(progress_data, JobProgress) and progress_data.cancel()
+            if cancelled:
+                current_app.logger.info(f"Cancelled job {job_id}")
+                # An enhanced analysis that never started has no background job left to finalize its results
+                if queued and store is enhanced_analysis_progress:
+                    for enhanced_id, enhanced_data in list(enhanced_results_storage.items()):
+                        if enhanced_data.get('progress_id') == job_id and enhanced_data.get('streaming'):
+                            cancel_enhanced_results(enhanced_id)
+            return progress_data, cancelled
+    return None, False
+
+def cancel_enhanced_results(enhanced_id, finished=()):
+    """
+    Finalize the seeded results of a cancelled enhanced analysis.
+    
+    Images whose analysis finished keep it; the rest, including any text streamed
+    so far, become failed records with the error 'cancelled', so the results
+    pages, API and exports do not present them as complete analyses.
+    
+    Args:
+        enhanced_id (str): The ID of the analysis in enhanced_results_storage
+        finished (list): The analysis's finished records; None entries are skipped images
+    """
+    seeded = enhanced_results_storage.get(enhanced_id)
+    if seeded is None:
+        return
+    finished = {record.id: record for record in finished if record is not None}
+    results = ResultSet(
+        finished.get(record.id) or EnhancedRecord(source=record.source, error='cancelled')
+        for record in seeded['results'].snapshot()
+    )
+    seeded.update(results=results, index=ResultIndex(results), streaming=False, status='cancelled')
+
+def supersede_session_job(session_key):
+    """Cancel the job whose ID is stored in the session under session_key, as a new one replaces it."""
+    previous_id = session.get(session_key)
+    if previous_id:
+        _, cancelled = cancel_job(previous_id)
+        if cancelled:
+            current_app.logger.info(f"Cancelled superseded job {previous_id}")
+
+def overloaded_response(error):
+    """
+    Build the 503 response for a submission refused by admission control.
+    
+    Args:
+        error (Overloaded): The refusal
+        
+    Returns:
+        flask.Response: JSON error with a Retry-After header
+    """
+    current_app.logger.warning(f"Refused a submission: {error}")
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def admission():
+    """The app's AdmissionController."""
+    return current_app.extensions['admission']
+
+def submit_job(store, job_id, progress, image_count, target, args):
+    """
+    Register a job's progress entry and hand the job to admission control in the client's flow.
+    
+    Args:
+        store (dict): analysis_progress or enhanced_analysis_progress
+        job_id (str): The job or progress ID
+        progress (JobProgress): The job's progress entry
+        image_count (int): The most images the job can analyze, charged against the admission limit
+        target: Runs the job in the background
+        args (tuple): Arguments for target
+        
+    Raises:
+        Overloaded: If the job is refused; its progress entry is removed again
+    """
+    store[job_id] = progress
+    try:
+        admission().submit(job_id, progress, image_count, target, args, flow=client_flow())
+    except Overloaded:
+        store.pop(job_id, None)
+        raise
+
+def trace_request(job_id, **attributes):
+    """
+    Record the handling of the current request, up to now, as a span of a job's trace.
+    
+    Args:
+        job_id (str): The job the request submits
+        **attributes: Span attributes
+    """
+    started_ns = g.get('request_started_ns') or time.time_ns()
+    tracer.record(f"routes.{request.endpoint.split('.')[-1]}", started_ns, trace_key=job_id, **attributes)
+
+def trace_url(job_id):
+    """Return the waterfall URL of a job's trace, or None if none is kept."""
+    if job_id and job_id in tracer:
+        return url_for('main.job_trace', job_id=job_id)
+    return None
+
+def client_flow():
+    """
+    Identify the client of the current request, whose batches share the model fairly with other clients'.
+    
+    An X-Client-Id header names the client explicitly; browsers are told apart
+    by an ID kept in their session, and other API callers by their address.
+    
+    Returns:
+        str: The client's flow key
+    """
+    client_id = request.headers.get('X-Client-Id')
+    if client_id:
+        return f"client:{client_id}"
+    if current_app.config['SESSION_COOKIE_NAME'] in request.cookies:
+        return f"session:{session.setdefault('client_id', uuid.uuid4().hex)}"
+    return f"addr:{request.remote_addr}"
+
 @main_bp.route('/', methods=['GET', 'POST'])
 def index():
     """
@@ -106,8 +381,8 @@ def index():
             if file.filename == '':
                 continue
                 
-            if not is_valid_file_extension(file.filename, current_app.config['UPLOAD_EXTENSIONS']):
-                error_msg = f"File {file.filename} has an invalid extension. Allowed extensions: {', '.join(current_app.config['UPLOAD_EXTENSIONS'])}"
+            if not is_valid_file_extension(file.filename, allowed_upload_extensions()):
+                error_msg = f"File {file.filename} has an invalid extension. Allowed extensions: {', '.join(allowed_upload_extensions())}"
                 if is_ajax:
                     return jsonify({'error': error_msg}), 400
                 flash(error_msg, 'error')
@@ -141,15 +416,25 @@ def index():
             result_id = str(uuid.uuid4())
             progress_id = str(uuid.uuid4())
             
-            # Initialize progress tracking
-            analysis_progress[progress_id] = {
-                'total': len(valid_files),
-                'completed': 0,
-                'status': 'initialized',  # Initialize with 'initialized' status
-                'percent': 0
-            }
+            # Initialize progress tracking, and start background processing or queue it behind the
+            # batches already running; a refused batch leaves the session's earlier one in place
+            progress = JobProgress(total=len(valid_files))
+            if is_ajax:
+                trace_request(progress_id, images=len(valid_files))
+                try:
+                    submit_job(
+                        analysis_progress, progress_id, progress, frame_budget(valid_files, current_app.config),
+                        process_image_batch_background,
+                        (current_app._get_current_object(), valid_files, current_app.config['COHERE_API_KEY'],
+                         current_app.config['MODEL_NAME'], custom_prompt, progress_id, result_id, subject)
+                    )
+                except Overloaded as e:
+                    return overloaded_response(e)
+            else:
+                analysis_progress[progress_id] = progress
             
-            # Store IDs in the session
+            # Store IDs in the session; a batch still running from an earlier upload is no longer wanted
+            supersede_session_job('progress_id')
             session['result_id'] = result_id
             session['progress_id'] = progress_id
             current_app.logger.info(f"Created new initial analysis progress ID: {progress_id}")
@@ -179,18 +464,7 @@ def index():
                 
                 # Final confirmation log of the complete response
                 current_app.logger.info(f"Sending immediate initial analysis response: {response_data}")
-                
-                # Start background processing
-                import threading
-                thread = threading.Thread(
-                    target=process_image_batch_background,
-                    args=(current_app._get_current_object(), valid_files, current_app.config['COHERE_API_KEY'], 
-                          current_app.config['MODEL_NAME'], custom_prompt, progress_id, result_id, subject)
-                )
-                thread.daemon = True  # Daemonize thread to avoid blocking app shutdown
-                thread.start()
-                
-                current_app.logger.info(f"Started background processing thread for progress ID: {progress_id}")
+                current_app.logger.info(f"Submitted background processing for progress ID: {progress_id}")
                 
                 # Set cache-control headers to ensure the response isn't cached
                 response = jsonify(response_data)
@@ -274,16 +548,23 @@ def results():
     enhanced_result_id = session.get('enhanced_result_id')
     has_enhanced_results = enhanced_result_id in enhanced_results_storage
     
-    # Count positive detections to determine if enhanced analysis is possible
-    positive_detections = sum(1 for r in results if r['detection_result'] is True)
-    can_perform_enhanced_analysis = positive_detections > 0
+    pagination = paginate_batch(result_data, preference_key='results_view')
+    
+    # Positive detections determine if enhanced analysis is possible
+    can_perform_enhanced_analysis = pagination['counts']['detected'] > 0
     
     return render_template(
         'results.html', 
-        results=results, 
+        pagination=pagination, 
         subject=subject, 
+        result_id=result_id,
         has_enhanced_results=has_enhanced_results,
-        can_perform_enhanced_analysis=can_perform_enhanced_analysis
+        can_perform_enhanced_analysis=can_perform_enhanced_analysis,
+        videos=result_data.get('videos', []),
+        rerun=result_data.get('rerun'),
+        trace_url=trace_url(result_data.get('rerun_job') or result_data.get('job_id')),
+        usage=result_data.get('usage'),
+        session_usage=usage_ledger.session(client_flow())
     )
 
 @main_bp.route('/enhanced-analysis', methods=['GET', 'POST'])
@@ -307,7 +588,7 @@ def enhanced_analysis():
         return redirect(url_for('main.index'))
     
     # Filter for positive detections only
-    positive_results = [r for r in results if r['detection_result'] is True]
+    positive_results = [r for r in results if r.detection_result is True]
     
     if not positive_results:
         flash("No positive detections found. Enhanced analysis requires at least one positive detection.", 'warning')
@@ -323,17 +604,17 @@ def enhanced_analysis():
         # Log the current session values before clearing
         current_app.logger.info(f"BEFORE CLEARING - enhanced_result_id: {session.get('enhanced_result_id', 'None')}, enhanced_progress_id: {session.get('enhanced_progress_id', 'None')}")
         
+        # Stop the previous analysis if it is still running, then clear its progress data
+        supersede_session_job('enhanced_progress_id')
+        previous_id = session.get('enhanced_progress_id')
+        if previous_id in enhanced_analysis_progress:
+            current_app.logger.info(f"Clearing progress data for previous ID: {previous_id}")
+            del enhanced_analysis_progress[previous_id]
+        
         # Explicitly remove the IDs from the session - using pop with None default to ensure they're removed even if not present
         session.pop('enhanced_result_id', None)
         session.pop('enhanced_progress_id', None)
         
-        # Additional step: directly clear the values in enhanced_analysis_progress
-        if 'enhanced_progress_id' in session:
-            previous_id = session['enhanced_progress_id']
-            if previous_id in enhanced_analysis_progress:
-                current_app.logger.info(f"Clearing progress data for previous ID: {previous_id}")
-                del enhanced_analysis_progress[previous_id]
-        
         # Force the session to update immediately
         session.modified = True
         
@@ -344,13 +625,7 @@ def enhanced_analysis():
     enhanced_result_id = session.get('enhanced_result_id')
     if enhanced_result_id in enhanced_results_storage and not is_new_analysis:
         # Display existing enhanced results
-        enhanced_data = enhanced_results_storage[enhanced_result_id]
-        return render_template(
-            'enhanced_results.html',
-            results=enhanced_data.get('results', []),
-            subject=enhanced_data.get('subject', subject),
-            prompt=enhanced_data.get('prompt', '')
-        )
+        return render_enhanced_results(enhanced_result_id, subject)
     
     # Initialize the form with the default enhanced prompt
     default_prompt = session.get('custom_enhanced_prompt', DEFAULT_ENHANCED_PROMPT)
@@ -364,7 +639,7 @@ def enhanced_analysis():
             # Check if this is an AJAX request
             is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
             
-            # Get selected images indices from the form
+            # Get selected image IDs from the form
             selected_images_str = request.form.get('selected_images', '')
             
             # If no images are selected, use all positive results
@@ -372,16 +647,10 @@ def enhanced_analysis():
                 images_to_analyze = positive_results
                 current_app.logger.info("No specific images selected, analyzing all positive results")
             else:
-                # Parse the selected image indices
-                try:
-                    selected_indices = [int(idx) for idx in selected_images_str.split(',') if idx]
-                    # Filter the positive results based on selected indices
-                    images_to_analyze = [positive_results[idx] for idx in selected_indices if 0 <= idx < len(positive_results)]
-                    current_app.logger.info(f"Analyzing {len(images_to_analyze)} selected images out of {len(positive_results)} positive results")
-                except (ValueError, IndexError) as e:
-                    current_app.logger.error(f"Error parsing selected images: {str(e)}")
-                    images_to_analyze = positive_results
-                    current_app.logger.info("Falling back to analyzing all positive results")
+                # Filter the positive results based on the selected IDs
+                selected_ids = {image_id for image_id in selected_images_str.split(',') if image_id}
+                images_to_analyze = [r for r in positive_results if r.id in selected_ids]
+                current_app.logger.info(f"Analyzing {len(images_to_analyze)} selected images out of {len(positive_results)} positive results")
             
             # Check if we have any images to analyze
             if not images_to_analyze:
@@ -394,6 +663,7 @@ def enhanced_analysis():
                     form=form, 
                     subject=subject, 
                     results=positive_results,
+                    result_id=result_id,
                     total_count=len(results),
                     detected_count=len(positive_results)
                 )
@@ -403,24 +673,51 @@ def enhanced_analysis():
             enhanced_id = str(uuid.uuid4())
             progress_id = str(uuid.uuid4())
             
+            # Store the form data for background processing
+            prompt = form.custom_prompt.data
+            
             # IMPORTANT: Initialize progress tracking before starting processing
-            enhanced_analysis_progress[progress_id] = {
-                'total': len(images_to_analyze),
-                'completed': 0,
-                'current_file': '',
-                'status': 'initialized',  # New status to indicate it's just starting
-                'percent': 0
-            }
+            progress = JobProgress(total=len(images_to_analyze))
+            if is_ajax:
+                # Seed the enhanced results with empty analyses so the results view
+                # can render immediately and fill in text as it streams
+                progress['partials'] = [''] * len(images_to_analyze)
+                progress['image_ids'] = [image.id for image in images_to_analyze]
+                enhanced_results_storage[enhanced_id] = {
+                    'results': ResultSet(
+                        EnhancedRecord(source=image, enhanced_analysis='', success=True)
+                        for image in images_to_analyze
+                    ),
+                    'subject': subject,
+                    'prompt': prompt,
+                    'result_id': result_id,
+                    'streaming': True,
+                    'progress_id': progress_id
+                }
+                
+                # Start background processing, or queue it behind the batches already running;
+                # a refused analysis leaves the session's earlier one in place
+                trace_request(progress_id, images=len(images_to_analyze))
+                try:
+                    submit_job(
+                        enhanced_analysis_progress, progress_id, progress, len(images_to_analyze),
+                        process_enhanced_analysis_background,
+                        (current_app._get_current_object(), images_to_analyze, current_app.config['COHERE_API_KEY'],
+                         current_app.config['MODEL_NAME'], prompt, progress_id, enhanced_id, subject, result_id)
+                    )
+                except Overloaded as e:
+                    enhanced_results_storage.pop(enhanced_id, None)
+                    return overloaded_response(e)
+            else:
+                enhanced_analysis_progress[progress_id] = progress
             
-            # Store the enhanced result ID and progress ID in the session
+            # Store the enhanced result ID and progress ID in the session, cancelling any analysis they replace
+            supersede_session_job('enhanced_progress_id')
             session['enhanced_result_id'] = enhanced_id
             session['enhanced_progress_id'] = progress_id
             current_app.logger.info(f"Created new progress ID: {progress_id}")
             current_app.logger.info(f"Stored progress ID in session: {progress_id}")
             
-            # Store the form data for background processing
-            prompt = form.custom_prompt.data
-            
             # If this is an AJAX request, return immediately with the progress ID
             if is_ajax:
                 current_app.logger.info(f"Returning progress ID to client immediately: {progress_id}")
@@ -439,18 +736,7 @@ def enhanced_analysis():
                 
                 # Final confirmation log of the complete response
                 current_app.logger.info(f"Sending immediate enhanced analysis response: {response_data}")
-                
-                # Start background processing
-                import threading
-                thread = threading.Thread(
-                    target=process_enhanced_analysis_background,
-                    args=(current_app._get_current_object(), images_to_analyze, current_app.config['COHERE_API_KEY'], 
-                          current_app.config['MODEL_NAME'], prompt, progress_id, enhanced_id, subject)
-                )
-                thread.daemon = True  # Daemonize thread to avoid blocking app shutdown
-                thread.start()
-                
-                current_app.logger.info(f"Started background processing thread for progress ID: {progress_id}")
+                current_app.logger.info(f"Submitted background processing for progress ID: {progress_id}")
                 
                 # Set cache-control headers to ensure the response isn't cached
                 response = jsonify(response_data)
@@ -473,6 +759,7 @@ def enhanced_analysis():
                 form=form, 
                 subject=subject, 
                 results=positive_results,
+                result_id=result_id,
                 total_count=len(results),
                 detected_count=len(positive_results)
             )
@@ -486,6 +773,7 @@ def enhanced_analysis():
         form=form, 
         subject=subject, 
         results=positive_results,
+        result_id=result_id,
         total_count=total_count,
         detected_count=detected_count
     )
@@ -514,76 +802,91 @@ def process_image_batch_background(app, images, api_key, model_name, prompt, pro
             start_time = time.time()
             
             # Update status to processing
-            analysis_progress[progress_id]['status'] = 'processing'
+            progress = analysis_progress[progress_id]
+            progress.set_status('processing')
+            # A cancel that landed before the job was picked up keeps the job cancelled
+            progress.check_cancelled()
             logger.info(f"[BG] Updated status to 'processing' for ID: {progress_id}")
             
-            # Define a progress callback function with more logging
+            # Replace uploaded videos with their sampled frames; the total grows to the frame count
+            with tracer.span('expand_videos'):
+                images, videos = expand_videos(images, app.config)
+            if videos:
+                progress.start(len(images))
+                progress['videos'] = videos
+                # Admission charged the frame budget of each video; charge the frames sampled instead
+                admission().resize(progress_id, len(images))
+                logger.info(f"[BG] Sampled {len(videos)} videos; analyzing {len(images)} images and frames")
+            
+            # Workers report to the progress entry, which counts finished images under its own lock
             def update_progress(index, filename):
-                completed = index + 1
-                logger.info(f"[BG] Initial analysis progress callback called: index={index}, filename={filename}")
-                
-                # Verify progress ID still exists
-                if progress_id not in analysis_progress:
-                    logger.error(f"[BG] ERROR: Progress ID {progress_id} no longer exists in tracking data!")
-                    return
-                    
-                # Update progress data
-                analysis_progress[progress_id]['completed'] = completed
-                analysis_progress[progress_id]['percent'] = int((completed / len(images)) * 100)
-                # Add current filename to the progress data
-                analysis_progress[progress_id]['current_file'] = filename
-                
-                # Log updated progress
-                progress_data = analysis_progress[progress_id]
-                logger.info(f"[BG] Initial Analysis Progress: {completed}/{len(images)} images processed ({progress_data['percent']}%)")
-                logger.info(f"[BG] Current progress data: {progress_data}")
+                progress.finish_image(index, filename)
+                logger.debug(f"[BG] Initial analysis finished image {index}: {filename}")
             
             # Process the images
             logger.info(f"[BG] Calling process_image_batch with {len(images)} images")
-            results = process_image_batch(
-                images=images,
-                api_key=api_key,
-                model_name=model_name,
-                prompt=prompt,
-                progress_callback=update_progress
-            )
+            with tracer.span('process_image_batch', images=len(images)):
+                results = process_image_batch(
+                    images=images,
+                    api_key=api_key,
+                    model_name=model_name,
+                    prompt=prompt,
+                    progress_callback=update_progress,
+                    start_callback=progress.start_image,
+                    cancel_event=progress.cancelled,
+                    **detection_options(app.config)
+                )
             
             # Log what we got back
             logger.info(f"[BG] Received {len(results) if results else 0} results from process_image_batch")
             
+            # A cancelled batch's results are discarded
+            progress.check_cancelled()
+            
             # Verify progress ID still exists
             if progress_id not in analysis_progress:
                 logger.error(f"[BG] ERROR: Initial analysis progress ID {progress_id} no longer exists in tracking data after processing!")
                 return
                 
-            # Mark progress as complete
-            analysis_progress[progress_id]['status'] = 'complete'
-            analysis_progress[progress_id]['percent'] = 100
-            logger.info(f"[BG] Initial analysis progress tracking complete for ID: {progress_id}")
-            logger.info(f"[BG] Final progress data: {analysis_progress[progress_id]}")
-            
-            # Log processing completion
-            processing_time = time.time() - start_time
-            logger.info(f"[BG] Completed initial analysis in {processing_time:.2f} seconds")
-            
-            # Count successful detections
-            detected = sum(1 for r in results if r['detection_result'] is True)
-            not_detected = sum(1 for r in results if r['detection_result'] is False)
-            unknown = sum(1 for r in results if r['detection_result'] is None)
+            # Key the results by image ID; the counters are maintained from here on
+            with tracer.span('store_results'):
+                results = ResultSet(results)
+                index = ResultIndex(results)
+            counts = results.counts
             
             # Get plural suffix based on subject
             plural_suffix = get_plural_suffix(subject)
             
-            logger.info(f"[BG] Results summary: {detected} {subject}{plural_suffix} detected, {not_detected} no {subject}{plural_suffix}, {unknown} unknown")
+            logger.info(f"[BG] Results summary: {counts['detected']} {subject}{plural_suffix} detected, {counts['not-detected']} no {subject}{plural_suffix}, {counts['unknown']} unknown")
             
-            # Store results in server-side storage
+            # Store results before marking complete so pollers never see a finished job without results
             results_storage[result_id] = {
                 'results': results,
-                'subject': subject  # Store the subject with the results
+                'subject': subject,  # Store the subject with the results
+                'index': index,
+                'videos': videos,
+                'prompt': prompt,
+                'model': model_name,
+                'usage': usage_ledger.batch(progress_id),
+                'job_id': progress_id
             }
             
             logger.info(f"[BG] Stored initial analysis results with ID: {result_id}")
             
+            # Mark progress as complete
+            progress.set_status('complete')
+            logger.info(f"[BG] Initial analysis progress tracking complete for ID: {progress_id}")
+            logger.info(f"[BG] Final progress data: {analysis_progress[progress_id]}")
+            
+            # Log processing completion
+            processing_time = time.time() - start_time
+            logger.info(f"[BG] Completed initial analysis in {processing_time:.2f} seconds")
+            
+        except JobCancelled:
+            if progress_id in analysis_progress:
+                analysis_progress[progress_id].set_status('cancelled')
+            logger.info(f"[BG] Initial analysis {progress_id} was cancelled")
+            
         except Exception as e:
             import traceback
             import logging
@@ -593,8 +896,7 @@ def process_image_batch_background(app, images, api_key, model_name, prompt, pro
             
             # Update progress status to error
             if progress_id in analysis_progress:
-                analysis_progress[progress_id]['status'] = 'error'
-                analysis_progress[progress_id]['error'] = str(e)
+                analysis_progress[progress_id].set_status('error', error=str(e))
                 logger.info(f"[BG] Updated progress status to 'error' for ID: {progress_id}")
 
 @main_bp.route('/enhanced-results')
@@ -613,72 +915,131 @@ def enhanced_results():
         flash("No enhanced analysis results to display. Please perform enhanced analysis first.", 'warning')
         return redirect(url_for('main.results'))
     
-    enhanced_data = enhanced_results_storage[enhanced_result_id]
+    return render_enhanced_results(enhanced_result_id, session.get('custom_subject', DEFAULT_SUBJECT))
+
+def render_enhanced_results(enhanced_id, default_subject):
+    """
+    Render one page of a stored enhanced analysis.
     
+    Args:
+        enhanced_id (str): The ID of the analysis in enhanced_results_storage
+        default_subject (str): Subject to show if the entry has none
+        
+    Returns:
+        str: Rendered HTML template
+    """
+    enhanced_data = enhanced_results_storage[enhanced_id]
+    # A streaming analysis shows the usage of its calls so far
+    usage = enhanced_data.get('usage')
+    if usage is None and enhanced_data.get('progress_id'):
+        usage = usage_ledger.batch(enhanced_data['progress_id'])
     return render_template(
         'enhanced_results.html',
-        results=enhanced_data.get('results', []),
-        subject=enhanced_data.get('subject', session.get('custom_subject', DEFAULT_SUBJECT)),
-        prompt=enhanced_data.get('prompt', '')
+        pagination=paginate_batch(enhanced_data, preference_key='enhanced_results_view'),
+        subject=enhanced_data.get('subject', default_subject),
+        prompt=enhanced_data.get('prompt', ''),
+        streaming=enhanced_data.get('streaming', False),
+        progress_id=enhanced_data.get('progress_id'),
+        result_id=enhanced_data.get('result_id'),
+        enhanced_id=enhanced_id,
+        trace_url=trace_url(enhanced_data.get('job_id') or enhanced_data.get('progress_id')),
+        usage=usage,
+        session_usage=usage_ledger.session(client_flow())
     )
 
-@main_bp.route('/delete_image/<int:image_index>', methods=['POST'])
-def delete_image(image_index):
+def remove_from_batch(batch_data, image_ids):
     """
-    Delete an image from the results collection.
+    Remove images by ID from a stored batch, keeping its index in step.
     
     Args:
-        image_index: Index of the image to delete
+        batch_data (dict): An entry of results_storage or enhanced_results_storage
+        image_ids (list): IDs of the images to remove
         
     Returns:
-        flask.Response: JSON response indicating success or failure
+        list: The records that were removed
+    """
+    removed = batch_data['results'].remove(image_ids)
+    index = batch_data.get('index')
+    if index is not None:
+        for record in removed:
+            index.discard(record.id)
+    forget_images(batch_data, [record.id for record in removed])
+    return removed
+
+def delete_session_images(image_ids):
+    """
+    Delete images by ID from the session's results and its enhanced results.
+    
+    Args:
+        image_ids (list): IDs of the images to delete
+        
+    Returns:
+        tuple: (removed records, result data), or (None, None) if the session has no results
     """
-    # Get result ID from session
     result_id = session.get('result_id')
+    result_data = results_storage.get(result_id)
+    if not result_data:
+        return None, None
     
-    # Get results from storage
-    result_data = results_storage.get(result_id, {})
-    results = result_data.get('results', [])
-    subject = result_data.get('subject', session.get('custom_subject', DEFAULT_SUBJECT))
+    removed = remove_from_batch(result_data, image_ids)
     
-    # Check if the index is valid
-    if not results or image_index < 0 or image_index >= len(results):
-        current_app.logger.warning(f"Invalid image index for deletion: {image_index}")
-        return jsonify({'success': False, 'error': 'Invalid image index'}), 400
+    # Enhanced results of this batch reference the same images by ID
+    enhanced_data = enhanced_results_storage.get(session.get('enhanced_result_id'))
+    if removed and enhanced_data and enhanced_data.get('result_id') == result_id:
+        remove_from_batch(enhanced_data, [record.id for record in removed])
     
-    try:
-        # Remove the image from the results
-        current_app.logger.info(f"Deleting image {results[image_index]['filename']} at index {image_index}")
-        deleted_image = results.pop(image_index)
+    return removed, result_data
+
+def deletion_response(removed, result_data):
+    """
+    Build the JSON payload returned after deleting images.
+    
+    Args:
+        removed (list): The records that were removed
+        result_data (dict): The batch they were removed from
         
-        # Update the results in storage
-        results_storage[result_id]['results'] = results
+    Returns:
+        dict: The response payload
+    """
+    counts = result_data['results'].counts_snapshot()
+    subject = result_data.get('subject', session.get('custom_subject', DEFAULT_SUBJECT))
+    
+    return {
+        'success': True,
+        'message': f"Image {removed[0].filename} deleted successfully" if len(removed) == 1 else f"{len(removed)} images deleted successfully",
+        'deleted_ids': [record.id for record in removed],
+        'remaining_count': counts['all'],
+        'counts': {
+            'total': counts['all'],
+            'detected': counts['detected'],
+            'not_detected': counts['not-detected'],
+            'unknown': counts['unknown'],
+            'error': counts['error'],
+            'skipped': counts['skipped']
+        },
+        'subject': subject
+    }
+
+@main_bp.route('/delete_image/<string:image_id>', methods=['POST'])
+def delete_image(image_id):
+    """
+    Delete an image from the results collection.
+    
+    Args:
+        image_id: ID of the image to delete
         
-        # If we have enhanced results, we should clear them as they may be invalid now
-        if 'enhanced_result_id' in session:
-            enhanced_id = session.pop('enhanced_result_id')
-            if enhanced_id in enhanced_results_storage:
-                del enhanced_results_storage[enhanced_id]
+    Returns:
+        flask.Response: JSON response indicating success or failure
+    """
+    try:
+        removed, result_data = delete_session_images([image_id])
         
-        # Return success response
-        # Calculate counts for the remaining results
-        detected_count = sum(1 for r in results if r.get('detection_result') is True)
-        not_detected_count = sum(1 for r in results if r.get('detection_result') is False)
-        unknown_count = sum(1 for r in results if r.get('detection_result') is None)
+        if not removed:
+            current_app.logger.warning(f"Invalid image ID for deletion: {image_id}")
+            return jsonify({'success': False, 'error': 'Image not found'}), 404
         
-        return jsonify({
-            'success': True, 
-            'message': f"Image {deleted_image['filename']} deleted successfully",
-            'remaining_count': len(results),
-            'counts': {
-                'total': len(results),
-                'detected': detected_count,
-                'not_detected': not_detected_count,
-                'unknown': unknown_count
-            },
-            'results': results,
-            'subject': subject
-        }), 200
+        current_app.logger.info(f"Deleted image {removed[0].filename} with ID {image_id}")
+        return jsonify(deletion_response(removed, result_data)), 200
     except Exception as e:
         current_app.logger.error(f"Error deleting image: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -688,8 +1049,14 @@ def api_analyze():
     """
     API endpoint for analyzing images.
     
+    By default the batch is analyzed in the background and the response is
+    202 Accepted with a job ID; poll /api/jobs/<job_id> for status and fetch
+    /api/jobs/<job_id>/result or the paged /api/results/<result_id> when it is
+    complete. With sync=true (query or form field), batches of up to
+    API_SYNC_MAX_IMAGES images are analyzed within the request instead.
+    
     Returns:
-        flask.Response: JSON response with analysis results
+        flask.Response: JSON response with analysis results or the job handle
     """
     # Check if files were uploaded
     if 'images' not in request.files:
@@ -710,8 +1077,8 @@ def api_analyze():
         if file.filename == '':
             continue
             
-        if not is_valid_file_extension(file.filename, current_app.config['UPLOAD_EXTENSIONS']):
-            return jsonify({'error': f"File {file.filename} has an invalid extension. Allowed extensions: {', '.join(current_app.config['UPLOAD_EXTENSIONS'])}"}), 400
+        if not is_valid_file_extension(file.filename, allowed_upload_extensions()):
+            return jsonify({'error': f"File {file.filename} has an invalid extension. Allowed extensions: {', '.join(allowed_upload_extensions())}"}), 400
         
         # Read the file data
         file_data = file.read()
@@ -725,48 +1092,338 @@ def api_analyze():
     if not valid_files:
         return jsonify({'error': "No valid files were uploaded."}), 400
     
+    # Get the custom prompt and subject from session or use the defaults
+    custom_prompt = session.get('custom_initial_prompt', current_app.config['PROMPT'])
+    subject = session.get('custom_subject', DEFAULT_SUBJECT)
+    
+    is_sync = request.values.get('sync', '').lower() == 'true'
+    if not is_sync:
+        return start_analysis_job(valid_files, custom_prompt, subject)
+    
+    if len(valid_files) > current_app.config['API_SYNC_MAX_IMAGES']:
+        return jsonify({
+            'error': f"Synchronous analysis is limited to {current_app.config['API_SYNC_MAX_IMAGES']} images. Omit sync=true to submit a job."
+        }), 400
+    
+    if any(is_valid_file_extension(f['filename'], current_app.config['VIDEO_EXTENSIONS']) for f in valid_files):
+        return jsonify({'error': "Videos are sampled into frames in the background. Omit sync=true to submit a job."}), 400
+    
     # Process the images
     try:
         # Log the start of processing
         current_app.logger.info(f"API: Starting to process {len(valid_files)} images with Cohere API")
         start_time = time.time()
         
-        # Get the custom prompt from session or use the default
-        custom_prompt = session.get('custom_initial_prompt', current_app.config['PROMPT'])
-        
-        # Process the batch of images using Cohere's Chat V2 API
-        results = process_image_batch(
-            images=valid_files,
-            api_key=current_app.config['COHERE_API_KEY'],
-            model_name=current_app.config['MODEL_NAME'],
-            prompt=custom_prompt
-        )
+        # Process the batch of images using Cohere's Chat V2 API, in one of the running slots
+        request_id = str(uuid.uuid4())
+        with admission().reserve(request_id, len(valid_files), client_flow()):
+            results = process_image_batch(
+                images=valid_files,
+                api_key=current_app.config['COHERE_API_KEY'],
+                model_name=current_app.config['MODEL_NAME'],
+                prompt=custom_prompt,
+                **detection_options(current_app.config)
+            )
         
         # Log processing completion
         processing_time = time.time() - start_time
         current_app.logger.info(f"API: Completed processing {len(valid_files)} images in {processing_time:.2f} seconds")
         
-        # Get the subject from session or use the default
-        subject = session.get('custom_subject', DEFAULT_SUBJECT)
-        
-        # Format the results for API response
-        api_results = []
-        for result in results:
-            api_results.append({
-                'filename': result['filename'],
-                'detection_result': result['detection_result'],
-                'subject': subject,
-                'success': result['success'],
-                'error': result['error'],
-                'response_text': result['raw_response'].text if result['success'] and result['raw_response'] else None
-            })
-        
-        return jsonify({'results': api_results, 'subject': subject}), 200
+        return jsonify({
+            'results': [api_result(result, subject) for result in results],
+            'subject': subject,
+            'usage': usage_ledger.batch(request_id)
+        }), 200
         
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         current_app.logger.error(f"API Error processing images: {str(e)}")
         return jsonify({'error': f"An error occurred while processing the images: {str(e)}"}), 500
 
+def api_result(result, subject):
+    """
+    Format a detection record for the analyze API responses.
+    
+    Args:
+        result: The DetectionRecord
+        subject (str): The detection subject of the batch
+        
+    Returns:
+        dict: The API representation of the record
+    """
+    data = result.to_dict(include_images=False)
+    data['subject'] = subject
+    return data
+
+def start_analysis_job(images, prompt, subject):
+    """
+    Start analyzing a batch in the background and return its job handle.
+    
+    The job ID is the batch's progress ID, so the job runs through the same
+    process_image_batch_background path and progress tracking as the web upload.
+    
+    Args:
+        images (list): Dicts with 'filename' and 'data'
+        prompt (str): The detection prompt
+        subject (str): The detection subject
+        
+    Returns:
+        flask.Response: 202 Accepted with the job handle, or 503 with Retry-After
+        if the server is at capacity
+    """
+    job_id = str(uuid.uuid4())
+    result_id = str(uuid.uuid4())
+    
+    progress = JobProgress(total=len(images), result_id=result_id)
+    trace_request(job_id, images=len(images))
+    try:
+        submit_job(
+            analysis_progress, job_id, progress, frame_budget(images, current_app.config),
+            process_image_batch_background,
+            (current_app._get_current_object(), images, current_app.config['COHERE_API_KEY'],
+             current_app.config['MODEL_NAME'], prompt, job_id, result_id, subject)
+        )
+    except Overloaded as e:
+        return overloaded_response(e)
+    
+    current_app.logger.info(f"API: Submitted analysis job {job_id} for {len(images)} images")
+    
+    status_url = url_for('main.api_job_status', job_id=job_id)
+    response = jsonify({
+        'job_id': job_id,
+        'status': progress['status'],
+        'total': len(images),
+        'status_url': status_url,
+        'result_url': url_for('main.api_job_result', job_id=job_id)
+    })
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
+def job_status(job_id, progress_data):
+    """
+    Build the status payload for an analysis job.
+    
+    Args:
+        job_id (str): The job ID
+        progress_data (dict): The job's entry in analysis_progress
+        
+    Returns:
+        dict: The status payload
+    """
+    progress_data = progress_snapshot(progress_data)
+    status = progress_data.get('status', 'unknown')
+    result_id = progress_data.get('result_id')
+    data = {
+        'job_id': job_id,
+        'status': status,
+        'percent': progress_data.get('percent', 0),
+        'completed': progress_data.get('completed', 0),
+        'total': progress_data.get('total', 0),
+        'current_file': progress_data.get('current_file', '')
+    }
+    data.update({field: progress_data[field] for field in THROUGHPUT_FIELDS if field in progress_data})
+    if status == 'queued':
+        data['queue_position'] = progress_data.get('queue_position')
+    if 'videos' in progress_data:
+        data['videos'] = progress_data['videos']
+    data['usage'] = usage_ledger.batch(job_id)
+    if status == 'complete' and 'rerun' in progress_data:
+        data['rerun'] = progress_data['rerun']
+    if status == 'error':
+        data['error'] = progress_data.get('error')
+    if status == 'complete' and result_id in results_storage:
+        data['result_id'] = result_id
+        data['result_url'] = url_for('main.api_job_result', job_id=job_id)
+        data['results_url'] = url_for('main.api_results', result_id=result_id)
+    return data
+
+@main_bp.route('/api/jobs/<string:job_id>', methods=['GET'])
+def api_job_status(job_id):
+    """
+    API endpoint for the status of an analysis job.
+    
+    Args:
+        job_id: The job ID returned by /api/analyze
+        
+    Returns:
+        flask.Response: JSON response with the job status
+    """
+    progress_data = analysis_progress.get(job_id)
+    if not progress_data or 'result_id' not in progress_data:
+        return jsonify({'error': 'Job ID not found'}), 404
+    
+    response = jsonify(job_status(job_id, progress_data))
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    return response
+
+@main_bp.route('/api/jobs/<string:job_id>/trace', methods=['GET'])
+def api_job_trace(job_id):
+    """
+    API endpoint for the trace of a job: its spans and where its time went.
+    
+    Works for analysis, re-run and enhanced analysis jobs while their trace is
+    among the most recent TRACING_KEEP.
+    
+    Args:
+        job_id: The job or progress ID
+        
+    Returns:
+        flask.Response: JSON response with the spans and their 'summary'
+    """
+    spans = tracer.spans(job_id)
+    if spans is None:
+        return jsonify({'error': 'No trace is kept for this job'}), 404
+    return jsonify({
+        'job_id': job_id,
+        'trace_id': otlp_trace_id(job_id),
+        'summary': critical_path(spans),
+        'spans': spans
+    }), 200
+
+@main_bp.route('/jobs/<string:job_id>/trace', methods=['GET'])
+def job_trace(job_id):
+    """
+    Display the trace of a job as a waterfall.
+    
+    Args:
+        job_id: The job or progress ID
+        
+    Returns:
+        str: Rendered HTML template
+    """
+    spans = tracer.spans(job_id)
+    if spans is None:
+        flash("No trace is kept for this job. Traces are kept for the most recent jobs only.", 'warning')
+        return redirect(url_for('main.index'))
+    return render_template('trace.html', job_id=job_id, rows=waterfall(spans), summary=critical_path(spans))
+
+def profiles_forbidden():
+    """
+    Check access to the stored profiles.
+    
+    Returns:
+        Optional[flask.Response]: An error response when profiling is off (404) or the
+        PROFILING_TOKEN is not given as X-Profile-Token or ?token= (403), otherwise None
+    """
+    if not profiler.enabled:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not profiler.authorized(request.headers.get('X-Profile-Token') or request.args.get('token')):
+        return jsonify({'error': 'A valid profiling token is required'}), 403
+    return None
+
+@main_bp.route('/admin/profiles', methods=['GET'])
+def admin_profiles():
+    """
+    API endpoint listing the stored request and job profiles, newest first.
+    
+    Returns:
+        flask.Response: JSON response with the 'profiles' and their download URLs
+    """
+    forbidden = profiles_forbidden()
+    if forbidden:
+        return forbidden
+    profiles = [
+        dict(entry, url=url_for('main.admin_profile', name=entry['name']))
+        for entry in profiler.list()
+    ]
+    return jsonify({'mode': profiler.mode, 'keep': profiler.keep, 'profiles': profiles}), 200
+
+@main_bp.route('/admin/profiles/<string:name>', methods=['GET'])
+def admin_profile(name):
+    """
+    Download a stored profile.
+    
+    The file is in cProfile's format, for pstats or a viewer such as snakeviz;
+    ?format=text returns the pstats report sorted by cumulative time instead.
+    
+    Args:
+        name: The profile's file name
+        
+    Returns:
+        flask.Response: The profile file or its text report
+    """
+    forbidden = profiles_forbidden()
+    if forbidden:
+        return forbidden
+    path = profiler.path(name)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    if request.args.get('format') == 'text':
+        return Response(profile_text(path), mimetype='text/plain')
+    return send_file(os.path.abspath(path), mimetype='application/octet-stream', as_attachment=True,
+                     download_name=name)
+
+@main_bp.route('/api/jobs/<string:job_id>/result', methods=['GET'])
+def api_job_result(job_id):
+    """
+    API endpoint for the results of a finished analysis job.
+    
+    Returns 202 with the job status while the job is still running. Large
+    batches can instead be fetched a page at a time from the results_url
+    given in the job status.
+    
+    Args:
+        job_id: The job ID returned by /api/analyze
+        
+    Returns:
+        flask.Response: JSON response with the analysis results
+    """
+    progress_data = analysis_progress.get(job_id)
+    if not progress_data or 'result_id' not in progress_data:
+        return jsonify({'error': 'Job ID not found'}), 404
+    
+    status = job_status(job_id, progress_data)
+    if status['status'] == 'error':
+        return jsonify(status), 500
+    if status['status'] == 'cancelled':
+        return jsonify(status), 409
+    
+    result_data = results_storage.get(progress_data['result_id'])
+    if status['status'] != 'complete' or result_data is None:
+        response = jsonify(status)
+        response.status_code = 202
+        response.headers['Retry-After'] = '1'
+        return response
+    
+    subject = result_data.get('subject', DEFAULT_SUBJECT)
+    return jsonify({
+        'job_id': job_id,
+        'result_id': progress_data['result_id'],
+        'results': [api_result(result, subject) for result in result_data['results']],
+        'subject': subject
+    }), 200
+
+@main_bp.route('/api/jobs/<string:job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id):
+    """
+    API endpoint to cancel a running analysis.
+    
+    Works for analysis jobs and for the progress IDs of web uploads and enhanced
+    analyses. Images not yet sent to the model are skipped; calls in flight are
+    left to return and their results discarded.
+    
+    Args:
+        job_id: The job or progress ID
+        
+    Returns:
+        flask.Response: The job's progress; 409 if it had already finished
+    """
+    progress_data, cancelled = cancel_job(job_id)
+    if progress_data is None:
+        return jsonify({'error': 'Job ID not found'}), 404
+    
+    snapshot = progress_snapshot(progress_data)
+    data = {
+        'job_id': job_id,
+        'status': snapshot.get('status', 'unknown'),
+        'completed': snapshot.get('completed', 0),
+        'total': snapshot.get('total', 0),
+        'cancelled': cancelled
+    }
+    return jsonify(data), 200 if cancelled else 409
+
 @main_bp.route('/api/enhanced-analyze', methods=['POST'])
 def api_enhanced_analyze():
     """
@@ -787,7 +1444,7 @@ def api_enhanced_analyze():
         return jsonify({'error': 'No results found. Please upload and analyze images first.'}), 400
     
     # Filter for positive detections only
-    positive_results = [r for r in results if r['detection_result'] is True]
+    positive_results = [r for r in results if r.detection_result is True]
     
     if not positive_results:
         return jsonify({'error': 'No positive detections found. Enhanced analysis requires at least one positive detection.'}), 400
@@ -805,13 +1462,16 @@ def api_enhanced_analyze():
         current_app.logger.info(f"API: Starting enhanced analysis for {len(positive_results)} images")
         start_time = time.time()
         
-        # Process the positive results with enhanced analysis
-        enhanced_results = process_enhanced_analysis(
-            images=positive_results,
-            api_key=current_app.config['COHERE_API_KEY'],
-            model_name=current_app.config['MODEL_NAME'],
-            prompt=custom_prompt
-        )
+        # Process the positive results with enhanced analysis, in one of the running slots
+        request_id = str(uuid.uuid4())
+        with admission().reserve(request_id, len(positive_results), client_flow()):
+            enhanced_results = process_enhanced_analysis(
+                images=positive_results,
+                api_key=current_app.config['COHERE_API_KEY'],
+                model_name=current_app.config['MODEL_NAME'],
+                prompt=custom_prompt,
+                max_tokens=current_app.config['ENHANCED_MAX_TOKENS']
+            )
         
         # Log processing completion
         processing_time = time.time() - start_time
@@ -821,10 +1481,14 @@ def api_enhanced_analyze():
         enhanced_id = str(uuid.uuid4())
         
         # Store enhanced results
+        enhanced_set = ResultSet(enhanced_results)
         enhanced_results_storage[enhanced_id] = {
-            'results': enhanced_results,
+            'results': enhanced_set,
             'subject': subject,
-            'prompt': custom_prompt
+            'prompt': custom_prompt,
+            'result_id': result_id,
+            'index': ResultIndex(enhanced_set),
+            'usage': usage_ledger.batch(request_id)
         }
         
         # Store the enhanced result ID in the session
@@ -834,11 +1498,11 @@ def api_enhanced_analyze():
         api_results = []
         for result in enhanced_results:
             api_results.append({
-                'filename': result['filename'],
-                'enhanced_analysis': result['enhanced_analysis'],
+                'filename': result.filename,
+                'enhanced_analysis': result.enhanced_analysis,
                 'subject': subject,
-                'success': result['success'],
-                'error': result['error']
+                'success': result.success,
+                'error': result.error
             })
         
         return jsonify({
@@ -848,74 +1512,383 @@ def api_enhanced_analyze():
             'redirect': url_for('main.enhanced_results')
         }), 200
         
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         current_app.logger.error(f"API Error during enhanced analysis: {str(e)}")
         return jsonify({'error': f"An error occurred during enhanced analysis: {str(e)}"}), 500
 
-@main_bp.route('/api/delete_image/<int:image_index>', methods=['DELETE'])
-def api_delete_image(image_index):
+@main_bp.route('/api/delete_image/<string:image_id>', methods=['DELETE'])
+def api_delete_image(image_id):
     """
     API endpoint for deleting an image from the results collection.
     
     Args:
-        image_index: Index of the image to delete
+        image_id: ID of the image to delete
         
     Returns:
         flask.Response: JSON response indicating success or failure
     """
-    # Get result ID from session
-    result_id = session.get('result_id')
-    
-    if not result_id:
+    if not session.get('result_id'):
         return jsonify({'success': False, 'error': 'No results found in session. Please upload images first.'}), 400
     
-    # Get results from storage
-    result_data = results_storage.get(result_id, {})
-    results = result_data.get('results', [])
-    subject = result_data.get('subject', session.get('custom_subject', DEFAULT_SUBJECT))
+    try:
+        removed, result_data = delete_session_images([image_id])
+        
+        if not removed:
+            current_app.logger.warning(f"API: Invalid image ID for deletion: {image_id}")
+            return jsonify({'success': False, 'error': 'Image not found'}), 404
+        
+        current_app.logger.info(f"API: Deleted image {removed[0].filename} with ID {image_id}")
+        return jsonify(deletion_response(removed, result_data)), 200
+    except Exception as e:
+        current_app.logger.error(f"API Error deleting image: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@main_bp.route('/api/delete_images', methods=['POST'])
+def api_delete_images():
+    """
+    API endpoint for deleting several images from the results collection at once.
+    
+    Expects a JSON body of the form {"ids": ["<image id>", ...]}. IDs that are not
+    in the results are reported back in 'missing_ids' rather than failing the request.
+    
+    Returns:
+        flask.Response: JSON response with the deleted IDs and updated counts
+    """
+    if not session.get('result_id'):
+        return jsonify({'success': False, 'error': 'No results found in session. Please upload images first.'}), 400
     
-    # Check if the index is valid
-    if not results or image_index < 0 or image_index >= len(results):
-        current_app.logger.warning(f"API: Invalid image index for deletion: {image_index}")
-        return jsonify({'success': False, 'error': 'Invalid image index'}), 400
+    data = request.get_json(silent=True) or {}
+    image_ids = data.get('ids')
+    if not isinstance(image_ids, list) or not all(isinstance(i, str) for i in image_ids):
+        return jsonify({'success': False, 'error': 'Expected a JSON body with a list of image IDs in "ids"'}), 400
     
     try:
-        # Remove the image from the results
-        current_app.logger.info(f"API: Deleting image {results[image_index]['filename']} at index {image_index}")
-        deleted_image = results.pop(image_index)
+        removed, result_data = delete_session_images(image_ids)
         
-        # Update the results in storage
-        results_storage[result_id]['results'] = results
+        if result_data is None:
+            return jsonify({'success': False, 'error': 'No results found in session. Please upload images first.'}), 400
         
-        # If we have enhanced results, we should clear them as they may be invalid now
-        if 'enhanced_result_id' in session:
-            enhanced_id = session.pop('enhanced_result_id')
-            if enhanced_id in enhanced_results_storage:
-                del enhanced_results_storage[enhanced_id]
+        deleted_ids = {record.id for record in removed}
+        payload = deletion_response(removed, result_data)
+        payload['missing_ids'] = [i for i in image_ids if i not in deleted_ids]
         
-        # Return success response
-        # Calculate counts for the remaining results
-        detected_count = sum(1 for r in results if r.get('detection_result') is True)
-        not_detected_count = sum(1 for r in results if r.get('detection_result') is False)
-        unknown_count = sum(1 for r in results if r.get('detection_result') is None)
-        
-        return jsonify({
-            'success': True, 
-            'message': f"Image {deleted_image['filename']} deleted successfully",
-            'remaining_count': len(results),
-            'counts': {
-                'total': len(results),
-                'detected': detected_count,
-                'not_detected': not_detected_count,
-                'unknown': unknown_count
-            },
-            'results': results,
-            'subject': subject
-        }), 200
+        current_app.logger.info(f"API: Bulk deleted {len(removed)} of {len(image_ids)} requested images")
+        return jsonify(payload), 200
     except Exception as e:
-        current_app.logger.error(f"API Error deleting image: {str(e)}")
+        current_app.logger.error(f"API Error bulk deleting images: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@main_bp.route('/api/results/<string:result_id>', methods=['GET'])
+def api_results(result_id):
+    """
+    API endpoint for a filtered, sorted page of a batch's detection results.
+    
+    Query parameters: filter (all, detected, not-detected, unknown, error),
+    sort (filename, status or latency with -asc/-desc), page, per_page and
+    offset (overrides page), and thumbnails (true to include base64 thumbnails).
+    
+    Args:
+        result_id: The ID of the result batch
+        
+    Returns:
+        flask.Response: JSON response with the page of results
+    """
+    if result_id not in results_storage:
+        return jsonify({'error': 'Result ID not found'}), 404
+    
+    result_data = results_storage[result_id]
+    pagination = paginate_batch(result_data)
+    return jsonify(paginated_json(pagination, result_data.get('subject', DEFAULT_SUBJECT), result_id)), 200
+
+def find_stored_image(batch_id, image_id):
+    """
+    Look up an image record in a stored initial or enhanced batch.
+    
+    Args:
+        batch_id (str): The ID of the batch in results_storage or enhanced_results_storage
+        image_id (str): The ID of the image in the batch
+        
+    Returns:
+        The record, or None if the batch or image is unknown or has no image data
+    """
+    batch_data = results_storage.get(batch_id) or enhanced_results_storage.get(batch_id)
+    record = batch_data['results'].get(image_id) if batch_data else None
+    return record if record is not None and record.image_data else None
+
+@main_bp.route('/thumbnails/<string:batch_id>/<string:image_id>', methods=['GET'])
+def thumbnail(batch_id, image_id):
+    """
+    Serve the thumbnail of one image of a batch.
+    
+    The 'size' query parameter picks one of THUMBNAIL_SIZES (the first by default).
+    Thumbnails are encoded in the configured format and cached by image content hash,
+    so the ETag is stable for as long as the image and settings are unchanged.
+    
+    Args:
+        batch_id: The ID of the initial or enhanced result batch
+        image_id: The ID of the image in the batch
+        
+    Returns:
+        flask.Response: The encoded thumbnail
+    """
+    record = find_stored_image(batch_id, image_id)
+    if record is None:
+        return jsonify({'error': 'Image not found'}), 404
+    
+    sizes = thumbnails.settings['sizes']
+    size = request.args.get('size', sizes[0], type=int)
+    if size not in sizes:
+        return jsonify({'error': f"Unsupported size. Allowed sizes: {', '.join(map(str, sizes))}"}), 400
+    
+    fmt = thumbnails.thumbnail_format()
+    digest = thumbnails.content_hash(record.image_data)
+    etag = f"{digest[:16]}-{size}-{fmt}-{thumbnails.settings['quality']}"
+    if etag in request.if_none_match:
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+    
+    data = thumbnails.get_thumbnail(record.image_data, size, digest=digest)
+    response = Response(data, mimetype=thumbnails.THUMBNAIL_FORMATS[fmt][1])
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+@main_bp.route('/images/<string:batch_id>/<string:image_id>', methods=['GET'])
+def full_image(batch_id, image_id):
+    """
+    Serve the original bytes of one image of a batch, as opened in the image modal.
+    
+    Args:
+        batch_id: The ID of the initial or enhanced result batch
+        image_id: The ID of the image in the batch
+        
+    Returns:
+        flask.Response: The image
+    """
+    record = find_stored_image(batch_id, image_id)
+    if record is None:
+        return jsonify({'error': 'Image not found'}), 404
+    
+    response = Response(record.image_data, mimetype=record.mime_type or 'application/octet-stream')
+    # Image IDs are never reused, so the bytes behind a URL never change
+    response.headers['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+@main_bp.route('/api/results/<string:result_id>/rerun', methods=['POST'])
+def api_rerun_results(result_id):
+    """
+    API endpoint to re-run a batch's initial analysis with the current settings.
+    
+    Uses the session's prompt and subject unless 'prompt' or 'subject' are given
+    in a JSON body. Only images not yet classified under that prompt are sent
+    to the model; the stored images are reused. Runs as a job like /api/analyze;
+    the finished job status includes the flipped detections under 'rerun'.
+    
+    Args:
+        result_id: The ID of the result batch
+        
+    Returns:
+        flask.Response: 202 Accepted with the job handle, or 503 with Retry-After
+        if the server is at capacity
+    """
+    result_data = results_storage.get(result_id)
+    if result_data is None:
+        return jsonify({'error': 'Result ID not found'}), 404
+    
+    running = analysis_progress.get(result_data.get('rerun_job'), {})
+    if running.get('status') in ('initialized', 'queued', 'processing'):
+        return jsonify({'error': 'A re-run of this batch is already in progress', 'job_id': result_data['rerun_job']}), 409
+    
+    body = request.get_json(silent=True) or {}
+    prompt = body.get('prompt') or session.get('custom_initial_prompt', current_app.config['PROMPT'])
+    subject = body.get('subject') or session.get('custom_subject', DEFAULT_SUBJECT)
+    
+    # At most every image of the batch is classified again
+    image_count = len(result_data['results'])
+    job_id = str(uuid.uuid4())
+    trace_request(job_id, images=image_count)
+    try:
+        submit_job(
+            analysis_progress, job_id, JobProgress(result_id=result_id), image_count, rerun_batch_background,
+            (current_app._get_current_object(), result_id, prompt, subject, job_id)
+        )
+    except Overloaded as e:
+        return overloaded_response(e)
+    result_data['rerun_job'] = job_id
+    
+    current_app.logger.info(f"API: Re-running batch {result_id} with the current settings as job {job_id}")
+    
+    status_url = url_for('main.api_job_status', job_id=job_id)
+    response = jsonify({
+        'job_id': job_id,
+        'status': 'initialized',
+        'status_url': status_url,
+        'result_url': url_for('main.api_job_result', job_id=job_id)
+    })
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
+def rerun_batch_background(app, result_id, prompt, subject, job_id):
+    """
+    Re-run a stored batch under a new prompt in the background.
+    This function is called in a separate thread.
+    """
+    with app.app_context():
+        import logging
+        logger = logging.getLogger('app')
+        progress = analysis_progress[job_id]
+        try:
+            progress.set_status('processing')
+            progress.check_cancelled()
+            
+            def classify(records):
+                # Only the images without a cached result under this prompt are counted
+                progress.start(len(records))
+                records = reclassify_records(
+                    records,
+                    api_key=app.config['COHERE_API_KEY'],
+                    model_name=app.config['MODEL_NAME'],
+                    prompt=prompt,
+                    progress_callback=progress.finish_image,
+                    start_callback=progress.start_image,
+                    cancel_event=progress.cancelled,
+                    **detection_options(app.config)
+                )
+                # Raising here leaves the batch as it was
+                progress.check_cancelled()
+                return records
+            
+            summary = rerun_batch(results_storage[result_id], app.config['MODEL_NAME'], prompt, subject, classify)
+            logger.info(f"[BG] Re-ran batch {result_id}: {summary['analyzed']} analyzed, {summary['reused']} reused, {len(summary['changed'])} changed")
+            
+            # The re-run's model calls are added to those of the batch's earlier runs
+            usage = usage_ledger.batch(job_id)
+            add_usage(results_storage[result_id].setdefault('usage', {}), usage)
+            summary['usage'] = usage
+            progress.set_status('complete', rerun=summary)
+        except JobCancelled:
+            progress.set_status('cancelled')
+            logger.info(f"[BG] Re-run {job_id} of batch {result_id} was cancelled")
+        except Exception as e:
+            import traceback
+            logger.error(f"[BG] Error re-running batch {result_id}: {str(e)}")
+            logger.error(f"[BG] Traceback: {traceback.format_exc()}")
+            progress.set_status('error', error=str(e))
+
+@main_bp.route('/api/enhanced-results/<string:enhanced_id>', methods=['GET'])
+def api_enhanced_results(enhanced_id):
+    """
+    API endpoint for a filtered, sorted page of enhanced analysis results.
+    
+    Accepts the same query parameters as /api/results/<result_id>.
+    
+    Args:
+        enhanced_id: The ID of the enhanced analysis
+        
+    Returns:
+        flask.Response: JSON response with the page of results
+    """
+    if enhanced_id not in enhanced_results_storage:
+        return jsonify({'error': 'Enhanced result ID not found'}), 404
+    
+    enhanced_data = enhanced_results_storage[enhanced_id]
+    pagination = paginate_batch(enhanced_data)
+    payload = paginated_json(pagination, enhanced_data.get('subject', DEFAULT_SUBJECT), enhanced_id)
+    payload['prompt'] = enhanced_data.get('prompt', '')
+    payload['streaming'] = enhanced_data.get('streaming', False)
+    payload['cancelled'] = enhanced_data.get('status') == 'cancelled'
+    return jsonify(payload), 200
+
+@main_bp.route('/api/ingest', methods=['GET'])
+def api_ingest_status():
+    """
+    API endpoint for the status of the directory-watch ingestion daemon.
+    
+    Recent batches link to their results, which can be paged through with
+    /api/results/<result_id> or viewed at /analysis-results/<result_id>.
+    
+    Returns:
+        flask.Response: JSON response with the watcher status
+    """
+    watcher = current_app.extensions.get('ingest_watcher')
+    if watcher is None:
+        return jsonify({'error': 'Directory ingestion is not running in this process'}), 404
+    
+    return jsonify(watcher.status()), 200
+
+@main_bp.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    """
+    API endpoint for this process's model call, usage, scheduler and admission counters.
+    
+    'model_calls' counts the requests made to the model and the results shared
+    with identical requests that arrived while one was in flight. 'usage' totals
+    the billed tokens and payload bytes of those requests since start-up and per
+    day, and for the calling client under 'session'. 'scheduler' reports the busy
+    workers and the calls queued per client flow. 'admission' reports the batches
+    running and waiting and the submissions refused.
+    
+    Returns:
+        flask.Response: JSON response with the counters
+    """
+    response = jsonify({
+        'model_calls': model_calls.stats(),
+        'usage': dict(usage_ledger.stats(), session=usage_ledger.session(client_flow())),
+        'scheduler': current_app.extensions['scheduler'].stats(),
+        'admission': admission().stats()
+    })
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    return response
+
+@main_bp.route('/api/export/<string:result_id>', methods=['GET'])
+def api_export(result_id):
+    """
+    API endpoint for exporting a batch's detection and enhanced results.
+    
+    The export format is chosen with the 'format' query parameter: 'csv', 'jsonl'
+    or 'zip' (original images grouped into detected/not_detected/unknown folders
+    plus a results.jsonl manifest). The body is generated as a stream.
+    
+    Args:
+        result_id: The ID of the result batch to export
+        
+    Returns:
+        flask.Response: Streaming response with the exported results
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported export format. Allowed formats: {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    if result_id not in results_storage:
+        return jsonify({'error': 'Result ID not found'}), 404
+    
+    # Snapshot the records so deletions during the download don't affect it
+    result_data = results_storage[result_id]
+    results = list(result_data.get('results', []))
+    subject = result_data.get('subject', DEFAULT_SUBJECT)
+    
+    # Use the most recent completed enhanced analysis produced from this batch
+    enhanced_results = []
+    for enhanced_data in list(enhanced_results_storage.values()):
+        if enhanced_data.get('result_id') == result_id and not enhanced_data.get('streaming'):
+            enhanced_results = list(enhanced_data.get('results', []))
+    
+    generators = {
+        'csv': iter_results_csv,
+        'jsonl': iter_results_jsonl,
+        'zip': iter_results_zip
+    }
+    body = generators[export_format](results, enhanced_results, subject)
+    
+    current_app.logger.info(f"API: Exporting {len(results)} results for ID {result_id} as {export_format}")
+    
+    response = Response(body, mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="results-{result_id[:8]}.{export_format}"'
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    return response
+
 @main_bp.route('/api/analysis-progress/<string:progress_id>', methods=['GET'])
 def get_analysis_progress(progress_id):
     """
@@ -943,7 +1916,7 @@ def get_analysis_progress(progress_id):
     current_app.logger.info(f"[{request_id}] Available analysis progress IDs: {available_ids}")
     
     # Get progress from storage
-    progress_data = analysis_progress.get(progress_id, {})
+    progress_data = progress_snapshot(analysis_progress.get(progress_id))
     
     # If no progress data found, return 404
     if not progress_data:
@@ -966,6 +1939,11 @@ def get_analysis_progress(progress_id):
     # Add result ID from session for redirection when analysis completes
     response_data['result_id'] = session.get('result_id')
     
+    # Add throughput and ETA once images have been timed, or the place in the queue while waiting
+    response_data.update({field: progress_data[field] for field in THROUGHPUT_FIELDS if field in progress_data})
+    if response_data['status'] == 'queued':
+        response_data['queue_position'] = progress_data.get('queue_position')
+    
     # Add current file information if available
     if 'current_file' in progress_data:
         response_data['current_file'] = progress_data['current_file']
@@ -1018,7 +1996,7 @@ def get_enhanced_analysis_progress(progress_id):
     current_app.logger.info(f"[{request_id}] Available enhanced analysis progress IDs: {available_ids}")
     
     # Get progress from storage
-    progress_data = enhanced_analysis_progress.get(progress_id, {})
+    progress_data = progress_snapshot(enhanced_analysis_progress.get(progress_id))
     
     # If no progress data found, return 404
     if not progress_data:
@@ -1034,9 +2012,17 @@ def get_enhanced_analysis_progress(progress_id):
         'completed': progress_data.get('completed', 0),
         'status': progress_data.get('status', 'unknown'),
         'percent': progress_data.get('percent', 0),
+        'streaming': 'partials' in progress_data,
         'timestamp': timestamp,
         'request_id': request_id
     }
+    response_data.update({field: progress_data[field] for field in THROUGHPUT_FIELDS if field in progress_data})
+    if response_data['status'] == 'queued':
+        response_data['queue_position'] = progress_data.get('queue_position')
+    
+    # Streaming analyses can be watched on the results page as text arrives
+    if response_data['streaming']:
+        response_data['results_url'] = url_for('main.enhanced_results')
     
     # Create response with progress data
     response = jsonify(response_data)
@@ -1055,6 +2041,82 @@ def get_enhanced_analysis_progress(progress_id):
     
     return response
 
+def enhanced_stream_events(progress_id, sent):
+    """
+    Collect the server-sent events for the text generated since the last call.
+    
+    Shared by the WSGI stream below and the async stream of the ASGI entry point,
+    which differ only in how they wait between calls.
+    
+    Args:
+        progress_id (str): The ID of the enhanced analysis progress to stream
+        sent (dict): Text already sent per image index; updated in place
+        
+    Returns:
+        tuple: (list of encoded events, whether the stream is finished)
+    """
+    progress_data = enhanced_analysis_progress.get(progress_id)
+    if progress_data is None:
+        return [f"event: error\ndata: {json.dumps({'error': 'Progress ID no longer exists'})}\n\n"], True
+    
+    events = []
+    image_ids = progress_data.get('image_ids', [])
+    for index, text in enumerate(progress_data.get('partials', [])):
+        previous = sent.get(index, '')
+        if text == previous:
+            continue
+        if text.startswith(previous):
+            payload = {'id': image_ids[index], 'delta': text[len(previous):]}
+        else:
+            payload = {'id': image_ids[index], 'text': text}
+        sent[index] = text
+        events.append(f"data: {json.dumps(payload)}\n\n")
+    
+    status = progress_data.get('status')
+    if status in FINISHED_STATUSES:
+        progress_data = progress_snapshot(progress_data)
+        final = {
+            'completed': progress_data.get('completed', 0),
+            'total': progress_data.get('total', 0),
+            'errors': progress_data.get('errors', {}),
+            'error': progress_data.get('error')
+        }
+        events.append(f"event: {status}\ndata: {json.dumps(final)}\n\n")
+        return events, True
+    return events, False
+
+@main_bp.route('/api/enhanced-analysis-stream/<string:progress_id>', methods=['GET'])
+def stream_enhanced_analysis(progress_id):
+    """
+    Server-sent events endpoint that pushes partial enhanced analysis text per image.
+    
+    Each message is a JSON object with the image ID and either the text appended
+    since the last message ('delta') or the full replacement text ('text'). A final
+    'complete' or 'error' event is sent when the analysis finishes.
+    
+    Args:
+        progress_id: The ID of the enhanced analysis progress to stream
+        
+    Returns:
+        flask.Response: A text/event-stream response
+    """
+    if 'partials' not in enhanced_analysis_progress.get(progress_id, {}):
+        return jsonify({'error': 'Progress ID not found'}), 404
+    
+    def generate():
+        sent = {}
+        while True:
+            events, finished = enhanced_stream_events(progress_id, sent)
+            yield from events
+            if finished:
+                return
+            time.sleep(STREAM_POLL_INTERVAL)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @main_bp.route('/api/test-polling/<string:progress_id>', methods=['GET'])
 def test_polling(progress_id):
     """Special endpoint for testing polling functionality"""
@@ -1238,15 +2300,23 @@ def analysis_results(result_id):
     # Get the subject from the results data
     subject = results_data.get('subject', 'item')
     
+    pagination = paginate_batch(results_data, preference_key='results_view')
+    
     # Render the results template
     return render_template(
         'results.html',
-        results=results_data['results'],
-        subject=subject
+        pagination=pagination,
+        subject=subject,
+        result_id=result_id,
+        videos=results_data.get('videos', []),
+        rerun=results_data.get('rerun'),
+        trace_url=trace_url(results_data.get('rerun_job') or results_data.get('job_id')),
+        usage=results_data.get('usage'),
+        session_usage=usage_ledger.session(client_flow())
     )
 
 # Add a function to handle enhanced analysis background processing
-def process_enhanced_analysis_background(app, images, api_key, model_name, prompt, progress_id, enhanced_id, subject):
+def process_enhanced_analysis_background(app, images, api_key, model_name, prompt, progress_id, enhanced_id, subject, result_id=None):
     """
     Process enhanced analysis in the background.
     This function is called in a separate thread.
@@ -1269,38 +2339,49 @@ def process_enhanced_analysis_background(app, images, api_key, model_name, promp
             start_time = time.time()
             
             # Update status to processing
-            enhanced_analysis_progress[progress_id]['status'] = 'processing'
+            progress = enhanced_analysis_progress[progress_id]
+            enhanced_results = []
+            progress.set_status('processing')
+            # A cancel that landed before the job was picked up keeps the job cancelled
+            progress.check_cancelled()
             logger.info(f"[BG] Updated status to 'processing' for ID: {progress_id}")
             
-            # Define a progress callback function with more logging
+            # Workers report to the progress entry, which counts finished images under its own lock
+            
             def update_progress(index, filename):
-                completed = index + 1
-                logger.info(f"[BG] Progress callback called: index={index}, filename={filename}")
-                
-                # Verify progress ID still exists
-                if progress_id not in enhanced_analysis_progress:
-                    logger.error(f"[BG] ERROR: Progress ID {progress_id} no longer exists in tracking data!")
+                progress.finish_image(index, filename)
+                logger.debug(f"[BG] Enhanced analysis finished image {index}: {filename}")
+            
+            # Push partial text into the progress data and the seeded results as it streams
+            def update_partial(index, text):
+                progress_data = enhanced_analysis_progress.get(progress_id)
+                if progress_data is None or 'partials' not in progress_data:
                     return
-                    
-                # Update progress data
-                enhanced_analysis_progress[progress_id]['completed'] = completed
-                enhanced_analysis_progress[progress_id]['current_file'] = filename
-                enhanced_analysis_progress[progress_id]['percent'] = int((completed / len(images)) * 100)
+                progress_data['partials'][index] = text
                 
-                # Log updated progress
-                progress_data = enhanced_analysis_progress[progress_id]
-                logger.info(f"[BG] Enhanced Analysis Progress: {completed}/{len(images)} images processed ({progress_data['percent']}%)")
-                logger.info(f"[BG] Current progress data: {progress_data}")
+                seeded = enhanced_results_storage.get(enhanced_id)
+                if seeded and seeded.get('streaming'):
+                    record = seeded['results'].get(images[index].id)
+                    if record is not None:
+                        record.enhanced_analysis = text
             
             # Process the selected images with enhanced analysis
             logger.info(f"[BG] Calling process_enhanced_analysis with {len(images)} images")
-            enhanced_results = process_enhanced_analysis(
-                images=images,
-                api_key=api_key,
-                model_name=model_name,
-                prompt=prompt,
-                progress_callback=update_progress
-            )
+            with tracer.span('process_enhanced_analysis', images=len(images)):
+                enhanced_results = process_enhanced_analysis(
+                    images=images,
+                    api_key=api_key,
+                    model_name=model_name,
+                    prompt=prompt,
+                    progress_callback=update_progress,
+                    partial_callback=update_partial,
+                    max_tokens=app.config['ENHANCED_MAX_TOKENS'],
+                    start_callback=progress.start_image,
+                    cancel_event=progress.cancelled
+                )
+            
+            # A cancelled analysis keeps the images that finished and marks the rest cancelled
+            progress.check_cancelled()
             
             # Log what we got back
             logger.info(f"[BG] Received {len(enhanced_results) if enhanced_results else 0} results from process_enhanced_analysis")
@@ -1310,25 +2391,43 @@ def process_enhanced_analysis_background(app, images, api_key, model_name, promp
                 logger.error(f"[BG] ERROR: Progress ID {progress_id} no longer exists in tracking data after processing!")
                 return
                 
+            # Images deleted while the analysis was streaming stay deleted
+            seeded = enhanced_results_storage.get(enhanced_id)
+            if seeded and seeded.get('streaming'):
+                enhanced_results = [r for r in enhanced_results if r.id in seeded['results']]
+            
+            # Store enhanced results before marking complete so streaming clients see final records
+            with tracer.span('store_results'):
+                enhanced_set = ResultSet(enhanced_results)
+                index = ResultIndex(enhanced_set)
+            enhanced_results_storage[enhanced_id] = {
+                'results': enhanced_set,
+                'subject': subject,
+                'prompt': prompt,
+                'result_id': result_id,
+                'index': index,
+                'usage': usage_ledger.batch(progress_id),
+                'job_id': progress_id
+            }
+            
             # Mark progress as complete
-            enhanced_analysis_progress[progress_id]['status'] = 'complete'
-            enhanced_analysis_progress[progress_id]['percent'] = 100
+            progress.set_status('complete', errors={
+                result.id: result.error for result in enhanced_results if not result.success
+            })
             logger.info(f"[BG] Enhanced analysis progress tracking complete for ID: {progress_id}")
             logger.info(f"[BG] Final progress data: {enhanced_analysis_progress[progress_id]}")
             
             # Log processing completion
             processing_time = time.time() - start_time
             logger.info(f"[BG] Completed enhanced analysis in {processing_time:.2f} seconds")
-            
-            # Store enhanced results
-            enhanced_results_storage[enhanced_id] = {
-                'results': enhanced_results,
-                'subject': subject,
-                'prompt': prompt
-            }
-            
             logger.info(f"[BG] Stored enhanced results with ID: {enhanced_id}")
             
+        except JobCancelled:
+            if progress_id in enhanced_analysis_progress:
+                enhanced_analysis_progress[progress_id].set_status('cancelled')
+            logger.info(f"[BG] Enhanced analysis {progress_id} was cancelled")
+            cancel_enhanced_results(enhanced_id, enhanced_results)
+            
         except Exception as e:
             import traceback
             import logging
@@ -1338,6 +2437,9 @@ def process_enhanced_analysis_background(app, images, api_key, model_name, promp
             
             # Update progress status to error
             if progress_id in enhanced_analysis_progress:
-                enhanced_analysis_progress[progress_id]['status'] = 'error'
-                enhanced_analysis_progress[progress_id]['error'] = str(e)
+                enhanced_analysis_progress[progress_id].set_status('error', error=str(e))
                 logger.info(f"[BG] Updated progress status to 'error' for ID: {progress_id}")
+            
+            # Stop presenting the seeded results as still streaming
+            if enhanced_id in enhanced_results_storage:
+                enhanced_results_storage[enhanced_id]['streaming'] = False
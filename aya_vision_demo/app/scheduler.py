@@ -0,0 +1,168 @@
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Hashable, Iterator, Optional
+from app.profiling import profiled_call
+
+# Flow of work submitted outside any flow() block, e.g. by the directory watcher
+DEFAULT_FLOW = 'default'
+
+class _Task:
+    """A queued call, its cost, the submitter's context and the future that receives its result."""
+
+    def __init__(self, function: Callable[..., Any], args: tuple, cost: int,
+                 flow_var: contextvars.ContextVar, flow: Hashable):
+        self.function = function
+        self.args = args
+        self.cost = cost
+        # The call runs in its own flow, even when submitted with an explicit one
+        self.context = contextvars.copy_context()
+        self.context.run(flow_var.set, flow)
+        self.future: Future = Future()
+
+class FairScheduler:
+    """
+    Runs model calls on a shared set of worker threads, fairly across clients.
+
+    Every call belongs to a flow, normally a browser session or API client. Each
+    flow has its own FIFO queue and the workers take calls from the flows by
+    deficit round robin: a flow gets quantum units of credit per turn and spends
+    them on its calls' costs, so a client that queues 50 images and one that
+    queues 5 are served alternately rather than one after the other. At most
+    max_workers calls run at once across all flows; workers are started on
+    demand and exit when every queue is empty. Calls run in a copy of the
+    submitter's context variables, and are profiled along with the submitter
+    when it is being profiled. The flow is one of those variables, so a call
+    that submits further calls, e.g. the tiles of an image, queues them in its
+    own flow.
+    """
+
+    def __init__(self, max_workers: int = 8, quantum: int = 1):
+        self.max_workers = max_workers
+        self.quantum = quantum
+        self._lock = threading.Lock()
+        self._flow: contextvars.ContextVar = contextvars.ContextVar('scheduler_flow', default=None)
+        self._flows: Dict[Hashable, Deque[_Task]] = {}
+        self._deficits: Dict[Hashable, int] = {}
+        self._active: Deque[Hashable] = deque()
+        self._workers = 0
+        self._counts = {'submitted': 0, 'completed': 0}
+
+    @contextmanager
+    def flow(self, key: Hashable) -> Iterator[None]:
+        """
+        Attribute calls submitted in the current context to a flow.
+
+        Args:
+            key: Identifies the client, e.g. its session
+        """
+        token = self._flow.set(key)
+        try:
+            yield
+        finally:
+            self._flow.reset(token)
+
+    def current_flow(self) -> Hashable:
+        """Return the flow of the current context, or DEFAULT_FLOW."""
+        return self._flow.get() or DEFAULT_FLOW
+
+    def submit(self, function: Callable[..., Any], *args: Any,
+               flow: Optional[Hashable] = None, cost: int = 1) -> Future:
+        """
+        Queue a call behind the other calls of its flow.
+
+        Args:
+            function: The call to make
+            *args: Arguments for function
+            flow: The flow to queue it in; by default the current flow
+            cost: Credit the call uses up, e.g. the model calls it makes
+
+        Returns:
+            Future: Receives the function's result; cancelling it before it
+            starts drops the call
+        """
+        key = flow if flow is not None else self.current_flow()
+        task = _Task(function, args, max(1, cost), self._flow, key)
+        with self._lock:
+            queue = self._flows.get(key)
+            if queue is None:
+                queue = self._flows[key] = deque()
+                # A flow arriving when no other is waiting starts its turn at once
+                self._deficits[key] = 0 if self._active else self.quantum
+                self._active.append(key)
+            queue.append(task)
+            self._counts['submitted'] += 1
+            if self._workers < self.max_workers:
+                self._workers += 1
+                thread = threading.Thread(target=self._work, name='model-call-worker')
+                thread.daemon = True  # Daemonize thread to avoid blocking app shutdown
+                thread.start()
+        return task.future
+
+    def _next(self) -> Optional[_Task]:
+        """Take the next call by deficit round robin; the caller holds the lock."""
+        while self._active:
+            key = self._active[0]
+            queue = self._flows[key]
+            if self._deficits[key] >= queue[0].cost:
+                self._deficits[key] -= queue[0].cost
+                task = queue.popleft()
+                if not queue:
+                    # An idle flow keeps no credit, and the next one's turn begins
+                    self._active.popleft()
+                    del self._flows[key]
+                    del self._deficits[key]
+                    if self._active:
+                        self._deficits[self._active[0]] += self.quantum
+                return task
+            # This flow's turn is over; the next one gets its quantum
+            self._active.rotate(-1)
+            self._deficits[self._active[0]] += self.quantum
+        return None
+
+    def _work(self):
+        while True:
+            with self._lock:
+                task = self._next()
+                if task is None:
+                    self._workers -= 1
+                    return
+            if not task.future.set_running_or_notify_cancel():
+                continue
+            try:
+                task.future.set_result(task.context.run(profiled_call, task.function, *task.args))
+            except BaseException as e:
+                task.future.set_exception(e)
+            with self._lock:
+                self._counts['completed'] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the scheduler counters.
+
+        Returns:
+            Dict[str, int]: 'workers' busy now, 'max_workers', calls 'queued' and
+            the 'flows' they belong to, and the running totals of calls
+            'submitted' and 'completed'
+        """
+        with self._lock:
+            return {
+                'workers': self._workers,
+                'max_workers': self.max_workers,
+                'queued': sum(len(queue) for queue in self._flows.values()),
+                'flows': len(self._flows),
+                **self._counts
+            }
+
+def init_app(app):
+    """
+    Size the shared model-call scheduler from the MODEL_CONCURRENCY setting.
+
+    Args:
+        app: The Flask application
+    """
+    from app import utils
+    utils.model_scheduler.max_workers = app.config.get('MODEL_CONCURRENCY', 8)
+    app.extensions['scheduler'] = utils.model_scheduler
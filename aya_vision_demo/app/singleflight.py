@@ -0,0 +1,76 @@
+import copy
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+class _Call:
+    """One in-flight call and the callers waiting on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one.
+
+    The first caller for a key runs the function; callers arriving with the same
+    key while it runs wait for it and receive a copy of its result (or its
+    exception) instead of making the call again. Nothing is kept once the call
+    returns, so this is not a cache: a later caller with the same key calls again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._counts = {'calls': 0, 'shared': 0}
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run function, or wait for the identical call already running.
+
+        Args:
+            key: Identifies calls that would return the same result
+            function: Makes the call
+
+        Returns:
+            Tuple[Any, bool]: A shallow copy of the function's result, so callers
+            can add fields to it without affecting each other, and whether it was
+            shared from another caller's call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counts['calls'] += 1
+            else:
+                self._counts['shared'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.copy(call.result), True
+
+        try:
+            call.result = function()
+            return copy.copy(call.result), False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the call counters.
+
+        Returns:
+            Dict[str, int]: 'calls' made, 'shared' results handed to waiting
+            callers, and 'in_flight' calls running now
+        """
+        with self._lock:
+            return dict(self._counts, in_flight=len(self._calls))
@@ -0,0 +1,144 @@
+/**
+ * Lazy, incrementally loaded results gallery.
+ *
+ * The server renders the first page of cards with their thumbnails unset. This
+ * script then:
+ * - loads each thumbnail when its card nears the viewport
+ * - releases the thumbnail again when the card scrolls far away, so decoded
+ *   images do not pile up in memory
+ * - appends the following pages from the paged JSON API as the user scrolls
+ *
+ * Full images are fetched only when the image modal opens.
+ */
+
+const Gallery = (function() {
+    // 1x1 transparent GIF shown while a thumbnail is not loaded
+    const PLACEHOLDER = 'data:image/gif;base64,R0lGODlhAQABAAAAACH5BAEKAAEALAAAAAABAAEAAAICTAEAOw==';
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text == null ? '' : String(text);
+        return div.innerHTML;
+    }
+
+    /**
+     * Start the gallery.
+     *
+     * @param {Object} options
+     * @param {HTMLElement} options.container - Element holding the .result-item cards
+     * @param {string} options.apiUrl - Paged results API of the batch
+     * @param {string} options.filter - Current filter
+     * @param {string} options.sort - Current sort
+     * @param {number} options.perPage - Results fetched per request
+     * @param {number} options.offset - Position of the first server-rendered card in the order
+     * @param {number} options.total - Number of results in the current filter
+     * @param {function(Object): string} options.renderCard - Returns the HTML of a card for an API result
+     * @param {function(Array)} [options.onAppend] - Called with the results of each appended page
+     */
+    function init(options) {
+        const container = options.container;
+        let total = options.total;
+        let loading = false;
+
+        // Load thumbnails within about two screens of the viewport and unload the rest
+        const thumbnailObserver = new IntersectionObserver(entries => {
+            entries.forEach(entry => {
+                const img = entry.target;
+                if (entry.isIntersecting) {
+                    if (img.getAttribute('src') !== img.dataset.src) img.src = img.dataset.src;
+                } else if (img.getAttribute('src') !== PLACEHOLDER) {
+                    img.src = PLACEHOLDER;
+                }
+            });
+        }, {rootMargin: '150% 0px'});
+
+        function observeThumbnails(root) {
+            root.querySelectorAll('img.thumbnail[data-src]').forEach(img => thumbnailObserver.observe(img));
+        }
+
+        function shown() {
+            return container.querySelectorAll('.result-item').length;
+        }
+
+        function updateRange() {
+            const range = document.getElementById('filter-range');
+            const count = shown();
+            if (range && count > 0) {
+                range.textContent = `${options.offset + 1}–${options.offset + count} of ${total}`;
+            }
+        }
+
+        // The page links are replaced by loading further pages on scroll
+        const pagination = document.querySelector('.results-pagination');
+        if (pagination) pagination.style.display = 'none';
+
+        const sentinel = document.createElement('div');
+        sentinel.className = 'gallery-sentinel';
+        container.after(sentinel);
+
+        function loadMore() {
+            // Cards deleted from the page are gone from the order too, so the offset stays exact
+            const next = options.offset + shown();
+            if (loading || next >= total) return;
+            loading = true;
+            sentinel.classList.add('loading');
+
+            const params = new URLSearchParams({
+                filter: options.filter,
+                sort: options.sort,
+                per_page: options.perPage,
+                offset: next
+            });
+            fetch(`${options.apiUrl}?${params}`)
+                .then(response => {
+                    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                    return response.json();
+                })
+                .then(data => {
+                    total = data.total;
+                    const existing = new Set(Array.from(container.querySelectorAll('.result-item'), el => el.dataset.id));
+                    const results = data.results.filter(result => !existing.has(result.id));
+                    const fragment = document.createElement('div');
+                    fragment.innerHTML = results.map(options.renderCard).join('');
+                    observeThumbnails(fragment);
+                    container.append(...fragment.children);
+                    if (options.onAppend) options.onAppend(results);
+                    updateRange();
+                    loading = false;
+                    sentinel.classList.remove('loading');
+                    // Keep filling while the sentinel is still in view
+                    if (data.next_offset !== null) checkSentinel();
+                })
+                .catch(error => {
+                    console.error('Error loading results:', error);
+                    loading = false;
+                    sentinel.classList.remove('loading');
+                    if (pagination) pagination.style.display = '';
+                });
+        }
+
+        const sentinelObserver = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) loadMore();
+        }, {rootMargin: '100% 0px'});
+
+        function checkSentinel() {
+            // Re-observing reports the current intersection state straight away
+            sentinelObserver.unobserve(sentinel);
+            sentinelObserver.observe(sentinel);
+        }
+
+        observeThumbnails(container);
+        sentinelObserver.observe(sentinel);
+
+        return {
+            // Deleting cards pulls the sentinel up; fetch more if it came into view
+            removed: function() {
+                total = Math.max(0, total - 1);
+                updateRange();
+                checkSentinel();
+            }
+        };
+    }
+
+    return {init: init, escapeHtml: escapeHtml, PLACEHOLDER: PLACEHOLDER};
+})();
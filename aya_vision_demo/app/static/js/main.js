@@ -12,8 +12,8 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
-    // Add fade-in animation to cards
-    const cards = document.querySelectorAll('.card');
+    // Add fade-in animation to cards (result cards are many and load as the page scrolls)
+    const cards = document.querySelectorAll('.card:not(.result-card)');
     cards.forEach((card, index) => {
         card.style.opacity = '0';
         card.style.transform = 'translateY(20px)';
@@ -37,9 +37,6 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Handle image modal
     setupImageModal();
-
-    // Handle filtering and sorting
-    setupFilteringAndSorting();
 });
 
 /**
@@ -257,321 +254,6 @@ function setupImageModal() {
     });
 }
 
-/**
- * Sets up filtering and sorting functionality
- */
-function setupFilteringAndSorting() {
-    console.log('Starting setupFilteringAndSorting');
-    
-    // Get filter and sort elements
-    const filterDropdown = document.getElementById('filterDropdown');
-    const sortDropdown = document.getElementById('sortDropdown');
-    
-    if (!filterDropdown || !sortDropdown) {
-        console.error('Filter or sort dropdown not found in DOM');
-        return;
-    }
-    
-    console.log('Filter dropdown found:', filterDropdown.id);
-    console.log('Sort dropdown found:', sortDropdown.id);
-    
-    // Get filter and sort items
-    const filterItems = filterDropdown.querySelectorAll('.dropdown-item');
-    const sortItems = sortDropdown.querySelectorAll('.dropdown-item');
-    
-    console.log('Filter items found:', filterItems.length);
-    console.log('Sort items found:', sortItems.length);
-    
-    // Get filter info elements
-    const filterInfoText = document.getElementById('filterInfo');
-    
-    // Get all result items
-    const resultItems = document.querySelectorAll('.result-item');
-    
-    console.log('Result items found:', resultItems.length);
-    
-    // Debug: log data attributes of first few result items
-    if (resultItems.length > 0) {
-        console.log('Sample result item attributes:');
-        for (let i = 0; i < Math.min(3, resultItems.length); i++) {
-            const item = resultItems[i];
-            console.log(`Item ${i}:`, {
-                'data-detection-status': item.getAttribute('data-detection-status'),
-                'data-filename': item.getAttribute('data-filename'),
-                'data-subject': item.getAttribute('data-subject'),
-                'classList': Array.from(item.classList)
-            });
-        }
-    }
-    
-    // Initialize from session storage if available
-    let currentFilter = sessionStorage.getItem('currentFilter') || 'all';
-    let currentSort = sessionStorage.getItem('currentSort') || 'filename-asc';
-    
-    console.log('Initial filter from session storage:', currentFilter);
-    console.log('Initial sort from session storage:', currentSort);
-    
-    // Clear any potentially bad stored values
-    if (!['all', 'detected', 'not-detected', 'unknown'].includes(currentFilter)) {
-        console.warn('Invalid filter value in session storage, resetting to "all"');
-        currentFilter = 'all';
-        sessionStorage.setItem('currentFilter', currentFilter);
-    }
-    
-    // Apply initial filter and sort
-    applyFilterAndSort();
-    
-    // Update active classes
-    updateActiveClasses();
-    
-    // Handle filter clicks
-    filterItems.forEach(item => {
-        item.addEventListener('click', function(e) {
-            e.preventDefault();
-            
-            console.log('Filter clicked:', this.dataset.filter);
-            
-            // Update active class
-            filterItems.forEach(i => i.classList.remove('active-option'));
-            this.classList.add('active-option');
-            
-            // Update current filter
-            currentFilter = this.dataset.filter;
-            
-            // Apply filter and sort
-            applyFilterAndSort();
-            
-            // Save to session storage
-            sessionStorage.setItem('currentFilter', currentFilter);
-        });
-    });
-    
-    // Handle sort clicks
-    sortItems.forEach(item => {
-        item.addEventListener('click', function(e) {
-            e.preventDefault();
-            
-            console.log('Sort clicked:', this.dataset.sort);
-            
-            // Update active class
-            sortItems.forEach(i => i.classList.remove('active-option'));
-            this.classList.add('active-option');
-            
-            // Update current sort
-            currentSort = this.dataset.sort;
-            
-            // Apply filter and sort
-            applyFilterAndSort();
-            
-            // Save to session storage
-            sessionStorage.setItem('currentSort', currentSort);
-        });
-    });
-    
-    /**
-     * Applies both filtering and sorting based on current selections
-     */
-    function applyFilterAndSort() {
-        console.log('Applying filter:', currentFilter, 'and sort:', currentSort);
-        
-        // Get the current subject from data attribute
-        let subject = getSubjectFromDom();
-        console.log('Current subject:', subject);
-        
-        // First, filter the items
-        let visibleCount = 0;
-        let hiddenCount = 0;
-        
-        resultItems.forEach(item => {
-            const detectionStatus = item.getAttribute('data-detection-status');
-            const itemSubject = item.getAttribute('data-subject') || subject;
-            const filename = item.getAttribute('data-filename');
-            
-            console.log(`Filtering item: ${filename}, subject: ${itemSubject}, status: ${detectionStatus}`);
-            
-            let visible = false;
-            
-            if (currentFilter === 'all') {
-                visible = true;
-            } else if (currentFilter === 'detected' && detectionStatus === 'true') {
-                visible = true;
-            } else if (currentFilter === 'not-detected' && detectionStatus === 'false') {
-                visible = true;
-            } else if (currentFilter === 'unknown' && detectionStatus === 'unknown') {
-                visible = true;
-            }
-            
-            if (visible) {
-                console.log(`  - Showing item: ${filename} (matches filter: ${currentFilter})`);
-                item.classList.remove('hidden-item');
-                visibleCount++;
-            } else {
-                console.log(`  - Hiding item: ${filename} (doesn't match filter: ${currentFilter})`);
-                item.classList.add('hidden-item');
-                hiddenCount++;
-            }
-        });
-        
-        console.log(`Filtering complete: ${visibleCount} visible items, ${hiddenCount} hidden items`);
-        
-        // Count visible items after filtering
-        const visibleItems = Array.from(resultItems).filter(item => !item.classList.contains('hidden-item'));
-        console.log(`Filtered to ${visibleItems.length} visible items out of ${resultItems.length} total`);
-        
-        // Then, sort the visible items
-        const resultsContainer = document.getElementById('results-container');
-        
-        if (!resultsContainer) {
-            console.error('Results container not found');
-            return;
-        }
-        
-        console.log('Sorting visible items');
-        visibleItems.sort((a, b) => {
-            if (currentSort === 'filename-asc') {
-                return a.getAttribute('data-filename').localeCompare(b.getAttribute('data-filename'));
-            } else if (currentSort === 'filename-desc') {
-                return b.getAttribute('data-filename').localeCompare(a.getAttribute('data-filename'));
-            } else if (currentSort === 'status-asc') {
-                // Sort order: false, unknown, true
-                const aStatus = a.getAttribute('data-detection-status');
-                const bStatus = b.getAttribute('data-detection-status');
-                
-                console.log(`Comparing for sort: ${a.getAttribute('data-filename')} (${aStatus}) vs ${b.getAttribute('data-filename')} (${bStatus})`);
-                
-                if (aStatus === bStatus) return 0;
-                if (aStatus === 'false') return -1;
-                if (bStatus === 'false') return 1;
-                if (aStatus === 'unknown') return -1;
-                if (bStatus === 'unknown') return 1;
-                return 0;
-            } else if (currentSort === 'status-desc') {
-                // Sort order: true, unknown, false
-                const aStatus = a.getAttribute('data-detection-status');
-                const bStatus = b.getAttribute('data-detection-status');
-                
-                if (aStatus === bStatus) return 0;
-                if (aStatus === 'true') return -1;
-                if (bStatus === 'true') return 1;
-                if (aStatus === 'unknown') return -1;
-                if (bStatus === 'unknown') return 1;
-                return 0;
-            }
-            return 0;
-        });
-        
-        // Reorder the DOM elements
-        console.log('Reordering DOM elements');
-        visibleItems.forEach(item => {
-            resultsContainer.appendChild(item);
-        });
-        
-        // Update filter info text
-        updateFilterInfoText();
-    }
-    
-    /**
-     * Gets the current subject from the DOM in a reliable way
-     */
-    function getSubjectFromDom() {
-        // Try multiple sources to get the subject reliably
-        
-        // First try: get from dropdown button with data-subject
-        const fromDropdown = filterDropdown.getAttribute('data-subject');
-        if (fromDropdown) {
-            console.log('Got subject from dropdown:', fromDropdown);
-            return fromDropdown;
-        }
-        
-        // Second try: get from result items if available
-        if (resultItems.length > 0) {
-            const fromItem = resultItems[0].getAttribute('data-subject');
-            if (fromItem) {
-                console.log('Got subject from first result item:', fromItem);
-                return fromItem;
-            }
-        }
-        
-        // Fallback
-        console.log('Using fallback subject: "item"');
-        return 'item';
-    }
-    
-    /**
-     * Updates the filter info text based on current selections
-     */
-    function updateFilterInfoText() {
-        if (!filterInfoText) {
-            console.warn('Filter info text element not found');
-            return;
-        }
-        
-        let filterText = '';
-        let sortText = '';
-        
-        // Get subject from the DOM
-        const subject = getSubjectFromDom();
-        console.log('Using subject for filter text:', subject);
-        
-        // Handle pluralization
-        const pluralSuffix = subject.endsWith('s') ? '' : 's';
-        
-        // Get filter text
-        if (currentFilter === 'all') {
-            filterText = 'all images';
-        } else if (currentFilter === 'detected') {
-            filterText = `images with ${subject}${pluralSuffix} detected`;
-        } else if (currentFilter === 'not-detected') {
-            filterText = `images with no ${subject}${pluralSuffix}`;
-        } else if (currentFilter === 'unknown') {
-            filterText = 'images with unknown status';
-        }
-        
-        // Get sort text
-        if (currentSort === 'filename-asc') {
-            sortText = 'filename (A-Z)';
-        } else if (currentSort === 'filename-desc') {
-            sortText = 'filename (Z-A)';
-        } else if (currentSort === 'status-asc') {
-            sortText = `${subject} status (No → Yes)`;
-        } else if (currentSort === 'status-desc') {
-            sortText = `${subject} status (Yes → No)`;
-        }
-        
-        // Update the info text
-        const newText = `Showing ${filterText}, sorted by ${sortText}`;
-        console.log('Updating filter info text:', newText);
-        filterInfoText.textContent = newText;
-    }
-    
-    /**
-     * Updates the active classes on filter and sort items
-     */
-    function updateActiveClasses() {
-        // Update filter active class
-        filterItems.forEach(item => {
-            if (item.dataset.filter === currentFilter) {
-                item.classList.add('active-option');
-                console.log(`Set active filter option: ${item.dataset.filter}`);
-            } else {
-                item.classList.remove('active-option');
-            }
-        });
-        
-        // Update sort active class
-        sortItems.forEach(item => {
-            if (item.dataset.sort === currentSort) {
-                item.classList.add('active-option');
-                console.log(`Set active sort option: ${item.dataset.sort}`);
-            } else {
-                item.classList.remove('active-option');
-            }
-        });
-    }
-    
-    console.log('setupFilteringAndSorting completed');
-}
-
 /**
  * Updates the counts in the summary section
  */
@@ -608,3 +290,41 @@ function updateCounts() {
         if (unknownElement) unknownElement.textContent = unknown;
     }
 }
+
+/**
+ * Describes the throughput and remaining time of an analysis from a progress response
+ *
+ * @param {Object} data - Progress or job status response
+ * @returns {string} e.g. " · 2.4 images/s · about 35s left", or '' before any image is timed
+ */
+function formatThroughput(data) {
+    if (!data || !data.images_per_second) return '';
+    let text = ` · ${data.images_per_second.toFixed(1)} images/s`;
+    if (data.eta_seconds > 0) {
+        const eta = Math.round(data.eta_seconds);
+        text += eta >= 60 ? ` · about ${Math.floor(eta / 60)}m ${eta % 60}s left` : ` · about ${eta}s left`;
+    }
+    return text;
+}
+
+/**
+ * Describes a batch waiting for a free analysis slot
+ *
+ * @param {Object} data - Progress or job status response
+ * @returns {string} e.g. "Waiting for other analyses to finish (position 2 in the queue)..."
+ */
+function formatQueued(data) {
+    const position = data && data.queue_position ? ` (position ${data.queue_position} in the queue)` : '';
+    return `Waiting for other analyses to finish${position}...`;
+}
+
+/**
+ * Asks the server to stop a running analysis
+ *
+ * @param {string} jobId - Job or progress ID of the analysis
+ * @returns {Promise<Object>} The job's progress after the request
+ */
+function cancelJob(jobId) {
+    return fetch(`/api/jobs/${encodeURIComponent(jobId)}/cancel`, {method: 'POST'})
+        .then(response => response.json());
+}
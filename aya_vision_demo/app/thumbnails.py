@@ -0,0 +1,176 @@
+import collections
+import hashlib
+import io
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger('app.thumbnails')
+
+# Supported thumbnail encodings: config name -> (PIL format, MIME type)
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg')
+}
+
+def encode_thumbnail(image_data: bytes, size: int = 300, fmt: str = 'webp', quality: int = 80) -> bytes:
+    """
+    Downscale an image so its longer side is at most size and encode it compactly.
+
+    WebP is encoded lossy; JPEG is encoded progressive and optimized, with any
+    transparency flattened onto white.
+
+    Args:
+        image_data: The binary image data
+        size: Longest side of the thumbnail in pixels
+        fmt: 'webp' or 'jpeg'
+        quality: Encoder quality (1-100)
+
+    Returns:
+        bytes: The encoded thumbnail
+    """
+    from PIL import Image
+    
+    pil_format = THUMBNAIL_FORMATS[fmt][0]
+    image = Image.open(io.BytesIO(image_data))
+    # Let JPEG decode straight to a reduced scale before resampling
+    image.draft('RGB', (size, size))
+    image.thumbnail((size, size), Image.LANCZOS)
+
+    if image.mode in ('RGBA', 'LA', 'P') and pil_format == 'JPEG':
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    elif image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    buffer = io.BytesIO()
+    if pil_format == 'JPEG':
+        image.save(buffer, format='JPEG', quality=quality, progressive=True, optimize=True)
+    else:
+        image.save(buffer, format='WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+class ThumbnailCache:
+    """
+    Thread-safe LRU cache of encoded thumbnails keyed by image content hash.
+
+    The same image uploaded again, re-analyzed or requested at a size already
+    produced costs a hash instead of a decode and re-encode.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key: Tuple, factory: Callable[[], bytes]) -> bytes:
+        """
+        Return the cached value for key, creating and caching it on a miss.
+
+        Args:
+            key: The cache key
+            factory: Produces the value on a miss (called outside the lock)
+
+        Returns:
+            bytes: The cached or newly created value
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = factory()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the cache size and hit counters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(len(v) for v in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+# Process-wide settings, set from the app config by init_app
+settings = {
+    'format': 'webp',
+    'sizes': [300],
+    'quality': 80,
+    'format_checked': False
+}
+cache = ThumbnailCache()
+
+def init_app(app):
+    """
+    Apply the THUMBNAIL_* settings of an app to the process-wide thumbnail settings.
+
+    Args:
+        app: The Flask application
+    """
+    fmt = app.config.get('THUMBNAIL_FORMAT', 'webp').lower()
+    if fmt not in THUMBNAIL_FORMATS:
+        raise ValueError(f"THUMBNAIL_FORMAT must be one of {', '.join(THUMBNAIL_FORMATS)}")
+
+    settings['format'] = fmt
+    settings['format_checked'] = False
+    settings['sizes'] = list(app.config.get('THUMBNAIL_SIZES') or [300])
+    settings['quality'] = app.config.get('THUMBNAIL_QUALITY', 80)
+    cache.max_entries = app.config.get('THUMBNAIL_CACHE_ENTRIES', cache.max_entries)
+
+def thumbnail_format() -> str:
+    """
+    Return the thumbnail format in use.
+
+    WebP support is checked on first use, rather than at startup, so that Pillow
+    is not imported until an image is handled. Falls back to progressive JPEG when
+    Pillow was built without WebP support.
+
+    Returns:
+        str: A key of THUMBNAIL_FORMATS
+    """
+    if not settings['format_checked']:
+        if settings['format'] == 'webp':
+            from PIL import features
+            if not features.check('webp'):
+                logger.warning("Pillow has no WebP support; using progressive JPEG thumbnails")
+                settings['format'] = 'jpeg'
+        settings['format_checked'] = True
+    return settings['format']
+
+def content_hash(data: bytes) -> str:
+    """Hex SHA-256 of some bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+def get_thumbnail(image_data: bytes, size: Optional[int] = None, digest: Optional[str] = None) -> bytes:
+    """
+    Return the thumbnail of an image in the configured format, from the cache when possible.
+
+    Args:
+        image_data: The binary image data
+        size: Longest side in pixels (defaults to the first configured size)
+        digest: The content hash of image_data, if already known
+
+    Returns:
+        bytes: The encoded thumbnail
+    """
+    size = size or settings['sizes'][0]
+    fmt = thumbnail_format()
+    quality = settings['quality']
+    key = (digest or content_hash(image_data), size, fmt, quality)
+    return cache.get_or_create(key, lambda: encode_thumbnail(image_data, size, fmt, quality))
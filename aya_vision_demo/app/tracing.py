@@ -0,0 +1,345 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from flask import g
+
+logger = logging.getLogger(__name__)
+
+# Service name exported in the OTLP resource
+SERVICE_NAME = 'aya-vision-demo'
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# (trace key, span ID) of the span the current context is inside
+_current: ContextVar[Optional[Tuple[str, str]]] = ContextVar('trace_span', default=None)
+
+class Span:
+    """One timed stage of a trace, with its parent and attributes."""
+
+    __slots__ = ('trace_key', 'span_id', 'parent_id', 'name', 'attributes', 'start_ns', 'end_ns', 'error')
+
+    def __init__(self, trace_key: str, name: str, parent_id: Optional[str] = None,
+                 start_ns: Optional[int] = None, **attributes: Any):
+        self.trace_key = trace_key
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any):
+        """Add an attribute known only once the stage has run, e.g. an image ID."""
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serializable representation; times are in nanoseconds since the epoch."""
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'attributes': dict(self.attributes),
+            'error': self.error
+        }
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def otlp_trace_id(trace_key: str) -> str:
+    """Return the 32-hex-digit OTLP trace ID of a trace key, e.g. a job's UUID."""
+    try:
+        return uuid.UUID(trace_key).hex
+    except ValueError:
+        return uuid.uuid5(uuid.NAMESPACE_URL, trace_key).hex
+
+def to_otlp(trace_key: str, spans: List[Span]) -> Dict[str, Any]:
+    """
+    Format a trace as an OTLP/JSON ExportTraceServiceRequest.
+
+    Args:
+        trace_key: The trace's key; kept as the 'job.id' attribute of every span
+        spans: The finished spans
+
+    Returns:
+        Dict[str, Any]: The request body, loadable by OTLP/JSON tooling
+    """
+    trace_id = otlp_trace_id(trace_key)
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': [{
+                    'traceId': trace_id,
+                    'spanId': span.span_id,
+                    'parentSpanId': span.parent_id or '',
+                    'name': span.name,
+                    'kind': 1,
+                    'startTimeUnixNano': str(span.start_ns),
+                    'endTimeUnixNano': str(span.end_ns),
+                    'attributes': [
+                        {'key': key, 'value': _otlp_value(value)}
+                        for key, value in dict(span.attributes, **{'job.id': trace_key}).items()
+                        if value is not None
+                    ],
+                    'status': {'code': STATUS_ERROR, 'message': span.error} if span.error else {'code': STATUS_OK}
+                } for span in spans]
+            }]
+        }]
+    }
+
+class Tracer:
+    """
+    Collects the spans of recent traces and exports each finished trace to a file.
+
+    A trace is keyed by its job ID and collects spans from the request that
+    submits the job, the admission queue, the background work and the model
+    calls. The last `keep` traces are kept in memory for the waterfall view. When
+    `path` is set, a trace is appended there as one line of OTLP/JSON once its
+    root span (trace()) ends.
+    """
+
+    def __init__(self, enabled: bool = True, path: Optional[str] = None, keep: int = 100):
+        self.enabled = enabled
+        self.path = path
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._traces: 'OrderedDict[str, List[Span]]' = OrderedDict()
+
+    def _add(self, span: Span):
+        with self._lock:
+            spans = self._traces.get(span.trace_key)
+            if spans is None:
+                spans = self._traces[span.trace_key] = []
+                while len(self._traces) > self.keep:
+                    self._traces.popitem(last=False)
+            spans.append(span)
+
+    def __contains__(self, trace_key: str) -> bool:
+        with self._lock:
+            return trace_key in self._traces
+
+    def spans(self, trace_key: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the finished spans of a trace, ordered by start time.
+
+        Args:
+            trace_key: The job ID
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Span dicts (see Span.to_dict), or None
+            if the trace is unknown or no longer kept
+        """
+        with self._lock:
+            spans = self._traces.get(trace_key)
+            if spans is None:
+                return None
+            spans = list(spans)
+        return [span.to_dict() for span in sorted(spans, key=lambda span: span.start_ns)]
+
+    def export(self, trace_key: str):
+        """Append a trace to the export file, if one is configured."""
+        if not self.path:
+            return
+        with self._lock:
+            spans = list(self._traces.get(trace_key, []))
+            if not spans:
+                return
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as sink:
+                    sink.write(json.dumps(to_otlp(trace_key, spans)) + '\n')
+            except OSError as e:
+                logger.warning(f"Could not export trace {trace_key} to {self.path}: {e}")
+
+    @contextmanager
+    def _run(self, span: Span) -> Iterator[Span]:
+        token = _current.set((span.trace_key, span.span_id))
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            span.end_ns = time.time_ns()
+            self._add(span)
+
+    @contextmanager
+    def trace(self, trace_key: str, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """
+        Run the root span of a trace, and export the trace when it ends.
+
+        Args:
+            trace_key: The job ID the spans are correlated by
+            name: Name of the root span
+            **attributes: Span attributes
+
+        Yields:
+            Optional[Span]: The root span, or None while tracing is disabled
+        """
+        if not self.enabled:
+            yield None
+            return
+        try:
+            with self._run(Span(trace_key, name, **attributes)) as root:
+                yield root
+        finally:
+            self.export(trace_key)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """
+        Time a stage as a child of the current span.
+
+        Outside a trace, or while tracing is disabled, nothing is recorded.
+
+        Args:
+            name: Name of the stage
+            **attributes: Span attributes, e.g. 'image.index' or 'attempt'
+
+        Yields:
+            Optional[Span]: The span, or None if nothing is recorded
+        """
+        current = _current.get()
+        if current is None or not self.enabled:
+            yield None
+            return
+        with self._run(Span(current[0], name, parent_id=current[1], **attributes)) as span:
+            yield span
+
+    def record(self, name: str, start_ns: int, trace_key: Optional[str] = None, **attributes: Any):
+        """
+        Record a stage that has already happened, e.g. time spent waiting in a queue.
+
+        It becomes a child of the current span, or a root span of trace_key.
+
+        Args:
+            name: Name of the stage
+            start_ns: When it started (time.time_ns()); it ends now
+            trace_key: The trace to record it in when not inside a span
+            **attributes: Span attributes
+        """
+        if not self.enabled:
+            return
+        current = _current.get()
+        if current is not None:
+            span = Span(current[0], name, parent_id=current[1], start_ns=start_ns, **attributes)
+        elif trace_key is not None:
+            span = Span(trace_key, name, start_ns=start_ns, **attributes)
+        else:
+            return
+        span.end_ns = time.time_ns()
+        self._add(span)
+
+# The process's tracer; configured from the TRACING_* settings by init_app
+tracer = Tracer()
+
+def init_app(app):
+    """
+    Configure the tracer from the app's TRACING_* settings.
+
+    Args:
+        app: The Flask application
+    """
+    tracer.enabled = app.config.get('TRACING_ENABLED', True)
+    tracer.path = app.config.get('TRACING_FILE') or None
+    tracer.keep = app.config.get('TRACING_KEEP', 100)
+    app.extensions['tracer'] = tracer
+
+    @app.before_request
+    def note_request_start():
+        # Requests that submit a job record their handling as its first span
+        g.request_started_ns = time.time_ns()
+
+def critical_path(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Summarize where a trace's time went.
+
+    Args:
+        spans: The trace's span dicts (see Tracer.spans)
+
+    Returns:
+        Dict[str, Any]: 'duration_ms' of the whole trace, 'stages' with the
+        total and longest milliseconds per span name (slowest total first), and
+        'slowest_image', the longest 'image' span
+    """
+    if not spans:
+        return {'duration_ms': 0, 'stages': [], 'slowest_image': None}
+    start = min(span['start_ns'] for span in spans)
+    end = max(span['end_ns'] for span in spans)
+    stages: Dict[str, Dict[str, Any]] = {}
+    for span in spans:
+        duration = (span['end_ns'] - span['start_ns']) / 1e6
+        stage = stages.setdefault(span['name'], {'name': span['name'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        stage['count'] += 1
+        stage['total_ms'] += duration
+        stage['max_ms'] = max(stage['max_ms'], duration)
+    images = [span for span in spans if span['name'] == 'image']
+    slowest = max(images, key=lambda span: span['end_ns'] - span['start_ns'], default=None)
+    return {
+        'duration_ms': round((end - start) / 1e6, 3),
+        'stages': [
+            dict(stage, total_ms=round(stage['total_ms'], 3), max_ms=round(stage['max_ms'], 3))
+            for stage in sorted(stages.values(), key=lambda stage: stage['total_ms'], reverse=True)
+        ],
+        'slowest_image': slowest
+    }
+
+def waterfall(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Lay out a trace's spans as waterfall rows, each under its parent.
+
+    Args:
+        spans: The trace's span dicts, ordered by start time (see Tracer.spans)
+
+    Returns:
+        List[Dict[str, Any]]: The span dicts in tree order, each with its 'depth',
+        'offset_ms' from the start of the trace, 'duration_ms', and the
+        'left_percent' and 'width_percent' of its bar
+    """
+    if not spans:
+        return []
+    start = min(span['start_ns'] for span in spans)
+    total = max(max(span['end_ns'] for span in spans) - start, 1)
+    known = {span['span_id'] for span in spans}
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for span in spans:
+        # Spans whose parent was not kept are shown at the top level
+        parent = span['parent_id'] if span['parent_id'] in known else None
+        children.setdefault(parent, []).append(span)
+
+    rows = []
+    pending = [(span, 0) for span in reversed(children.get(None, []))]
+    while pending:
+        span, depth = pending.pop()
+        rows.append(dict(
+            span,
+            depth=depth,
+            offset_ms=round((span['start_ns'] - start) / 1e6, 3),
+            duration_ms=round((span['end_ns'] - span['start_ns']) / 1e6, 3),
+            left_percent=round((span['start_ns'] - start) * 100 / total, 3),
+            width_percent=round(max((span['end_ns'] - span['start_ns']) * 100 / total, 0.2), 3)
+        ))
+        pending.extend((child, depth + 1) for child in reversed(children.get(span['span_id'], [])))
+    return rows
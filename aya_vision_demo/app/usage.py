@@ -0,0 +1,126 @@
+import datetime
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Iterator, Optional
+
+# Counters of one usage total
+USAGE_FIELDS = ('calls', 'errors', 'input_tokens', 'output_tokens', 'request_bytes', 'response_bytes')
+
+# Batch and session totals kept in memory; the least recently charged are dropped first
+MAX_BATCHES = 1000
+MAX_SESSIONS = 1000
+# Days of daily totals kept
+MAX_DAYS = 31
+
+# The batch and session model calls of the current context are charged to
+_scope: ContextVar[Optional[Dict[str, Hashable]]] = ContextVar('usage_scope', default=None)
+
+def empty_usage() -> Dict[str, int]:
+    """Return a usage total with every counter at zero."""
+    return dict.fromkeys(USAGE_FIELDS, 0)
+
+def add_usage(total: Dict[str, int], usage: Dict[str, int]) -> Dict[str, int]:
+    """Add the counters of usage to total in place and return total."""
+    for field in USAGE_FIELDS:
+        total[field] = total.get(field, 0) + usage.get(field, 0)
+    return total
+
+@contextmanager
+def usage_scope(batch: Optional[Hashable] = None, session: Optional[Hashable] = None) -> Iterator[None]:
+    """
+    Charge the model calls made in this context to a batch and a session.
+
+    The scope is a context variable, so it follows work handed to the
+    scheduler's workers, which run each call in a copy of the submitter's context.
+
+    Args:
+        batch: The batch's job or progress ID
+        session: The client's flow key
+    """
+    token = _scope.set({'batch': batch, 'session': session})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+class UsageLedger:
+    """
+    Totals of billed tokens and payload bytes of the model calls, per batch, session and day.
+
+    A call is recorded once, where the request is made: results handed to
+    identical requests by single-flight are not charged again. Failed attempts
+    are recorded too, as calls and errors, since their payload was uploaded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._total = empty_usage()
+        self._batches: 'OrderedDict[Hashable, Dict[str, int]]' = OrderedDict()
+        self._sessions: 'OrderedDict[Hashable, Dict[str, int]]' = OrderedDict()
+        self._days: 'OrderedDict[str, Dict[str, int]]' = OrderedDict()
+
+    @staticmethod
+    def _charge(totals: 'OrderedDict[Hashable, Dict[str, int]]', key: Hashable, usage: Dict[str, int], limit: int):
+        if key not in totals:
+            totals[key] = empty_usage()
+            while len(totals) > limit:
+                totals.popitem(last=False)
+        totals.move_to_end(key)
+        add_usage(totals[key], usage)
+
+    def record(self, input_tokens: Optional[int] = None, output_tokens: Optional[int] = None,
+               request_bytes: int = 0, response_bytes: int = 0, error: bool = False):
+        """
+        Record one request to the model under the current usage scope.
+
+        Args:
+            input_tokens: Billed input tokens, if reported
+            output_tokens: Billed output tokens, if reported
+            request_bytes: Bytes of the request payload sent
+            response_bytes: Bytes of the generated text received
+            error: The request failed
+        """
+        usage = {
+            'calls': 1,
+            'errors': int(error),
+            'input_tokens': input_tokens or 0,
+            'output_tokens': output_tokens or 0,
+            'request_bytes': request_bytes,
+            'response_bytes': response_bytes
+        }
+        scope = _scope.get() or {}
+        with self._lock:
+            add_usage(self._total, usage)
+            self._charge(self._days, datetime.date.today().isoformat(), usage, MAX_DAYS)
+            if scope.get('batch') is not None:
+                self._charge(self._batches, scope['batch'], usage, MAX_BATCHES)
+            if scope.get('session') is not None:
+                self._charge(self._sessions, scope['session'], usage, MAX_SESSIONS)
+
+    def batch(self, batch: Hashable) -> Dict[str, int]:
+        """Return a copy of a batch's total (zero if it made no calls)."""
+        with self._lock:
+            return dict(self._batches.get(batch) or empty_usage())
+
+    def session(self, session: Hashable) -> Dict[str, int]:
+        """Return a copy of a session's total (zero if it made no calls)."""
+        with self._lock:
+            return dict(self._sessions.get(session) or empty_usage())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the process-wide totals.
+
+        Returns:
+            Dict[str, Any]: The 'total' since start-up, 'today' and the daily
+            totals under 'days', keyed by ISO date
+        """
+        with self._lock:
+            today = datetime.date.today().isoformat()
+            return {
+                'total': dict(self._total),
+                'today': dict(self._days.get(today) or empty_usage()),
+                'days': {day: dict(usage) for day, usage in self._days.items()}
+            }
@@ -1,28 +1,49 @@
 import base64
+import hashlib
 import io
 import logging
 import os
+import threading
 import time
-from typing import Dict, List, Tuple, Optional, Any, Callable
-from PIL import Image
-import cohere
+from typing import TYPE_CHECKING, Dict, List, Tuple, Optional, Any, Callable
 from werkzeug.utils import secure_filename
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, wait
+from app.models import ModelResponse, DetectionRecord, EnhancedRecord
+from app.prefilter import prefilter_options, score_image
+from app.scheduler import FairScheduler
+from app.singleflight import SingleFlight
+from app.thumbnails import get_thumbnail
+from app.tracing import tracer
+from app.usage import UsageLedger
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+if TYPE_CHECKING:
+    import cohere
+
+# Identical model calls running at the same time share one request, e.g. when two
+# sessions upload the same frames or an image appears twice in a batch
+model_calls = SingleFlight()
+
+# Shared workers that make the batch functions' model calls, fairly across sessions
+model_scheduler = FairScheduler()
+
+# Billed tokens and payload bytes of the model calls, per batch, session and day
+usage_ledger = UsageLedger()
+
+# Logging is configured by create_app (and the CLI entry points)
 logger = logging.getLogger(__name__)
 
-def setup_client() -> cohere.ClientV2:
+def setup_client() -> 'cohere.ClientV2':
     """
     Create and configure a Cohere ClientV2 instance.
     
+    The SDK is imported on first use rather than with this module, as it
+    accounts for most of the app's import time.
+    
     Returns:
         cohere.ClientV2: Configured Cohere client
     """
+    import cohere
+    
     client = cohere.ClientV2(
         base_url="https://stg.api.cohere.ai",
         api_key=os.getenv("COHERE_API_KEY"),
@@ -57,6 +78,7 @@ def encode_image_to_base64(image_file) -> Tuple[str, str]:
     image_content = image_file.read()
     
     # Get the MIME type
+    from PIL import Image
     image = Image.open(io.BytesIO(image_content))
     mime_type = f"image/{image.format.lower()}"
     
@@ -65,6 +87,20 @@ def encode_image_to_base64(image_file) -> Tuple[str, str]:
     
     return encoded_image, mime_type
 
+def get_image_mime_type(image_data: bytes) -> str:
+    """
+    Determine the MIME type of binary image data.
+    
+    Args:
+        image_data: The binary image data
+        
+    Returns:
+        str: The MIME type of the image
+    """
+    from PIL import Image
+    image = Image.open(io.BytesIO(image_data))
+    return f"image/{image.format.lower()}"
+
 def create_thumbnail(image_data: bytes, size: Tuple[int, int] = (300, 300)) -> str:
     """
     Create a thumbnail from image data.
@@ -76,39 +112,66 @@ def create_thumbnail(image_data: bytes, size: Tuple[int, int] = (300, 300)) -> s
     Returns:
         str: Base64 encoded thumbnail
     """
-    # Create a thumbnail
-    image = Image.open(io.BytesIO(image_data))
-    
-    # Calculate new dimensions while preserving aspect ratio
-    width, height = image.size
-    aspect_ratio = width / height
-    
-    if width > height:
-        new_width = min(width, size[0])
-        new_height = int(new_width / aspect_ratio)
-    else:
-        new_height = min(height, size[1])
-        new_width = int(new_height * aspect_ratio)
-    
-    # Resize the image with high quality (LANCZOS is high quality)
-    image = image.resize((new_width, new_height), Image.LANCZOS)
-    
-    # Save the thumbnail to a bytes buffer with high quality
-    buffer = io.BytesIO()
-    
-    # For JPEG format, specify high quality
-    if image.format == 'JPEG':
-        image.save(buffer, format='JPEG', quality=90)
-    else:
-        # For other formats, use their default settings
-        image.save(buffer, format=image.format or 'PNG')
-    
-    buffer.seek(0)
+    return base64.b64encode(create_thumbnail_bytes(image_data, size)).decode('utf-8')
+
+def create_thumbnail_bytes(image_data: bytes, size: Tuple[int, int] = (300, 300)) -> bytes:
+    """
+    Create a thumbnail from image data.
     
-    # Encode to base64
-    encoded_thumbnail = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    The thumbnail is encoded in the configured compact format (see app.thumbnails)
+    and cached by the image's content hash, so repeated images are not re-encoded.
     
-    return encoded_thumbnail
+    Args:
+        image_data: The binary image data
+        size: The size of the thumbnail (width, height)
+        
+    Returns:
+        bytes: The encoded thumbnail
+    """
+    return get_thumbnail(image_data, max(size))
+
+def image_data_uri(base64_image: str, mime_type: str) -> str:
+    """Return the data URI an image is sent to the API as."""
+    return f"data:{mime_type};base64,{base64_image}"
+
+def request_payload_bytes(base64_image: str, mime_type: str, prompt: str) -> int:
+    """
+    Estimate the bytes uploaded by one image request: its data URI and prompt.
+
+    The JSON framing around them is a few dozen bytes and is not counted.
+    """
+    return len(image_data_uri(base64_image, mime_type)) + len(prompt.encode('utf-8'))
+
+def build_image_messages(base64_image: str, mime_type: str, prompt: str) -> List[Dict[str, Any]]:
+    """
+    Build the Chat V2 messages payload for a single image and prompt.
+
+    Args:
+        base64_image: Base64 encoded image
+        mime_type: MIME type of the image
+        prompt: Prompt to send to the model
+
+    Returns:
+        List[Dict[str, Any]]: The messages list for the Chat V2 API
+    """
+    # Format the image for the API
+    image_uri = image_data_uri(base64_image, mime_type)
+
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": prompt
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {"url": image_uri}
+                }
+            ]
+        }
+    ]
 
 def analyze_image_with_cohere(
     api_key: str,
@@ -134,7 +197,8 @@ def analyze_image_with_cohere(
         temperature: Temperature setting for the model (0.0-1.0, lower for more deterministic responses)
         
     Returns:
-        Dict[str, Any]: The API response
+        Dict[str, Any]: The API response; 'shared' is set when it came from an
+        identical request that was already in flight
         
     Raises:
         Exception: If the API call fails after all retries
@@ -142,31 +206,40 @@ def analyze_image_with_cohere(
     if not api_key:
         raise ValueError("Cohere API key is required")
     
+    # Concurrent requests for the same image, model, prompt and temperature share one call
+    key = (hashlib.sha256(base64_image.encode('ascii')).hexdigest(), model_name, prompt, temperature)
+    with tracer.span('analyze_image_with_cohere', model=model_name) as span:
+        result, shared = model_calls.do(key, lambda: _call_cohere_chat(
+            api_key, base64_image, mime_type, model_name, prompt, max_retries, retry_delay, temperature
+        ))
+        if span is not None:
+            span.set_attribute('shared', shared)
+    if shared:
+        logger.info("Shared the result of an identical in-flight Cohere request")
+        result['shared'] = True
+    return result
+
+def _call_cohere_chat(
+    api_key: str,
+    base64_image: str,
+    mime_type: str,
+    model_name: str,
+    prompt: str,
+    max_retries: int,
+    retry_delay: int,
+    temperature: float
+) -> Dict[str, Any]:
+    """Make the Chat V2 call of analyze_image_with_cohere, with retries."""
+
     # Set the API key in the environment for the setup_client method
     os.environ["COHERE_API_KEY"] = api_key
     
     # Initialize the Cohere client using the setup_client method
     co = setup_client()
     
-    # Format the image for the API
-    image_uri = f"data:{mime_type};base64,{base64_image}"
-    
     # Prepare the request using V2 Chat API format
-    messages = [
-        {
-            "role": "user",
-            "content": [
-                {
-                    "type": "text",
-                    "text": prompt
-                },
-                {
-                    "type": "image_url",
-                    "image_url": {"url": image_uri}
-                }
-            ]
-        }
-    ]
+    messages = build_image_messages(base64_image, mime_type, prompt)
+    request_bytes = request_payload_bytes(base64_image, mime_type, prompt)
     
     # Implement retry logic with exponential backoff
     for attempt in range(max_retries):
@@ -174,27 +247,126 @@ def analyze_image_with_cohere(
             logger.info(f"Sending request to Cohere Chat V2 API (attempt {attempt + 1}/{max_retries})")
             
             # Make the API call using the V2 Chat API
-            response = co.chat(
-                model=model_name,
-                messages=messages,
-                temperature=temperature,  # Use the provided temperature parameter
-            )
+            with tracer.span('cohere.chat', attempt=attempt + 1, request_bytes=request_bytes):
+                response = co.chat(
+                    model=model_name,
+                    messages=messages,
+                    temperature=temperature,  # Use the provided temperature parameter
+                )
             
             # Extract the text response from the message content
             response_text = response.message.content[0].text
+            model_response = ModelResponse.from_usage(response_text, response.id, response.usage)
+            usage_ledger.record(
+                model_response.input_tokens, model_response.output_tokens,
+                request_bytes, len(response_text.encode('utf-8'))
+            )
             
             return {
                 "success": True,
                 "response": response_text,
-                "raw_response": response
+                "model_response": model_response
             }
         except Exception as e:
+            usage_ledger.record(request_bytes=request_bytes, error=True)
             logger.error(f"Error calling Cohere API: {str(e)}")
             if attempt < max_retries - 1:
                 # Calculate exponential backoff delay
                 sleep_time = retry_delay * (2 ** attempt)
                 logger.info(f"Retrying in {sleep_time} seconds...")
-                time.sleep(sleep_time)
+                with tracer.span('retry_backoff', attempt=attempt + 1):
+                    time.sleep(sleep_time)
+            else:
+                return {
+                    "success": False,
+                    "error": str(e)
+                }
+
+def stream_image_analysis_with_cohere(
+    api_key: str,
+    base64_image: str,
+    mime_type: str,
+    model_name: str,
+    prompt: str,
+    delta_callback: Optional[Callable[[str], None]] = None,
+    max_tokens: Optional[int] = None,
+    max_retries: int = 3,
+    retry_delay: int = 1,
+    temperature: float = 0.3
+) -> Dict[str, Any]:
+    """
+    Send an image to Cohere API for analysis using the streaming Chat V2 API.
+
+    Args:
+        api_key: Cohere API key
+        base64_image: Base64 encoded image
+        mime_type: MIME type of the image
+        model_name: Name of the Cohere model to use
+        prompt: Prompt to send to the model
+        delta_callback: Called with the accumulated text each time a new chunk arrives
+        max_tokens: Upper bound on generated tokens (None for the model default)
+        max_retries: Maximum number of retries for transient errors
+        retry_delay: Initial delay between retries (will be exponentially increased)
+        temperature: Temperature setting for the model (0.0-1.0, lower for more deterministic responses)
+
+    Returns:
+        Dict[str, Any]: The API response, in the same shape as analyze_image_with_cohere
+    """
+    if not api_key:
+        raise ValueError("Cohere API key is required")
+
+    # Set the API key in the environment for the setup_client method
+    os.environ["COHERE_API_KEY"] = api_key
+
+    co = setup_client()
+    messages = build_image_messages(base64_image, mime_type, prompt)
+    request_bytes = request_payload_bytes(base64_image, mime_type, prompt)
+
+    for attempt in range(max_retries):
+        text = ''
+        response_id = None
+        usage = None
+        try:
+            logger.info(f"Streaming request to Cohere Chat V2 API (attempt {attempt + 1}/{max_retries})")
+
+            stream_kwargs = {'model': model_name, 'messages': messages, 'temperature': temperature}
+            if max_tokens:
+                stream_kwargs['max_tokens'] = max_tokens
+
+            with tracer.span('cohere.chat_stream', attempt=attempt + 1, request_bytes=request_bytes):
+                for event in co.chat_stream(**stream_kwargs):
+                    if event.type == "message-start":
+                        response_id = event.id
+                    elif event.type == "message-end" and event.delta:
+                        usage = event.delta.usage
+                    elif event.type == "content-delta":
+                        text += event.delta.message.content.text
+                        if delta_callback:
+                            delta_callback(text)
+
+            model_response = ModelResponse.from_usage(text, response_id, usage)
+            usage_ledger.record(
+                model_response.input_tokens, model_response.output_tokens,
+                request_bytes, len(text.encode('utf-8'))
+            )
+            return {
+                "success": True,
+                "response": text,
+                "model_response": model_response
+            }
+        except Exception as e:
+            usage_ledger.record(
+                request_bytes=request_bytes, response_bytes=len(text.encode('utf-8')), error=True
+            )
+            logger.error(f"Error streaming from Cohere API: {str(e)}")
+            if attempt < max_retries - 1:
+                # A retry starts the generation over, so clear any partial text already shown
+                if text and delta_callback:
+                    delta_callback('')
+                sleep_time = retry_delay * (2 ** attempt)
+                logger.info(f"Retrying in {sleep_time} seconds...")
+                with tracer.span('retry_backoff', attempt=attempt + 1):
+                    time.sleep(sleep_time)
             else:
                 return {
                     "success": False,
@@ -230,118 +402,476 @@ def parse_detection_result(response: str) -> Optional[bool]:
     logger.warning(f"Could not parse detection result from response: {response}")
     return None
 
+def _tile_origins(length: int, tile_size: int, stride: int) -> List[int]:
+    """Start offsets of tiles along one axis, with the last tile flush with the edge."""
+    if length <= tile_size:
+        return [0]
+    origins = list(range(0, length - tile_size, stride))
+    origins.append(length - tile_size)
+    return origins
+
+def split_into_tiles(image_data: bytes, tile_size: int, overlap: float = 0.2) -> List[Tuple[Tuple[int, int, int, int], bytes]]:
+    """
+    Split an image into overlapping square tiles.
+    
+    Args:
+        image_data: The binary image data
+        tile_size: Side length of a tile in pixels
+        overlap: Fraction of a tile shared with its neighbour (0.0-0.9)
+        
+    Returns:
+        List[Tuple[Tuple[int, int, int, int], bytes]]: The (left, top, right, bottom) box
+        and encoded bytes of each tile, row by row; an image that fits in one tile is
+        returned unchanged as a single tile
+    """
+    from PIL import Image
+    image = Image.open(io.BytesIO(image_data))
+    width, height = image.size
+    if width <= tile_size and height <= tile_size:
+        return [((0, 0, width, height), image_data)]
+    
+    image_format = image.format or 'PNG'
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    stride = max(1, int(tile_size * (1 - min(max(overlap, 0.0), 0.9))))
+    
+    tiles = []
+    for top in _tile_origins(height, tile_size, stride):
+        for left in _tile_origins(width, tile_size, stride):
+            box = (left, top, min(left + tile_size, width), min(top + tile_size, height))
+            buffer = io.BytesIO()
+            if image_format == 'JPEG':
+                image.crop(box).save(buffer, format='JPEG', quality=90)
+            else:
+                image.crop(box).save(buffer, format=image_format)
+            tiles.append((box, buffer.getvalue()))
+    return tiles
+
+def analyze_image_tiled(
+    api_key: str,
+    image_data: bytes,
+    mime_type: str,
+    model_name: str,
+    prompt: str,
+    tile_size: int,
+    overlap: float = 0.2,
+    max_workers: int = 4
+) -> Dict[str, Any]:
+    """
+    Run the detection prompt over overlapping tiles of an image, stopping at the first positive.
+    
+    Tiles are analyzed in parallel on the shared model_scheduler, in the current
+    flow, so they count against MODEL_CONCURRENCY like any other model call. The
+    image itself usually holds one of the scheduler's workers, so a tile no
+    worker has picked up yet is run on the current thread instead of waited for.
+    As soon as one tile is positive the tiles that have not started are cancelled
+    and the result is returned; calls already in flight finish in the background
+    and are ignored.
+    
+    Args:
+        api_key: Cohere API key
+        image_data: The binary image data
+        mime_type: MIME type of the image
+        model_name: Name of the Cohere model to use
+        prompt: The detection prompt
+        tile_size: Side length of a tile in pixels
+        overlap: Fraction of a tile shared with its neighbour
+        max_workers: Tiles handed to the scheduler at a time per image
+        
+    Returns:
+        Dict[str, Any]: Like analyze_image_with_cohere, plus 'detection_result' and
+        'tile' ({'index', 'box', 'tiles', 'analyzed'} for multi-tile images, else None).
+        The result is positive if any tile is, negative only if every tile is, and
+        unknown otherwise; it fails if a tile failed and none was positive
+    """
+    with tracer.span('split_into_tiles'):
+        tiles = split_into_tiles(image_data, tile_size, overlap)
+    
+    def analyze_tile(tile_bytes):
+        result = analyze_image_with_cohere(
+            api_key=api_key,
+            base64_image=base64.b64encode(tile_bytes).decode('utf-8'),
+            mime_type=mime_type,
+            model_name=model_name,
+            prompt=prompt
+        )
+        result['detection_result'] = parse_detection_result(result['response']) if result['success'] else None
+        return result
+    
+    if len(tiles) == 1:
+        result = analyze_tile(tiles[0][1])
+        result['tile'] = None
+        return result
+    
+    def tile_results():
+        # The scheduler runs each tile in a copy of this context, so its usage is charged to the same batch
+        flow = model_scheduler.current_flow()
+        waiting = iter(enumerate(tiles))
+        in_flight = {}
+        
+        def hand_over_next():
+            i_tile = next(waiting, None)
+            if i_tile is not None:
+                i, (box, tile_bytes) = i_tile
+                in_flight[model_scheduler.submit(analyze_tile, tile_bytes, flow=flow)] = (i, tile_bytes)
+        
+        try:
+            for _ in range(max(1, max_workers)):
+                hand_over_next()
+            while in_flight:
+                done = [future for future in in_flight if future.done()]
+                if not done:
+                    # Waiting on a queued tile could hold every worker, so run it here instead
+                    queued = next((future for future in in_flight if future.cancel()), None)
+                    if queued is not None:
+                        i, tile_bytes = in_flight.pop(queued)
+                        yield i, analyze_tile(tile_bytes)
+                        hand_over_next()
+                        continue
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, _ = in_flight.pop(future)
+                    yield i, future.result()
+                    hand_over_next()
+        finally:
+            for future in in_flight:
+                future.cancel()
+    
+    analyzed = 0
+    error = None
+    unknown = False
+    last_result = None
+    results = tile_results()
+    try:
+        for i, result in results:
+            analyzed += 1
+            last_result = result
+            if result['detection_result'] is True:
+                logger.info(f"Tile {i + 1}/{len(tiles)} positive; skipping the remaining tiles")
+                result['tile'] = {'index': i, 'box': list(tiles[i][0]), 'tiles': len(tiles), 'analyzed': analyzed}
+                return result
+            if not result['success']:
+                error = error or result.get('error')
+            elif result['detection_result'] is None:
+                unknown = True
+    finally:
+        # Cancels the tiles not yet started
+        results.close()
+    
+    summary = {'index': None, 'box': None, 'tiles': len(tiles), 'analyzed': analyzed}
+    if error:
+        return {'success': False, 'error': error, 'detection_result': None, 'tile': summary}
+    return {
+        'success': True,
+        'response': last_result['response'],
+        'model_response': last_result.get('model_response'),
+        'detection_result': None if unknown else False,
+        'tile': summary
+    }
+
+def detection_options(config: Any) -> Dict[str, Any]:
+    """
+    Map the TILE_* and PREFILTER_* settings of an app config to process_image_batch arguments.
+    
+    Args:
+        config: The app config
+        
+    Returns:
+        Dict[str, Any]: tile_size (None when tiling is disabled), tile_overlap, tile_workers,
+        prefilter (None when disabled) and prefilter_threshold
+    """
+    options = {
+        'tile_size': config.get('TILE_SIZE') or None,
+        'tile_overlap': config.get('TILE_OVERLAP', 0.2),
+        'tile_workers': config.get('TILE_WORKERS', 4)
+    }
+    options.update(prefilter_options(config))
+    return options
+
+def classify_image(
+    image_data: bytes,
+    mime_type: str,
+    api_key: str,
+    model_name: str,
+    prompt: str,
+    tile_size: Optional[int] = None,
+    tile_overlap: float = 0.2,
+    tile_workers: int = 4,
+    prefilter: Optional[Callable[[Any], float]] = None,
+    prefilter_threshold: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Run the initial binary classification for one preprocessed image.
+    
+    With tile_size set, images larger than a tile are analyzed tile by tile with
+    analyze_image_tiled. With a prefilter scorer (see app.prefilter), images
+    scoring below prefilter_threshold are marked negative without an API call.
+    
+    Args:
+        image_data: The binary image data
+        mime_type: MIME type of the image
+        api_key: Cohere API key
+        model_name: Name of the Cohere model to use
+        prompt: The detection prompt
+        tile_size, tile_overlap, tile_workers: Tiled detection settings
+        prefilter, prefilter_threshold: Local pre-filter settings
+        
+    Returns:
+        Dict[str, Any]: Like analyze_image_with_cohere, plus 'detection_result',
+        'latency', 'tile', 'prefilter_score' and 'skipped'
+    """
+    call_start = time.time()
+    prefilter_score = None
+    if prefilter:
+        with tracer.span('prefilter'):
+            prefilter_score = score_image(prefilter, image_data)
+    if prefilter_score is not None and prefilter_score < prefilter_threshold:
+        # Confidently negative: mark it without calling the API
+        analysis_result = {'success': True, 'skipped': True, 'detection_result': False}
+    elif tile_size:
+        analysis_result = analyze_image_tiled(
+            api_key=api_key,
+            image_data=image_data,
+            mime_type=mime_type,
+            model_name=model_name,
+            prompt=prompt,
+            tile_size=tile_size,
+            overlap=tile_overlap,
+            max_workers=tile_workers
+        )
+    else:
+        with tracer.span('base64', bytes=len(image_data)):
+            base64_image = base64.b64encode(image_data).decode('utf-8')
+        analysis_result = analyze_image_with_cohere(
+            api_key=api_key,
+            base64_image=base64_image,
+            mime_type=mime_type,
+            model_name=model_name,
+            prompt=prompt
+        )
+        analysis_result['detection_result'] = None
+        if analysis_result['success']:
+            analysis_result['detection_result'] = parse_detection_result(analysis_result['response'])
+    analysis_result['latency'] = time.time() - call_start
+    analysis_result['prefilter_score'] = prefilter_score
+    return analysis_result
+
+def _classified_record(analysis_result: Dict[str, Any], **fields) -> DetectionRecord:
+    """Build a DetectionRecord from a classify_image result and the image's own fields."""
+    return DetectionRecord(
+        detection_result=analysis_result['detection_result'],
+        success=analysis_result['success'],
+        error=analysis_result.get('error', None),
+        model_response=analysis_result.get('model_response', None),
+        latency=analysis_result['latency'],
+        tile=analysis_result.get('tile'),
+        prefilter_score=analysis_result['prefilter_score'],
+        skipped=analysis_result.get('skipped', False),
+        **fields
+    )
+
+def _run_in_parallel(
+    process_single: Callable[[Tuple[int, Any]], Tuple[int, Any]],
+    items: List[Any],
+    max_workers: int,
+    cancel_event: Optional[threading.Event] = None
+) -> List[Any]:
+    """
+    Run process_single over (index, item) pairs on the shared scheduler, keeping the order of items.
+    
+    The calls are queued in the current flow of model_scheduler, so
+    batches of different sessions share its workers fairly; at most max_workers
+    of this batch's items are handed to it at a time. Once cancel_event is set,
+    no further items are handed over and those not yet started are skipped;
+    calls already in flight run to completion. Skipped items are None in the
+    returned list.
+    
+    Within a trace, each item's wait for a worker is a 'scheduler.queued' span
+    and its processing an 'image' span, labelled with the record's image ID.
+    """
+    def run(i_item, handed_over_ns):
+        if cancel_event is not None and cancel_event.is_set():
+            return i_item[0], None
+        tracer.record('scheduler.queued', handed_over_ns, **{'image.index': i_item[0]})
+        with tracer.span('image', **{'image.index': i_item[0]}) as span:
+            i, result = process_single(i_item)
+            if span is not None:
+                span.set_attribute('image.id', getattr(result, 'id', None))
+                span.set_attribute('image.filename', getattr(result, 'filename', None))
+        return i, result
+
+    results = [None] * len(items)
+    flow = model_scheduler.current_flow()
+    waiting = iter(enumerate(items))
+    in_flight = set()
+
+    def hand_over_next():
+        i_item = next(waiting, None)
+        if i_item is not None:
+            in_flight.add(model_scheduler.submit(run, i_item, time.time_ns(), flow=flow))
+
+    for _ in range(max(1, max_workers)):
+        hand_over_next()
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            in_flight.discard(future)
+            i, result = future.result()
+            results[i] = result
+            if cancel_event is None or not cancel_event.is_set():
+                hand_over_next()
+    return results
+
 def process_image_batch(
     images: List[Dict], 
     api_key: str, 
     model_name: str, 
     prompt: str,
     progress_callback: Optional[Callable[[int, str], None]] = None,
-    max_workers: int = 8
-) -> List[Dict]:
+    max_workers: int = 8,
+    start_callback: Optional[Callable[[int], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    **options: Any
+) -> List[DetectionRecord]:
     """
     Process a batch of images with the Cohere API for initial binary classification in parallel.
+    
+    start_callback and progress_callback receive an image's index when a worker
+    picks it up and when it is done. Once cancel_event is set, images not yet
+    started are skipped and left as None. Extra keyword arguments are the tiling
+    and pre-filter settings of classify_image (see detection_options).
     """
     def process_single(i_image):
         i, image = i_image
+        if start_callback:
+            start_callback(i)
         try:
-            thumbnail = create_thumbnail(image['data'])
-            base64_image, mime_type = encode_image_to_base64(io.BytesIO(image['data']))
-            analysis_result = analyze_image_with_cohere(
-                api_key=api_key,
-                base64_image=base64_image,
+            if image.get('error'):
+                raise ValueError(image['error'])
+            with tracer.span('thumbnail'):
+                thumbnail_data = create_thumbnail_bytes(image['data'])
+            mime_type = get_image_mime_type(image['data'])
+            analysis_result = classify_image(image['data'], mime_type, api_key, model_name, prompt, **options)
+            result = _classified_record(
+                analysis_result,
+                filename=image['filename'],
+                image_data=image['data'],
                 mime_type=mime_type,
-                model_name=model_name,
-                prompt=prompt
+                thumbnail_data=thumbnail_data,
+                frame_time=image.get('frame_time')
             )
-            detection_result = None
-            if analysis_result['success']:
-                detection_result = parse_detection_result(analysis_result['response'])
-            result = {
-                'filename': image['filename'],
-                'thumbnail': thumbnail,
-                'full_image': base64_image,
-                'mime_type': mime_type,
-                'detection_result': detection_result,
-                'success': analysis_result['success'],
-                'error': analysis_result.get('error', None),
-                'raw_response': analysis_result.get('raw_response', None)
-            }
         except Exception as e:
-            result = {
-                'filename': image.get('filename', ''),
-                'thumbnail': None,
-                'full_image': None,
-                'mime_type': None,
-                'detection_result': None,
-                'success': False,
-                'error': str(e),
-                'raw_response': None
-            }
+            result = DetectionRecord(filename=image.get('filename', ''), error=str(e), frame_time=image.get('frame_time'))
         if progress_callback:
             progress_callback(i, image.get('filename', ''))
         return (i, result)
 
-    results = [None] * len(images)
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(process_single, (i, img)) for i, img in enumerate(images)]
-        for future in as_completed(futures):
-            i, result = future.result()
-            results[i] = result
-    return results
+    return _run_in_parallel(process_single, images, max_workers, cancel_event)
+
+def reclassify_records(
+    records: List[DetectionRecord],
+    api_key: str,
+    model_name: str,
+    prompt: str,
+    progress_callback: Optional[Callable[[int, str], None]] = None,
+    max_workers: int = 8,
+    start_callback: Optional[Callable[[int], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    **options: Any
+) -> List[DetectionRecord]:
+    """
+    Classify already analyzed images again, e.g. with a new prompt.
+    
+    The stored image bytes, MIME type and thumbnail are reused, so nothing is
+    re-read, re-thumbnailed or re-detected. The new records keep the image IDs.
+    
+    Args:
+        records: The records to classify again
+        api_key: Cohere API key
+        model_name: Name of the Cohere model to use
+        prompt: The detection prompt
+        progress_callback: Called with (index, filename) as each image finishes
+        max_workers: Parallel API calls
+        start_callback: Called with the index as a worker picks up each image
+        cancel_event: Once set, records not yet started are skipped
+        **options: Tiling and pre-filter settings (see detection_options)
+        
+    Returns:
+        List[DetectionRecord]: New records, in the order of records; None for skipped ones
+    """
+    def process_single(i_record):
+        i, record = i_record
+        fields = {
+            'id': record.id,
+            'filename': record.filename,
+            'image_data': record.image_data,
+            'mime_type': record.mime_type,
+            'thumbnail_data': record.thumbnail_data,
+            'frame_time': record.frame_time
+        }
+        if start_callback:
+            start_callback(i)
+        try:
+            if not record.image_data:
+                raise ValueError(record.error or 'No image data stored')
+            analysis_result = classify_image(record.image_data, record.mime_type, api_key, model_name, prompt, **options)
+            result = _classified_record(analysis_result, **fields)
+        except Exception as e:
+            result = DetectionRecord(error=str(e), **fields)
+        if progress_callback:
+            progress_callback(i, record.filename)
+        return (i, result)
+
+    return _run_in_parallel(process_single, records, max_workers, cancel_event)
 
 def process_enhanced_analysis(
-    images: List[Dict], 
+    images: List[DetectionRecord], 
     api_key: str, 
     model_name: str, 
     prompt: str,
     progress_callback: Optional[Callable[[int, str], None]] = None,
-    max_workers: int = 8
-) -> List[Dict]:
+    max_workers: int = 8,
+    partial_callback: Optional[Callable[[int, str], None]] = None,
+    max_tokens: Optional[int] = None,
+    start_callback: Optional[Callable[[int], None]] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> List[EnhancedRecord]:
     """
     Process a batch of images with the Cohere API for enhanced detailed analysis in parallel.
+
+    Responses are streamed; partial_callback receives (index, text so far) as tokens arrive.
+    start_callback receives the index as a worker picks up each image. Once
+    cancel_event is set, images not yet started are skipped and left as None.
     """
     def process_single(i_image):
         i, image = i_image
+        if start_callback:
+            start_callback(i)
         try:
-            base64_image = image['full_image']
-            mime_type = image['mime_type']
-            analysis_result = analyze_image_with_cohere(
+            delta_callback = (lambda text: partial_callback(i, text)) if partial_callback else None
+            call_start = time.time()
+            analysis_result = stream_image_analysis_with_cohere(
                 api_key=api_key,
-                base64_image=base64_image,
-                mime_type=mime_type,
+                base64_image=image.full_image,
+                mime_type=image.mime_type,
                 model_name=model_name,
                 prompt=prompt,
+                delta_callback=delta_callback,
+                max_tokens=max_tokens,
                 temperature=0.3
             )
-            result = {
-                'filename': image['filename'],
-                'thumbnail': image['thumbnail'],
-                'full_image': base64_image,
-                'mime_type': mime_type,
-                'detection_result': image['detection_result'],
-                'enhanced_analysis': analysis_result['response'] if analysis_result['success'] else None,
-                'success': analysis_result['success'],
-                'error': analysis_result.get('error', None),
-                'raw_response': analysis_result.get('raw_response', None)
-            }
+            result = EnhancedRecord(
+                source=image,
+                enhanced_analysis=analysis_result['response'] if analysis_result['success'] else None,
+                success=analysis_result['success'],
+                error=analysis_result.get('error', None),
+                model_response=analysis_result.get('model_response', None),
+                latency=time.time() - call_start
+            )
         except Exception as e:
-            result = {
-                'filename': image.get('filename', ''),
-                'thumbnail': image.get('thumbnail', None),
-                'detection_result': image.get('detection_result', None),
-                'enhanced_analysis': None,
-                'success': False,
-                'error': str(e),
-                'raw_response': None
-            }
+            result = EnhancedRecord(source=image, error=str(e))
         if progress_callback:
-            progress_callback(i, image.get('filename', ''))
+            progress_callback(i, image.filename)
         return (i, result)
 
-    results = [None] * len(images)
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(process_single, (i, img)) for i, img in enumerate(images)]
-        for future in as_completed(futures):
-            i, result = future.result()
-            results[i] = result
-    return results
+    return _run_in_parallel(process_single, images, max_workers, cancel_event)
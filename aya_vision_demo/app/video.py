@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+import tempfile
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.utils import is_valid_file_extension
+
+# Pillow is imported where frames are handled, not with the module
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger('app.video')
+
+# Side length of the grayscale thumbnail compared between frames
+SIGNATURE_SIZE = 32
+
+def format_timestamp(seconds: float) -> str:
+    """
+    Format a position in a video as HH:MM:SS.mmm.
+
+    Args:
+        seconds: Seconds from the start of the video
+
+    Returns:
+        str: The formatted timestamp
+    """
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600 * 1000)
+    minutes, millis = divmod(millis, 60 * 1000)
+    secs, millis = divmod(millis, 1000)
+    return f'{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}'
+
+def frame_signature(image: Image.Image) -> Image.Image:
+    """Reduce a frame to a small grayscale image for cheap scene comparison."""
+    from PIL import Image
+
+    return image.convert('L').resize((SIGNATURE_SIZE, SIGNATURE_SIZE), Image.BILINEAR)
+
+def scene_difference(previous: Image.Image, current: Image.Image) -> float:
+    """
+    Mean absolute pixel difference between two frame signatures.
+
+    Args:
+        previous: Signature of the last kept frame
+        current: Signature of the candidate frame
+
+    Returns:
+        float: 0.0 for identical frames up to 1.0 for inverted ones
+    """
+    from PIL import ImageChops, ImageStat
+
+    return ImageStat.Stat(ImageChops.difference(previous, current)).mean[0] / 255.0
+
+def decode_video_frames(path: str, sample_fps: float) -> Iterator[Tuple[float, Image.Image]]:
+    """
+    Decode frames from a video file at a fixed sampling rate.
+
+    Frames between samples are only grabbed, not decoded. Requires OpenCV
+    (opencv-python-headless), which is imported on first use.
+
+    Args:
+        path: Path of the video file
+        sample_fps: Frames to keep per second of video
+
+    Yields:
+        Tuple[float, Image.Image]: The frame's timestamp in seconds and the frame
+    """
+    try:
+        import cv2
+    except ImportError:
+        raise RuntimeError('Video support requires OpenCV; install opencv-python-headless')
+    from PIL import Image
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError('Could not open video')
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(1, int(round(fps / sample_fps)))
+        frame_number = 0
+        while capture.grab():
+            if frame_number % step == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                yield frame_number / fps, Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            frame_number += 1
+    finally:
+        capture.release()
+
+def select_scene_changes(
+    frames: Iterable[Tuple[float, Image.Image]],
+    threshold: float,
+    max_frames: Optional[int] = None,
+    stats: Optional[Dict[str, Any]] = None
+) -> Iterator[Tuple[float, Image.Image]]:
+    """
+    Drop frames that differ too little from the last kept frame.
+
+    Comparing against the last kept frame rather than the previous sample means a
+    slow drift is still picked up once it adds up to the threshold.
+
+    Args:
+        frames: Sampled (timestamp, frame) pairs
+        threshold: Minimum scene_difference for a frame to be kept
+        max_frames: Stop after keeping this many frames
+        stats: Optional dict whose 'sampled' and 'kept' counters are updated
+
+    Yields:
+        Tuple[float, Image.Image]: The kept frames
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault('sampled', 0)
+    stats.setdefault('kept', 0)
+    last_kept = None
+    kept = 0
+    for timestamp, frame in frames:
+        stats['sampled'] += 1
+        signature = frame_signature(frame)
+        if last_kept is not None and scene_difference(last_kept, signature) < threshold:
+            continue
+        last_kept = signature
+        kept += 1
+        stats['kept'] += 1
+        yield timestamp, frame
+        if max_frames is not None and kept >= max_frames:
+            stats['truncated'] = True
+            return
+
+def extract_video_frames(
+    filename: str,
+    data: bytes,
+    sample_fps: float = 1.0,
+    threshold: float = 0.05,
+    max_frames: Optional[int] = None
+) -> Tuple[List[Dict], Dict[str, Any]]:
+    """
+    Turn an uploaded video into image dicts for process_image_batch.
+
+    Args:
+        filename: Name of the uploaded video
+        data: The video file contents
+        sample_fps: Frames sampled per second of video
+        threshold: Scene-change threshold, see select_scene_changes
+        max_frames: Most frames kept from this video
+
+    Returns:
+        Tuple[List[Dict], Dict[str, Any]]: The kept frames as JPEG image dicts with
+        'filename', 'data' and 'frame_time', and the sampling statistics
+    """
+    stats = {'filename': filename, 'sampled': 0, 'kept': 0, 'truncated': False}
+    # OpenCV reads from a path, so spool the upload to a temporary file
+    suffix = os.path.splitext(filename)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as video_file:
+        video_file.write(data)
+        video_file.flush()
+
+        frames = []
+        for timestamp, frame in select_scene_changes(
+            decode_video_frames(video_file.name, sample_fps), threshold, max_frames, stats
+        ):
+            buffer = io.BytesIO()
+            frame.save(buffer, format='JPEG', quality=90)
+            frames.append({
+                'filename': f'{filename}@{format_timestamp(timestamp)}',
+                'data': buffer.getvalue(),
+                'frame_time': timestamp
+            })
+
+    logger.info(f"Kept {stats['kept']} of {stats['sampled']} sampled frames from {filename}")
+    return frames, stats
+
+def frame_budget(images: List[Dict], config: Any) -> int:
+    """
+    Return the most images a batch can become once its videos are sampled into frames.
+
+    Args:
+        images: Uploaded files as dicts with 'filename'
+        config: The app config; each video counts as VIDEO_MAX_FRAMES images
+
+    Returns:
+        int: The number of images and the frame budget of each video
+    """
+    return sum(
+        config['VIDEO_MAX_FRAMES'] if is_valid_file_extension(image['filename'], config['VIDEO_EXTENSIONS']) else 1
+        for image in images
+    )
+
+def expand_videos(images: List[Dict], config: Any) -> Tuple[List[Dict], List[Dict[str, Any]]]:
+    """
+    Replace uploaded videos in a batch with their sampled frames.
+
+    Uses the VIDEO_* settings of the app config. A video that cannot be decoded
+    becomes a single entry carrying the error, so it shows up in the results as a
+    failed image instead of failing the whole batch.
+
+    Args:
+        images: Uploaded files as dicts with 'filename' and 'data'
+        config: The app config
+
+    Returns:
+        Tuple[List[Dict], List[Dict[str, Any]]]: The images to analyze and the
+        sampling statistics of each video
+    """
+    expanded = []
+    videos = []
+    for image in images:
+        if not is_valid_file_extension(image['filename'], config['VIDEO_EXTENSIONS']):
+            expanded.append(image)
+            continue
+        try:
+            frames, stats = extract_video_frames(
+                image['filename'],
+                image['data'],
+                sample_fps=config['VIDEO_SAMPLE_FPS'],
+                threshold=config['VIDEO_SCENE_THRESHOLD'],
+                max_frames=config['VIDEO_MAX_FRAMES']
+            )
+        except Exception as e:
+            logger.error(f"Could not extract frames from {image['filename']}: {str(e)}")
+            expanded.append({'filename': image['filename'], 'data': b'', 'error': str(e)})
+            videos.append({'filename': image['filename'], 'error': str(e)})
+            continue
+        expanded.extend(frames)
+        videos.append(stats)
+    return expanded, videos
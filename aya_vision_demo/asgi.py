@@ -0,0 +1,17 @@
+import os
+from app import create_app
+from app.asgi import AsgiApp
+
+# Create the Flask application and serve it as an ASGI application, e.g.
+#   uvicorn asgi:app --host 0.0.0.0 --port 5001
+flask_app = create_app()
+app = AsgiApp(
+    flask_app,
+    threads=flask_app.config['ASGI_THREADS'],
+    max_wait=flask_app.config['ASGI_MAX_WAIT']
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5001)))
@@ -0,0 +1,98 @@
+import argparse
+import logging
+import time
+from app import create_app
+from app.batch_runner import iter_input_paths, make_chunk_analyzer, open_result_writer, run_batch
+from app.utils import detection_options, model_scheduler
+from app.routes import DEFAULT_ENHANCED_PROMPT, DEFAULT_SUBJECT
+
+logger = logging.getLogger('app.batch')
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return '?'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:d}:{minutes:02d}:{seconds:02d}'
+
+def main():
+    """Analyze a directory or manifest of images offline, resuming from earlier output."""
+    parser = argparse.ArgumentParser(description='Analyze a directory or manifest of images and write results incrementally.')
+    parser.add_argument('source', help='Directory to walk, or a manifest file with one image path per line')
+    parser.add_argument('output', help='Results file (.jsonl or .sqlite); existing results are skipped on resume')
+    parser.add_argument('--subject', default=DEFAULT_SUBJECT, help='Subject recorded with each result (default: %(default)s)')
+    parser.add_argument('--prompt', help='Detection prompt (default: PROMPT)')
+    parser.add_argument('--enhanced', action='store_true', help='Also run the enhanced analysis on positive detections')
+    parser.add_argument('--enhanced-prompt', default=DEFAULT_ENHANCED_PROMPT, help='Prompt for --enhanced')
+    parser.add_argument('--chunk-size', type=int, default=32, help='Images analyzed, and held in memory, at a time (default: %(default)s)')
+    parser.add_argument('--workers', type=int, help='Parallel API calls (default: MODEL_CONCURRENCY)')
+    parser.add_argument('--tile-size', type=int, help='Analyze large images in overlapping tiles of this size, 0 to disable (default: TILE_SIZE)')
+    parser.add_argument('--prefilter', help="Local pre-filter scorer, e.g. 'flame-colour' (default: PREFILTER)")
+    parser.add_argument('--retry-failed', action='store_true', help='Re-analyze images that failed in an earlier run')
+    parser.add_argument('--no-count', action='store_true', help='Skip counting inputs up front (no ETA)')
+    parser.add_argument('--report-every', type=float, default=10.0, help='Seconds between progress reports (default: %(default)s)')
+    args = parser.parse_args()
+
+    app = create_app()
+    config = app.config
+    # Model calls go through the shared scheduler, which caps them at its worker count
+    workers = max(1, args.workers or config['MODEL_CONCURRENCY'])
+    model_scheduler.max_workers = workers
+    extensions = config['UPLOAD_EXTENSIONS']
+    if args.tile_size is not None:
+        config['TILE_SIZE'] = args.tile_size
+    if args.prefilter:
+        config['PREFILTER'] = args.prefilter
+
+    # Counting is a cheap pass over file names; images are only read as they are analyzed
+    total = None if args.no_count else sum(1 for _ in iter_input_paths(args.source, extensions))
+
+    analyze = make_chunk_analyzer(
+        api_key=config['COHERE_API_KEY'],
+        model_name=config['MODEL_NAME'],
+        prompt=args.prompt or config['PROMPT'],
+        enhanced_prompt=args.enhanced_prompt.replace('[subject]', args.subject) if args.enhanced else None,
+        max_workers=workers,
+        max_tokens=config['ENHANCED_MAX_TOKENS'],
+        options=detection_options(config)
+    )
+
+    last_report = [0.0]
+
+    def report(stats):
+        now = time.time()
+        if now - last_report[0] < args.report_every:
+            return
+        last_report[0] = now
+        done = stats.skipped + stats.processed
+        of_total = f'/{stats.total}' if stats.total is not None else ''
+        logger.info(
+            f"{done}{of_total} images ({stats.skipped} already done, {stats.failed} failed) "
+            f"- {stats.rate:.2f} images/s, ETA {_format_seconds(stats.eta)}"
+        )
+
+    writer = open_result_writer(args.output)
+    try:
+        stats = run_batch(
+            paths=iter_input_paths(args.source, extensions),
+            writer=writer,
+            analyze=analyze,
+            subject=args.subject,
+            chunk_size=max(1, args.chunk_size),
+            total=total,
+            retry_failed=args.retry_failed,
+            progress_callback=report
+        )
+    except KeyboardInterrupt:
+        logger.info(f'Interrupted; rerun the same command to resume from {args.output}')
+        return
+    finally:
+        writer.close()
+
+    logger.info(
+        f"Done: {stats.processed} analyzed, {stats.skipped} skipped, {stats.detected} detected, "
+        f"{stats.failed} failed in {_format_seconds(time.time() - stats.started_at)} ({stats.rate:.2f} images/s)"
+    )
+
+if __name__ == '__main__':
+    main()
@@ -8,12 +8,84 @@ class Config:
     """Base configuration class."""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-for-development-only'
     COHERE_API_KEY = os.environ.get('COHERE_API_KEY')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload size
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB max upload size by default
     UPLOAD_EXTENSIONS = ['.jpg', '.jpeg', '.png']
+    # Videos are sampled into frames before analysis (needs opencv-python-headless)
+    VIDEO_EXTENSIONS = ['.mp4', '.mov', '.avi', '.mkv', '.webm']
+    VIDEO_SAMPLE_FPS = float(os.environ.get('VIDEO_SAMPLE_FPS', 1))  # frames sampled per second of video
+    # Sampled frames whose mean pixel difference from the last kept frame is below this are skipped
+    VIDEO_SCENE_THRESHOLD = float(os.environ.get('VIDEO_SCENE_THRESHOLD', 0.05))
+    VIDEO_MAX_FRAMES = int(os.environ.get('VIDEO_MAX_FRAMES', 500))  # per video
+    # Tiled initial detection for high-resolution images: tile side in pixels (0 disables),
+    # fraction of overlap between neighbouring tiles and tiles analyzed in parallel per image
+    TILE_SIZE = int(os.environ.get('TILE_SIZE', 0))
+    TILE_OVERLAP = float(os.environ.get('TILE_OVERLAP', 0.2))
+    TILE_WORKERS = int(os.environ.get('TILE_WORKERS', 4))
+    # Local pre-filter run before the API call: a built-in scorer ('flame-colour', 'bright-spot')
+    # or 'module:function'; images scoring below the threshold are marked negative and skipped
+    PREFILTER = os.environ.get('PREFILTER')
+    PREFILTER_THRESHOLD = float(os.environ.get('PREFILTER_THRESHOLD', 0.0005))
+    # Thumbnail encoding ('webp' or 'jpeg', progressive), the sizes (longest side in pixels)
+    # served by /thumbnails, and how many encoded thumbnails the content-hash cache keeps
+    THUMBNAIL_FORMAT = os.environ.get('THUMBNAIL_FORMAT', 'webp')
+    THUMBNAIL_SIZES = [int(s) for s in os.environ.get('THUMBNAIL_SIZES', '300').split(',') if s.strip()]
+    THUMBNAIL_QUALITY = int(os.environ.get('THUMBNAIL_QUALITY', 80))
+    THUMBNAIL_CACHE_ENTRIES = int(os.environ.get('THUMBNAIL_CACHE_ENTRIES', 2048))
+    # Brotli (if installed) or gzip compression of text responses of at least COMPRESS_MIN_SIZE bytes
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip level for dynamic responses
+    # Cache lifetime of static assets requested through their fingerprinted static_url()
+    STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 365 * 24 * 3600))
+    # ASGI entry point (asgi.py): threads running the non-progress Flask views, and the
+    # longest a progress poll may wait for a change with ?wait=<seconds>
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 16))
+    ASGI_MAX_WAIT = float(os.environ.get('ASGI_MAX_WAIT', 30))
     MIN_IMAGES = 1  # For development, we'll start with 1, but the PRD specifies 40-50
     MAX_IMAGES = 50
     MODEL_NAME = 'command-a-vision-epsilon'
     PROMPT = "Is a flare burning in this image? Answer with only 'true' or 'false'."
+    # Upper bound on generated tokens per enhanced analysis response (bounds streaming latency)
+    ENHANCED_MAX_TOKENS = int(os.environ.get('ENHANCED_MAX_TOKENS', 512))
+    # Pagination of the results pages and results APIs
+    RESULTS_PER_PAGE = int(os.environ.get('RESULTS_PER_PAGE', 24))
+    MAX_RESULTS_PER_PAGE = 200
+    # Largest batch /api/analyze will process inside the request when called with sync=true;
+    # larger batches must use the default asynchronous job mode
+    API_SYNC_MAX_IMAGES = int(os.environ.get('API_SYNC_MAX_IMAGES', 10))
+    # Model calls made at once across all batches; the workers take calls from each client's
+    # batches in turn (deficit round robin), so small batches are not stuck behind large ones
+    MODEL_CONCURRENCY = int(os.environ.get('MODEL_CONCURRENCY', 8))
+    # Admission control: at most ADMISSION_MAX_RUNNING_JOBS batches are analyzed at once, each
+    # handing up to 8 model calls at a time to the shared workers. Later batches queue, clients
+    # with the fewest batches running first. Once the running and queued batches hold
+    # ADMISSION_MAX_PENDING_IMAGES images, new submissions are refused with 503 and a Retry-After
+    # of ADMISSION_RETRY_AFTER seconds when no running batch has an ETA yet
+    ADMISSION_MAX_RUNNING_JOBS = int(os.environ.get('ADMISSION_MAX_RUNNING_JOBS', 4))
+    ADMISSION_MAX_PENDING_IMAGES = int(os.environ.get('ADMISSION_MAX_PENDING_IMAGES', 1000))
+    ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', 10))
+    # Tracing: spans per stage, image and model call attempt, kept in memory for the most recent
+    # TRACING_KEEP jobs (waterfall at /jobs/<job_id>/trace) and appended as OTLP/JSON lines to
+    # TRACING_FILE when it is set
+    TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'true').lower() == 'true'
+    TRACING_FILE = os.environ.get('TRACING_FILE', '')
+    TRACING_KEEP = int(os.environ.get('TRACING_KEEP', 100))
+    # Profiling: 'off', 'header' (requests sending X-Profile equal to PROFILING_TOKEN) or 'all';
+    # jobs submitted by a profiled request are profiled too. The newest PROFILING_KEEP profiles
+    # are kept in PROFILING_DIR and served at /admin/profiles. Enabling it requires the token
+    PROFILING_MODE = os.environ.get('PROFILING_MODE', 'off').lower()
+    PROFILING_DIR = os.environ.get('PROFILING_DIR', 'data/profiles')
+    PROFILING_KEEP = int(os.environ.get('PROFILING_KEEP', 50))
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+    # Directory-watch ingestion (watch.py): directories are separated by os.pathsep
+    WATCH_DIRS = [d for d in os.environ.get('WATCH_DIRS', '').split(os.pathsep) if d]
+    WATCH_BATCH_SIZE = int(os.environ.get('WATCH_BATCH_SIZE', 8))
+    WATCH_BATCH_WINDOW = float(os.environ.get('WATCH_BATCH_WINDOW', 10))  # seconds
+    WATCH_POLL_INTERVAL = float(os.environ.get('WATCH_POLL_INTERVAL', 1))  # seconds
+    WATCH_LEDGER = os.environ.get('WATCH_LEDGER', 'data/processed.jsonl')
+    # Micro-batches kept in memory for viewing; older ones are dropped (the ledger keeps every file)
+    WATCH_KEEP_BATCHES = int(os.environ.get('WATCH_KEEP_BATCHES', 50))
+    WATCH_SUBJECT = os.environ.get('WATCH_SUBJECT')
     
     # Logging configuration
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
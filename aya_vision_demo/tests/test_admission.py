@@ -0,0 +1,125 @@
+import io
+import threading
+import pytest
+from app.admission import AdmissionController, Overloaded
+from app.progress import JobProgress
+
+def _blocking_job(started, release):
+    def run():
+        started.set()
+        release.wait(5)
+    return run
+
+def test_batches_beyond_the_running_limit_are_queued():
+    """Test that a batch waits with a queue position and starts when a running batch finishes."""
+    admission = AdmissionController(max_running_jobs=1)
+    first_started, second_started, release = threading.Event(), threading.Event(), threading.Event()
+    first, second = JobProgress(total=2), JobProgress(total=2)
+
+    admission.submit('first', first, 2, _blocking_job(first_started, release))
+    admission.submit('second', second, 2, _blocking_job(second_started, release))
+    assert first_started.wait(5)
+    assert second['status'] == 'queued'
+    assert second['queue_position'] == 1
+    assert admission.stats()['waiting'] == 1
+
+    release.set()
+    assert second_started.wait(5)
+    assert 'queue_position' not in second
+
+def test_submissions_over_the_image_limit_are_refused():
+    """Test that submit raises Overloaded with a retry delay once too many images are pending."""
+    admission = AdmissionController(max_running_jobs=1, max_pending_images=3, retry_after=7)
+    started, release = threading.Event(), threading.Event()
+    admission.submit('busy', JobProgress(total=2), 2, _blocking_job(started, release))
+    started.wait(5)
+
+    admission.submit('fits', JobProgress(total=1), 1, lambda: None)
+    with pytest.raises(Overloaded) as refused:
+        admission.submit('too-many', JobProgress(total=1), 1, lambda: None)
+    assert refused.value.retry_after == 7
+    assert admission.stats()['pending_images'] == 3
+    # Work done inside a request needs a free slot
+    with pytest.raises(Overloaded):
+        with admission.reserve('sync', 1):
+            pass
+    assert admission.stats()['rejected'] == 2
+    release.set()
+
+def test_cancelled_queued_batch_never_runs():
+    """Test that a batch cancelled while queued is dropped from the queue."""
+    admission = AdmissionController(max_running_jobs=1)
+    started, release = threading.Event(), threading.Event()
+    ran = []
+    queued = JobProgress(total=5)
+    admission.submit('busy', JobProgress(total=1), 1, _blocking_job(started, release))
+    admission.submit('queued', queued, 5, lambda: ran.append(True))
+    started.wait(5)
+
+    assert queued.cancel()
+    assert admission.stats()['pending_images'] == 6
+    admission.submit('next', JobProgress(total=1), 1, lambda: None)
+    assert admission.stats()['pending_images'] == 2
+    release.set()
+    assert ran == []
+
+def test_concurrent_submissions_cannot_overshoot_the_image_limit():
+    """Test that submissions racing each other are admitted only up to the image limit."""
+    admission = AdmissionController(max_running_jobs=1, max_pending_images=10)
+    started, release = threading.Event(), threading.Event()
+    admission.submit('busy', JobProgress(total=1), 1, _blocking_job(started, release))
+    started.wait(5)
+
+    barrier = threading.Barrier(20)
+    refused = []
+
+    def submit(index):
+        barrier.wait(5)
+        try:
+            admission.submit(f'racer-{index}', JobProgress(total=3), 3, lambda: None)
+        except Overloaded:
+            refused.append(index)
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert admission.stats()['pending_images'] == 10
+    assert len(refused) == 17
+    release.set()
+
+def test_videos_are_charged_their_frame_budget_until_sampled():
+    """Test that a video counts as VIDEO_MAX_FRAMES images until its frames are known."""
+    from app.video import frame_budget
+    config = {'VIDEO_MAX_FRAMES': 50, 'VIDEO_EXTENSIONS': ['.mp4']}
+    assert frame_budget([{'filename': 'clip.mp4'}, {'filename': 'frame.jpg'}], config) == 51
+
+    admission = AdmissionController(max_running_jobs=1, max_pending_images=60)
+    started, release = threading.Event(), threading.Event()
+    admission.submit('video', JobProgress(total=2), 51, _blocking_job(started, release))
+    started.wait(5)
+    with pytest.raises(Overloaded):
+        admission.submit('more', JobProgress(total=10), 10, lambda: None)
+
+    admission.resize('video', 12)
+    assert admission.stats()['pending_images'] == 12
+    admission.submit('more', JobProgress(total=10), 10, lambda: None)
+    release.set()
+
+def test_api_analyze_returns_503_when_overloaded(app):
+    """Test that /api/analyze refuses a job with 503 and Retry-After when the server is full."""
+    admission = AdmissionController(max_running_jobs=1, max_pending_images=1)
+    app.application.extensions['admission'] = admission
+    started, release = threading.Event(), threading.Event()
+    admission.submit('busy', JobProgress(total=1), 1, _blocking_job(started, release))
+    started.wait(5)
+
+    upload = {'images': [(io.BytesIO(b'fake-image'), 'frame.jpg')]}
+    response = app.post('/api/analyze', data=upload, content_type='multipart/form-data')
+    release.set()
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) > 0
+    assert 'error' in response.get_json()
+    assert app.get('/api/metrics').get_json()['admission']['rejected'] == 1
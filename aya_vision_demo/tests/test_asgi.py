@@ -0,0 +1,86 @@
+import asyncio
+import json
+import threading
+import time
+from app import create_app, routes
+from app.asgi import AsgiApp
+
+def _asgi_app(monkeypatch):
+    monkeypatch.setenv('FLASK_CONFIG', 'testing')
+    return AsgiApp(create_app(), threads=2)
+
+async def _request(asgi_app, path, query=b''):
+    """Send one GET request to an ASGI app and collect the response."""
+    messages = []
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query,
+             'headers': [(b'host', b'localhost')], 'server': ('localhost', 80)}
+    await asgi_app(scope, receive, send)
+    return messages[0]['status'], b''.join(m.get('body', b'') for m in messages[1:])
+
+def test_flask_routes_are_served_off_the_event_loop(monkeypatch):
+    """Test that ordinary and progress views, with their request hooks, run on the thread pool."""
+    asgi_app = _asgi_app(monkeypatch)
+    threads = []
+
+    @asgi_app.flask_app.after_request
+    def note_thread(response):
+        threads.append(threading.current_thread().name)
+        return response
+
+    status, body = asyncio.run(_request(asgi_app, '/settings'))
+    assert status == 200
+    assert b'<html' in body.lower()
+
+    status, body = asyncio.run(_request(asgi_app, '/api/jobs/missing'))
+    assert status == 404
+    assert len(threads) == 2
+    assert all(name.startswith('asgi-wsgi') for name in threads)
+
+def test_progress_long_poll_returns_on_change(monkeypatch):
+    """Test that a progress poll with ?wait returns as soon as the progress changes."""
+    asgi_app = _asgi_app(monkeypatch)
+    routes.analysis_progress['asgi-job'] = {'status': 'processing', 'completed': 1, 'total': 4, 'percent': 25, 'result_id': 'r'}
+
+    async def scenario():
+        request = asyncio.ensure_future(_request(asgi_app, '/api/jobs/asgi-job', b'wait=10'))
+        await asyncio.sleep(0.3)
+        assert not request.done()
+        routes.analysis_progress['asgi-job'].update(completed=2, percent=50)
+        return await request
+
+    started = time.monotonic()
+    status, body = asyncio.run(scenario())
+    assert status == 200
+    assert json.loads(body)['completed'] == 2
+    assert time.monotonic() - started < 5
+
+def test_enhanced_analysis_stream_is_async(monkeypatch):
+    """Test that the event stream sends partial text and finishes with the complete event."""
+    asgi_app = _asgi_app(monkeypatch)
+    progress = {'status': 'processing', 'partials': ['A fl'], 'image_ids': ['img-1'], 'completed': 0, 'total': 1}
+    routes.enhanced_analysis_progress['asgi-stream'] = progress
+
+    async def scenario():
+        request = asyncio.ensure_future(_request(asgi_app, '/api/enhanced-analysis-stream/asgi-stream'))
+        await asyncio.sleep(0.3)
+        progress.update(partials=['A flare.'], status='complete', completed=1)
+        return await request
+
+    status, body = asyncio.run(scenario())
+    text = body.decode('utf-8')
+    assert status == 200
+    assert '"delta": "A fl"' in text
+    assert '"delta": "are."' in text
+    assert 'event: complete' in text
@@ -0,0 +1,141 @@
+import json
+import sqlite3
+import threading
+from app.batch_runner import iter_input_paths, open_result_writer, run_batch
+from app.models import DetectionRecord
+
+class FakeAnalyzer:
+    """Records the images it is given and detects the subject in every image."""
+
+    def __init__(self, fail_after=None):
+        self.images = []
+        self.fail_after = fail_after
+        self.lock = threading.Lock()
+
+    def __call__(self, images):
+        with self.lock:
+            if self.fail_after is not None and len(self.images) == self.fail_after:
+                raise KeyboardInterrupt
+            self.images.extend(image['filename'] for image in images)
+        return [(DetectionRecord(filename=image['filename'], detection_result=True, success=True), None)
+                for image in images]
+
+def _frames(tmp_path, count):
+    frames = tmp_path / 'frames'
+    frames.mkdir()
+    for i in range(count):
+        (frames / f'frame{i}.jpg').write_bytes(b'image')
+    (frames / 'notes.txt').write_text('not an image')
+    return frames
+
+def test_iter_input_paths_manifest(tmp_path):
+    """Test that manifests resolve relative paths and skip comments and other files."""
+    frames = _frames(tmp_path, 2)
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text('# camera 1\nframes/frame1.jpg\n\nframes/notes.txt\nframes/frame0.jpg\n')
+
+    paths = list(iter_input_paths(str(manifest), ['.jpg']))
+    assert paths == [str(frames / 'frame1.jpg'), str(frames / 'frame0.jpg')]
+
+def test_run_batch_resumes_from_jsonl(tmp_path):
+    """Test that an interrupted run resumes after the last written image."""
+    frames = _frames(tmp_path, 5)
+    output = str(tmp_path / 'results.jsonl')
+
+    first = FakeAnalyzer(fail_after=2)
+    writer = open_result_writer(output)
+    try:
+        run_batch(iter_input_paths(str(frames), ['.jpg']), writer, first, 'Flare', chunk_size=1, total=5)
+    except KeyboardInterrupt:
+        pass
+    writer.close()
+    assert first.images == ['frame0.jpg', 'frame1.jpg']
+
+    second = FakeAnalyzer()
+    writer = open_result_writer(output)
+    stats = run_batch(iter_input_paths(str(frames), ['.jpg']), writer, second, 'Flare', chunk_size=2, total=5)
+    writer.close()
+
+    assert sorted(second.images) == ['frame2.jpg', 'frame3.jpg', 'frame4.jpg']
+    assert stats.skipped == 2
+    assert stats.processed == 3
+    assert stats.eta == 0
+
+    with open(output) as f:
+        rows = sorted((json.loads(line) for line in f), key=lambda row: row['index'])
+    assert [row['filename'] for row in rows] == [f'frame{i}.jpg' for i in range(5)]
+    assert [row['index'] for row in rows] == list(range(5))
+
+def test_run_batch_sqlite_retries_failed(tmp_path):
+    """Test that SQLite output is upserted by path and failed images can be retried."""
+    frames = _frames(tmp_path, 2)
+    output = str(tmp_path / 'results.sqlite')
+
+    writer = open_result_writer(output)
+    writer.write([{'path': str(frames / 'frame1.jpg'), 'filename': 'frame1.jpg', 'success': False, 'error': 'timeout'}])
+
+    analyzer = FakeAnalyzer()
+    stats = run_batch(iter_input_paths(str(frames), ['.jpg']), writer, analyzer, 'Flare', retry_failed=True)
+    writer.close()
+    assert sorted(analyzer.images) == ['frame0.jpg', 'frame1.jpg']
+    assert stats.detected == 2
+
+    rows = sqlite3.connect(output).execute('SELECT filename, success, error FROM results ORDER BY filename').fetchall()
+    assert rows == [('frame0.jpg', 1, None), ('frame1.jpg', 1, None)]
+
+def test_run_batch_jsonl_retry_keeps_one_row_per_path(tmp_path):
+    """Test that a retried image's row replaces its failed row in JSON Lines output."""
+    frames = _frames(tmp_path, 3)
+    output = tmp_path / 'results.jsonl'
+    failed = {'path': str(frames / 'frame1.jpg'), 'filename': 'frame1.jpg', 'success': False, 'error': 'timeout'}
+
+    writer = open_result_writer(str(output))
+    writer.write([failed])
+    analyzer = FakeAnalyzer(fail_after=1)
+    try:
+        run_batch(iter_input_paths(str(frames), ['.jpg']), writer, analyzer, 'Flare', chunk_size=1, retry_failed=True)
+    except KeyboardInterrupt:
+        pass
+    writer.close()
+    assert analyzer.images == ['frame0.jpg']
+
+    analyzer = FakeAnalyzer()
+    writer = open_result_writer(str(output))
+    assert writer.processed_paths(include_failed=False) == {str(frames / 'frame0.jpg')}
+    run_batch(iter_input_paths(str(frames), ['.jpg']), writer, analyzer, 'Flare', chunk_size=1, retry_failed=True)
+    assert writer.processed_paths(include_failed=False) == {str(frames / f'frame{i}.jpg') for i in range(3)}
+    writer.close()
+    assert analyzer.images == ['frame1.jpg', 'frame2.jpg']
+
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(row['filename'] for row in rows) == ['frame0.jpg', 'frame1.jpg', 'frame2.jpg']
+    assert all(row['success'] for row in rows)
+
+def test_run_batch_refills_window_while_an_image_is_slow(tmp_path):
+    """Test that a slow image does not stop the next images from being analyzed and written."""
+    frames = _frames(tmp_path, 4)
+    output = str(tmp_path / 'results.jsonl')
+    last_written = threading.Event()
+    analyzer = FakeAnalyzer()
+
+    def analyze(images):
+        if images[0]['filename'] == 'frame0.jpg':
+            assert last_written.wait(5)
+        return analyzer(images)
+
+    writer = open_result_writer(output)
+    written = []
+    original_write = writer.write
+
+    def write(rows):
+        original_write(rows)
+        written.extend(row['filename'] for row in rows)
+        if 'frame3.jpg' in written:
+            last_written.set()
+
+    writer.write = write
+    stats = run_batch(iter_input_paths(str(frames), ['.jpg']), writer, analyze, 'Flare', chunk_size=2)
+    writer.close()
+
+    assert written == ['frame1.jpg', 'frame2.jpg', 'frame3.jpg', 'frame0.jpg']
+    assert stats.processed == 4 and stats.failed == 0
@@ -0,0 +1,125 @@
+import io
+import threading
+import time
+import pytest
+from app import routes, utils
+from app.models import DetectionRecord, EnhancedRecord, ResultSet
+from app.progress import JobProgress
+
+def test_cancel_skips_images_not_yet_started(monkeypatch):
+    """Test that setting the cancel event stops further model calls and leaves skipped images as None."""
+    cancel_event = threading.Event()
+    calls = []
+
+    def fake_classify(image_data, mime_type, api_key, model_name, prompt, **options):
+        calls.append(image_data)
+        cancel_event.set()
+        return {'success': True, 'detection_result': True, 'latency': 0.0, 'prefilter_score': None}
+
+    monkeypatch.setattr(utils, 'classify_image', fake_classify)
+    monkeypatch.setattr(utils, 'create_thumbnail_bytes', lambda data: b'')
+    monkeypatch.setattr(utils, 'get_image_mime_type', lambda data: 'image/jpeg')
+
+    images = [{'filename': f'{i}.jpg', 'data': bytes([i])} for i in range(5)]
+    results = utils.process_image_batch(images, 'key', 'model', 'prompt', max_workers=1, cancel_event=cancel_event)
+
+    assert len(calls) == 1
+    assert results[0].detection_result is True
+    assert results[1:] == [None] * 4
+
+def test_api_cancel_job(app):
+    """Test that a running job can be cancelled once, and unknown jobs are 404."""
+    routes.analysis_progress['cancel-me'] = JobProgress(total=3, result_id='r')
+    routes.analysis_progress['cancel-me']['status'] = 'processing'
+
+    response = app.post('/api/jobs/cancel-me/cancel')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'cancelled'
+    assert routes.analysis_progress['cancel-me'].cancelled.is_set()
+
+    assert app.post('/api/jobs/cancel-me/cancel').status_code == 409
+    assert app.get('/api/jobs/cancel-me/result').status_code == 409
+    assert app.post('/api/jobs/missing/cancel').status_code == 404
+
+def test_cancelled_job_stores_no_results(app, monkeypatch):
+    """Test that a job cancelled mid-run finishes as cancelled without storing its results."""
+    started = threading.Event()
+    returned = threading.Event()
+
+    def slow_batch(images, api_key, model_name, prompt, cancel_event=None, **kwargs):
+        started.set()
+        cancel_event.wait(5)
+        returned.set()
+        return [None] * len(images)
+
+    monkeypatch.setattr(routes, 'process_image_batch', slow_batch)
+    upload = {'images': [(io.BytesIO(b'fake-image'), f'frame{i}.jpg') for i in range(2)]}
+    job = app.post('/api/analyze', data=upload, content_type='multipart/form-data').get_json()
+    assert started.wait(5)
+
+    assert app.post(f"/api/jobs/{job['job_id']}/cancel").status_code == 200
+    assert returned.wait(5)
+    time.sleep(0.1)
+
+    assert app.get(job['status_url']).get_json()['status'] == 'cancelled'
+    assert routes.analysis_progress[job['job_id']]['result_id'] not in routes.results_storage
+
+def _seed_enhanced(progress_id, enhanced_id, status):
+    images = [DetectionRecord(filename=f'flare{i}.jpg', image_data=bytes([i]), detection_result=True, success=True)
+              for i in range(2)]
+    progress = JobProgress(total=2, partials=['', ''], image_ids=[image.id for image in images])
+    progress['status'] = status
+    routes.enhanced_analysis_progress[progress_id] = progress
+    routes.enhanced_results_storage[enhanced_id] = {
+        'results': ResultSet(EnhancedRecord(source=image, enhanced_analysis='', success=True) for image in images),
+        'subject': 'Flare', 'prompt': 'describe', 'result_id': 'r', 'streaming': True, 'progress_id': progress_id
+    }
+    return images, progress
+
+def test_cancelled_enhanced_analysis_marks_unfinished_images(app, monkeypatch):
+    """Test that a cancelled enhanced analysis keeps finished analyses and marks the rest cancelled."""
+    images, progress = _seed_enhanced('enhanced-cancel', 'enhanced-cancel-results', 'processing')
+
+    def cancelled_midway(images, partial_callback=None, **kwargs):
+        partial_callback(1, 'A fl')
+        progress.cancel()
+        return [EnhancedRecord(source=images[0], enhanced_analysis='A flare.', success=True), None]
+
+    monkeypatch.setattr(routes, 'process_enhanced_analysis', cancelled_midway)
+    routes.process_enhanced_analysis_background(
+        app.application, images, 'key', 'model', 'describe', 'enhanced-cancel', 'enhanced-cancel-results', 'Flare', 'r'
+    )
+
+    stored = routes.enhanced_results_storage['enhanced-cancel-results']
+    assert stored['status'] == 'cancelled' and not stored['streaming']
+    finished, unfinished = stored['results'].snapshot()
+    assert (finished.success, finished.enhanced_analysis) == (True, 'A flare.')
+    assert (unfinished.success, unfinished.error, unfinished.enhanced_analysis) == (False, 'cancelled', None)
+
+    page = app.get('/api/enhanced-results/enhanced-cancel-results').get_json()
+    assert page['cancelled'] is True
+    assert page['counts']['error'] == 1
+
+def test_cancelling_a_queued_enhanced_analysis_marks_its_results(app):
+    """Test that an enhanced analysis cancelled before it started shows no analysis as complete."""
+    _seed_enhanced('enhanced-queued', 'enhanced-queued-results', 'queued')
+
+    assert app.post('/api/jobs/enhanced-queued/cancel').status_code == 200
+    stored = routes.enhanced_results_storage['enhanced-queued-results']
+    assert stored['status'] == 'cancelled'
+    assert [record.error for record in stored['results']] == ['cancelled', 'cancelled']
+
+def test_cancel_before_pickup_is_not_overwritten(app, monkeypatch):
+    """Test that a job cancelled just before its background work starts stays cancelled and runs nothing."""
+    images, progress = _seed_enhanced('enhanced-early', 'enhanced-early-results', 'queued')
+    monkeypatch.setattr(routes, 'process_enhanced_analysis', lambda *args, **kwargs: pytest.fail('analysis ran'))
+
+    assert progress.cancel()
+    assert not progress.set_status('processing')
+    routes.process_enhanced_analysis_background(
+        app.application, images, 'key', 'model', 'describe', 'enhanced-early', 'enhanced-early-results', 'Flare', 'r'
+    )
+
+    assert app.get('/api/enhanced-analysis-progress/enhanced-early').get_json()['status'] == 'cancelled'
+    stored = routes.enhanced_results_storage['enhanced-early-results']
+    assert [record.error for record in stored['results']] == ['cancelled', 'cancelled']
@@ -0,0 +1,45 @@
+import gzip
+import re
+from app import routes
+from app.compression import choose_encoding
+from app.models import DetectionRecord, ResultSet
+
+def test_choose_encoding():
+    """Test that Accept-Encoding qualities and wildcards are honoured in preference order."""
+    assert choose_encoding('gzip, deflate, br', ('br', 'gzip')) == 'br'
+    assert choose_encoding('gzip;q=0.5, br;q=0', ('br', 'gzip')) == 'gzip'
+    assert choose_encoding('*', ('br', 'gzip')) == 'br'
+    assert choose_encoding('identity', ('br', 'gzip')) is None
+    assert choose_encoding('', ('gzip',)) is None
+
+def test_large_responses_are_compressed(app):
+    """Test that responses above the size threshold are gzipped and small ones are left alone."""
+    records = [DetectionRecord(filename=f'image-{i:03d}.jpg', detection_result=True, success=True) for i in range(50)]
+    routes.results_storage['compress-batch'] = {'results': ResultSet(records), 'subject': 'Flare'}
+
+    response = app.get('/api/results/compress-batch?per_page=50', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert b'image-049.jpg' in gzip.decompress(response.data)
+
+    plain = app.get('/api/results/compress-batch?per_page=50')
+    assert 'Content-Encoding' not in plain.headers
+
+    small = app.get('/api/jobs/missing', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+
+def test_fingerprinted_static_assets_are_immutable(app):
+    """Test that pages link static files by content hash and those URLs are cached for a year."""
+    page = app.get('/settings').get_data(as_text=True)
+    url = re.search(r'href="(/static/css/style\.css\?v=[0-9a-f]{12})"', page).group(1)
+
+    response = app.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'.result-item' in gzip.decompress(response.data)
+
+    stale = app.get('/static/css/style.css?v=000000000000')
+    assert 'immutable' not in stale.headers.get('Cache-Control', '')
+    stale.close()
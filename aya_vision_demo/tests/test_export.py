@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+import zipfile
+from app.export import iter_results_csv, iter_results_jsonl, iter_results_zip
+from app.models import DetectionRecord, EnhancedRecord
+
+def _batch():
+    """Build a small batch covering every detection state and a duplicate filename."""
+    results = [
+        DetectionRecord(filename='a.jpg', image_data=b'aaa', mime_type='image/jpeg', detection_result=True, success=True),
+        DetectionRecord(filename='b.jpg', image_data=b'bbb', mime_type='image/jpeg', detection_result=False, success=True),
+        DetectionRecord(filename='c.jpg', image_data=b'ccc', mime_type='image/jpeg', detection_result=None, success=True),
+        DetectionRecord(filename='a.jpg', image_data=b'ddd', mime_type='image/jpeg', detection_result=True, success=True),
+        DetectionRecord(filename='broken.jpg', error='cannot identify image file')
+    ]
+    enhanced = [EnhancedRecord(source=results[0], enhanced_analysis='A tall, bright flame.', success=True)]
+    return results, enhanced
+
+def test_iter_results_csv():
+    """Test that CSV export yields a header and one row per record, joined with enhanced results."""
+    results, enhanced = _batch()
+    chunks = list(iter_results_csv(results, enhanced, 'Flare'))
+
+    assert len(chunks) == len(results) + 1
+    rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+    assert rows[0]['enhanced_analysis'] == 'A tall, bright flame.'
+    assert rows[0]['subject'] == 'Flare'
+    assert rows[1]['enhanced_analysis'] == ''
+    assert rows[4]['error'] == 'cannot identify image file'
+
+def test_iter_results_jsonl():
+    """Test that JSONL export yields one JSON object per record without image payloads."""
+    results, enhanced = _batch()
+    rows = [json.loads(line) for line in iter_results_jsonl(results, enhanced, 'Flare')]
+
+    assert [row['detection_result'] for row in rows] == [True, False, None, True, None]
+    assert 'full_image' not in rows[0]
+
+def test_iter_results_zip():
+    """Test that ZIP export groups images by detection state and includes a manifest."""
+    results, enhanced = _batch()
+    chunks = list(iter_results_zip(results, enhanced, 'Flare'))
+
+    assert len(chunks) > 1
+    assert all(chunks)
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+    assert sorted(archive.namelist()) == [
+        'detected/00003_a.jpg', 'detected/a.jpg', 'not_detected/b.jpg', 'results.jsonl', 'unknown/c.jpg'
+    ]
+    assert archive.read('detected/00003_a.jpg') == b'ddd'
+    assert len(archive.read('results.jsonl').splitlines()) == len(results)
@@ -0,0 +1,90 @@
+from app.ingest import DirectoryWatcher, ProcessedLedger
+from app.models import DetectionRecord
+
+class FakeBatchProcessor:
+    """Records the micro-batches it is given and detects the subject in every image."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, images):
+        self.batches.append([image['filename'] for image in images])
+        results = [DetectionRecord(filename=image['filename'], detection_result=True, success=True) for image in images]
+        return f'batch-{len(self.batches)}', results
+
+def _watcher(tmp_path, processor, **kwargs):
+    return DirectoryWatcher(
+        directories=[str(tmp_path / 'frames')],
+        process_batch=processor,
+        ledger=ProcessedLedger(str(tmp_path / 'ledger.jsonl')),
+        extensions=['.jpg', '.png'],
+        **kwargs
+    )
+
+def test_watcher_micro_batches_stable_files(tmp_path):
+    """Test that files are batched by size, partial batches wait for the window, and others are ignored."""
+    frames = tmp_path / 'frames'
+    frames.mkdir()
+    for i in range(5):
+        (frames / f'frame{i}.jpg').write_bytes(b'image')
+    (frames / 'notes.txt').write_text('not an image')
+
+    processor = FakeBatchProcessor()
+    watcher = _watcher(tmp_path, processor, batch_size=2, batch_window=10)
+
+    # First sighting only records the files; they must hold still for one poll
+    assert watcher.poll_once(now=0) == 0
+    assert watcher.poll_once(now=1) == 4
+    assert processor.batches == [['frame0.jpg', 'frame1.jpg'], ['frame2.jpg', 'frame3.jpg']]
+
+    # The leftover file is sent once the window has passed
+    assert watcher.poll_once(now=5) == 0
+    assert watcher.poll_once(now=11) == 1
+    assert processor.batches[-1] == ['frame4.jpg']
+    assert watcher.status()['files_processed'] == 5
+
+def test_ledger_prevents_reprocessing_after_restart(tmp_path):
+    """Test that processed files are remembered across watcher instances."""
+    frames = tmp_path / 'frames'
+    frames.mkdir()
+    (frames / 'frame0.jpg').write_bytes(b'image')
+
+    first = FakeBatchProcessor()
+    watcher = _watcher(tmp_path, first, batch_size=1)
+    watcher.poll_once(now=0)
+    watcher.poll_once(now=1)
+    assert first.batches == [['frame0.jpg']]
+
+    second = FakeBatchProcessor()
+    restarted = _watcher(tmp_path, second, batch_size=1)
+    restarted.poll_once(now=0)
+    restarted.poll_once(now=1)
+    assert second.batches == []
+
+    # A frame overwritten in place is analyzed again
+    (frames / 'frame0.jpg').write_bytes(b'new image')
+    restarted.poll_once(now=2)
+    restarted.poll_once(now=3)
+    assert second.batches == [['frame0.jpg']]
+
+def test_watcher_keeps_only_the_newest_batches_in_memory(app, monkeypatch, tmp_path):
+    """Test that a long-running watcher evicts its oldest batches, images included, from the result store."""
+    from app import ingest, routes
+    from app.ingest import create_watcher
+
+    monkeypatch.setattr(ingest, 'process_image_batch', lambda images, **options: [
+        DetectionRecord(filename=image['filename'], image_data=image['data'], detection_result=False, success=True)
+        for image in images
+    ])
+    monkeypatch.setattr(routes, 'results_storage', {})
+    app.application.config.update(WATCH_KEEP_BATCHES=3, WATCH_LEDGER=str(tmp_path / 'ledger.jsonl'))
+    watcher = create_watcher(app.application)
+
+    result_ids = [
+        watcher.process_batch([{'filename': f'frame{i}.jpg', 'data': b'x' * 1000}])[0]
+        for i in range(10)
+    ]
+
+    assert list(routes.results_storage) == result_ids[-3:]
+    retained = sum(record.storage_bytes for entry in routes.results_storage.values() for record in entry['results'])
+    assert retained == 3 * 1000
@@ -0,0 +1,58 @@
+import io
+import time
+from app import routes
+from app.models import DetectionRecord
+
+def _fake_process_image_batch(images, api_key, model_name, prompt, progress_callback=None, **kwargs):
+    """Stand-in for process_image_batch that detects the subject in every image."""
+    results = []
+    for i, image in enumerate(images):
+        results.append(DetectionRecord(filename=image['filename'], detection_result=True, success=True))
+        if progress_callback:
+            progress_callback(i, image['filename'])
+    return results
+
+def _upload(count):
+    return {'images': [(io.BytesIO(b'fake-image'), f'frame{i}.jpg') for i in range(count)]}
+
+def test_api_analyze_submits_job(app, monkeypatch):
+    """Test that /api/analyze returns 202 with a job handle and the job's results become available."""
+    monkeypatch.setattr(routes, 'process_image_batch', _fake_process_image_batch)
+
+    response = app.post('/api/analyze', data=_upload(3), content_type='multipart/form-data')
+    assert response.status_code == 202
+    job = response.get_json()
+    assert response.headers['Location'].endswith(job['status_url'])
+
+    for _ in range(100):
+        status = app.get(job['status_url']).get_json()
+        if status['status'] == 'complete':
+            break
+        time.sleep(0.01)
+    assert status['completed'] == 3
+    assert status['images_per_second'] > 0
+
+    result = app.get(job['result_url'])
+    assert result.status_code == 200
+    assert [r['filename'] for r in result.get_json()['results']] == ['frame0.jpg', 'frame1.jpg', 'frame2.jpg']
+
+    page = app.get(status['results_url'] + '?per_page=2').get_json()
+    assert page['total'] == 3
+    assert page['pages'] == 2
+
+def test_api_job_unknown(app):
+    """Test that unknown job IDs return 404."""
+    assert app.get('/api/jobs/missing').status_code == 404
+    assert app.get('/api/jobs/missing/result').status_code == 404
+
+def test_api_analyze_sync_mode(app, monkeypatch):
+    """Test that sync=true analyzes small batches within the request and rejects large ones."""
+    monkeypatch.setattr(routes, 'process_image_batch', _fake_process_image_batch)
+
+    response = app.post('/api/analyze?sync=true', data=_upload(2), content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert len(response.get_json()['results']) == 2
+
+    app.application.config['API_SYNC_MAX_IMAGES'] = 1
+    response = app.post('/api/analyze?sync=true', data=_upload(2), content_type='multipart/form-data')
+    assert response.status_code == 400
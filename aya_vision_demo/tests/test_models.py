@@ -0,0 +1,66 @@
+import base64
+import json
+from types import SimpleNamespace
+from app.models import ModelResponse, DetectionRecord, EnhancedRecord, ResultSet
+
+def test_model_response_keeps_only_text_id_and_usage():
+    """Test that ModelResponse extracts billed token usage from an SDK usage object."""
+    usage = SimpleNamespace(billed_units=SimpleNamespace(input_tokens=812.0, output_tokens=3.0))
+    response = ModelResponse.from_usage('true', 'resp-1', usage)
+
+    assert response.to_dict() == {'id': 'resp-1', 'text': 'true', 'input_tokens': 812, 'output_tokens': 3}
+    assert ModelResponse.from_usage('true', None, None).input_tokens is None
+
+def test_detection_record_encodes_images_on_access():
+    """Test that DetectionRecord stores raw bytes and exposes base64 views."""
+    record = DetectionRecord(
+        filename='flare.jpg',
+        image_data=b'image-bytes',
+        mime_type='image/jpeg',
+        thumbnail_data=b'thumb',
+        detection_result=True,
+        success=True,
+        model_response=ModelResponse('true', 'resp-1')
+    )
+
+    assert not hasattr(record, '__dict__')
+    assert base64.b64decode(record.full_image) == b'image-bytes'
+    assert base64.b64decode(record.thumbnail) == b'thumb'
+    assert record.response_text == 'true'
+    assert record.storage_bytes == len(b'image-bytes') + len(b'thumb')
+    assert 'full_image' not in record.to_dict(include_images=False)
+    json.dumps(record.to_dict())
+
+def test_enhanced_record_references_source():
+    """Test that EnhancedRecord reads image attributes through to its source record."""
+    source = DetectionRecord(filename='flare.jpg', image_data=b'image-bytes', mime_type='image/jpeg',
+                             detection_result=True, success=True)
+    record = EnhancedRecord(source=source, enhanced_analysis='A tall flame.', success=True)
+
+    assert record.filename == 'flare.jpg'
+    assert record.id == source.id
+    assert record.image_data is source.image_data
+    assert record.detection_result is True
+    assert record.to_dict()['enhanced_analysis'] == 'A tall flame.'
+
+def test_result_set_maintains_counts():
+    """Test that ResultSet keeps its counters in step with adds and removes by ID."""
+    records = [
+        DetectionRecord(filename='a.jpg', detection_result=True, success=True),
+        DetectionRecord(filename='b.jpg', detection_result=False, success=True),
+        DetectionRecord(filename='c.jpg', error='cannot identify image file')
+    ]
+    results = ResultSet(records)
+
+    assert results.counts == {'all': 3, 'detected': 1, 'not-detected': 1, 'unknown': 1, 'error': 1, 'skipped': 0}
+    assert [r.filename for r in results] == ['a.jpg', 'b.jpg', 'c.jpg']
+
+    removed = results.remove([records[2].id, 'missing'])
+    assert removed == [records[2]]
+    assert records[2].id not in results
+    assert results.counts == {'all': 2, 'detected': 1, 'not-detected': 1, 'unknown': 0, 'error': 0, 'skipped': 0}
+
+    results.add(DetectionRecord(id=records[0].id, filename='a.jpg', detection_result=False, success=True))
+    assert len(results) == 2
+    assert results.counts['detected'] == 0
+    assert results.counts['not-detected'] == 2
@@ -0,0 +1,70 @@
+from app.models import DetectionRecord, ResultSet
+from app.pagination import ResultIndex, parse_page_args
+
+def _batch():
+    """Build a batch covering every detection state, an error and unmeasured latency."""
+    return ResultSet([
+        DetectionRecord(id='0', filename='c.jpg', detection_result=True, success=True, latency=0.9),
+        DetectionRecord(id='1', filename='A.jpg', detection_result=False, success=True, latency=0.2),
+        DetectionRecord(id='2', filename='b.jpg', detection_result=None, success=True, latency=0.5),
+        DetectionRecord(id='3', filename='d.jpg', detection_result=True, success=True, latency=0.1),
+        DetectionRecord(id='4', filename='broken.jpg', error='cannot identify image file')
+    ])
+
+def test_result_index_order():
+    """Test that filters and sorts combine, with unmeasured latencies sorted last."""
+    index = ResultIndex(_batch())
+
+    assert index.order('all', 'filename-asc') == ['1', '2', '4', '0', '3']
+    assert index.order('all', 'filename-desc') == ['3', '0', '4', '2', '1']
+    assert index.order('detected', 'latency-asc') == ['3', '0']
+    assert index.order('all', 'latency-asc') == ['3', '1', '2', '0', '4']
+    assert index.order('all', 'status-desc') == ['3', '0', '4', '2', '1']
+    assert index.order('error', 'filename-asc') == ['4']
+
+def test_result_index_page():
+    """Test that pages are sliced from the order and clamped to the last page."""
+    index = ResultIndex(_batch())
+
+    page = index.page('all', 'filename-asc', page=2, per_page=2)
+    assert page == {'ids': ['4', '0'], 'page': 2, 'per_page': 2, 'offset': 2, 'next_offset': 4, 'total': 5, 'pages': 3}
+
+    page = index.page('all', 'filename-asc', page=99, per_page=2)
+    assert page['page'] == 3
+    assert page['ids'] == ['3']
+
+    page = index.page('not-detected', 'filename-asc', page=1, per_page=10)
+    assert page['pages'] == 1
+    assert page['ids'] == ['1']
+
+def test_result_index_discard():
+    """Test that discarded IDs drop out of every order without a rebuild."""
+    results = _batch()
+    index = ResultIndex(results)
+    index.order('detected', 'filename-asc')
+
+    for record in results.remove(['0', '1']):
+        index.discard(record.id)
+
+    assert index.size == 3
+    assert index.order('detected', 'filename-asc') == ['3']
+    assert index.order('all', 'latency-desc') == ['4', '2', '3']
+
+def test_parse_page_args():
+    """Test that invalid paging parameters fall back to defaults and page sizes are capped."""
+    args = parse_page_args({'filter': 'bogus', 'sort': 'latency-desc', 'page': 'x', 'per_page': '500'}, 24, 200)
+    assert args == {'filter': 'all', 'sort': 'latency-desc', 'page': 1, 'per_page': 200, 'offset': None}
+
+    args = parse_page_args({}, 24, 200, defaults={'filter': 'error', 'sort': 'status-asc'})
+    assert args == {'filter': 'error', 'sort': 'status-asc', 'page': 1, 'per_page': 24, 'offset': None}
+
+def test_page_by_offset():
+    """Test that an offset overrides the page number and reports where the next page starts."""
+    index = ResultIndex(ResultSet([DetectionRecord(id=str(i), filename=f'{i}.jpg', success=True) for i in range(5)]))
+
+    page = index.page('all', 'filename-asc', page=1, per_page=2, offset=3)
+    assert page['ids'] == ['3', '4']
+    assert page['page'] == 2
+    assert page['next_offset'] is None
+    assert index.page('all', 'filename-asc', page=1, per_page=2)['next_offset'] == 2
+    assert parse_page_args({'offset': '7'}, 24, 200)['offset'] == 7
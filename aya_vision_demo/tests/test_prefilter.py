@@ -0,0 +1,49 @@
+import io
+import pytest
+from PIL import Image
+from app import utils
+from app.prefilter import PREFILTERS, flame_colour_score, load_scorer, score_image
+
+def _jpeg(colour, patch=None):
+    """A 400x300 JPEG of one colour with an optional 40x40 patch of another in the middle."""
+    image = Image.new('RGB', (400, 300), colour)
+    if patch:
+        image.paste(patch, (180, 130, 220, 170))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+def test_flame_colour_score():
+    """Test that flame-coloured pixels raise the score and daylight scenes score near zero."""
+    sky = _jpeg((135, 170, 220))
+    assert score_image(flame_colour_score, sky) == 0
+    assert score_image(flame_colour_score, _jpeg((135, 170, 220), patch=(255, 140, 20))) > 0.01
+
+def test_load_scorer():
+    """Test that scorers resolve by built-in name or module:function path."""
+    assert load_scorer('bright-spot') is PREFILTERS['bright-spot']
+    assert load_scorer('app.prefilter:flame_colour_score') is flame_colour_score
+    with pytest.raises(ValueError):
+        load_scorer('no-such-filter')
+
+def test_process_image_batch_skips_prefiltered_images(monkeypatch):
+    """Test that images below the threshold are marked negative without an API call."""
+    calls = []
+
+    def fake_analyze(api_key, base64_image, mime_type, model_name, prompt, **kwargs):
+        calls.append(prompt)
+        return {'success': True, 'response': 'true'}
+
+    monkeypatch.setattr(utils, 'analyze_image_with_cohere', fake_analyze)
+    images = [
+        {'filename': 'day.jpg', 'data': _jpeg((135, 170, 220))},
+        {'filename': 'flare.jpg', 'data': _jpeg((20, 20, 30), patch=(255, 140, 20))}
+    ]
+
+    day, flare = utils.process_image_batch(images, 'key', 'model', 'prompt',
+                                           prefilter=flame_colour_score, prefilter_threshold=0.001)
+
+    assert len(calls) == 1
+    assert day.skipped and day.success and day.detection_result is False
+    assert day.thumbnail_data
+    assert not flare.skipped and flare.detection_result is True
@@ -0,0 +1,96 @@
+import io
+import pstats
+import time
+import pytest
+from app import profiling, utils
+from app.profiling import Profiler, profiler
+from app.scheduler import FairScheduler
+
+def function_names(path):
+    return {name for _, _, name in pstats.Stats(str(path)).stats}
+
+def enable_profiling(app, monkeypatch, directory, token='secret'):
+    """Reconfigure the test app to profile requests sending X-Profile."""
+    for attribute in ('mode', 'directory', 'keep', 'token'):
+        monkeypatch.setattr(profiler, attribute, getattr(profiler, attribute))
+    app.application.config.update(PROFILING_MODE='header', PROFILING_DIR=str(directory), PROFILING_TOKEN=token)
+    profiling.init_app(app.application)
+
+def test_profile_includes_scheduler_workers_and_ring_is_bounded(tmp_path):
+    """Test that work handed to scheduler workers is in the profile, and only the newest profiles are kept."""
+    ring = Profiler(mode='header', directory=str(tmp_path), keep=2)
+    scheduler = FairScheduler(max_workers=2)
+
+    def slow_model_call(index):
+        time.sleep(0.01)
+        return index
+
+    assert not ring.job_requested()
+    with ring.profile('job', 'process_image_batch-1'):
+        assert ring.job_requested()
+        assert [future.result(5) for future in [scheduler.submit(slow_model_call, i) for i in range(2)]] == [0, 1]
+    assert not ring.job_requested()
+
+    [entry] = ring.list()
+    assert entry['kind'] == 'job' and entry['label'] == 'process_image_batch-1'
+    assert 'slow_model_call' in function_names(ring.path(entry['name']))
+
+    for label in ('second', 'third/with spaces'):
+        with ring.profile('request', label):
+            pass
+    assert [entry['label'] for entry in ring.list()] == ['third_with_spaces', 'second']
+    assert len(list(tmp_path.iterdir())) == 2
+    assert ring.path('../secret.prof') is None
+
+def test_profiling_is_off_by_default(app):
+    """Test that no profiling hooks are installed and the admin endpoints are hidden unless enabled."""
+    hooks = app.application.before_request_funcs.get(None, [])
+    assert 'start_request_profile' not in {hook.__name__ for hook in hooks}
+    assert app.get('/admin/profiles').status_code == 404
+
+def test_profiling_requires_a_token(app, monkeypatch, tmp_path):
+    """Test that profiling cannot be enabled without a token, and a profiler without one grants no access."""
+    with pytest.raises(ValueError):
+        enable_profiling(app, monkeypatch, tmp_path, token='')
+
+    monkeypatch.setattr(profiler, 'mode', 'header')
+    assert not profiler.authorized('')
+    assert app.get('/admin/profiles').status_code == 403
+    assert app.get('/admin/profiles?token=').status_code == 403
+
+def test_header_gated_request_and_job_profiles(app, monkeypatch, tmp_path):
+    """Test that a request sending X-Profile, and the job it submits, are profiled and downloadable."""
+    enable_profiling(app, monkeypatch, tmp_path)
+    monkeypatch.setattr(utils, 'classify_image', lambda *args, **options: {
+        'success': True, 'detection_result': True, 'latency': 0.0, 'prefilter_score': None
+    })
+    monkeypatch.setattr(utils, 'create_thumbnail_bytes', lambda data: b'')
+    monkeypatch.setattr(utils, 'get_image_mime_type', lambda data: 'image/jpeg')
+
+    app.get('/settings')
+    app.get('/settings', headers={'X-Profile': 'wrong'})
+    assert not list(tmp_path.iterdir())
+
+    upload = {'images': [(io.BytesIO(b'fake-image'), 'frame.jpg')]}
+    job = app.post('/api/analyze', data=upload, content_type='multipart/form-data',
+                   headers={'X-Profile': 'secret'}).get_json()
+    for _ in range(100):
+        if app.get(job['status_url']).get_json()['status'] == 'complete':
+            break
+        time.sleep(0.05)
+    time.sleep(0.05)
+
+    assert app.get('/admin/profiles').status_code == 403
+    listing = app.get('/admin/profiles', headers={'X-Profile-Token': 'secret'}).get_json()
+    profiles = {entry['kind']: entry for entry in listing['profiles']}
+    assert profiles['request']['label'] == 'main.api_analyze'
+    assert profiles['job']['label'] == f"process_image_batch_background-{job['job_id'][:8]}"
+    assert 'process_image_batch' in function_names(tmp_path / profiles['job']['name'])
+
+    download = app.get(profiles['job']['url'] + '?token=secret')
+    assert download.status_code == 200
+    assert 'attachment' in download.headers['Content-Disposition']
+    download.close()
+    report = app.get(profiles['request']['url'] + '?token=secret&format=text')
+    assert b'cumulative' in report.data
+    assert app.get('/admin/profiles/missing.prof?token=secret').status_code == 404
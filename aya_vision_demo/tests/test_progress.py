@@ -0,0 +1,79 @@
+import threading
+from app.progress import DONE, PENDING, RUNNING, JobProgress, progress_snapshot
+
+def test_out_of_order_completion_counts_finished_images():
+    """Test that images finishing out of order advance progress monotonically and reach 100% only at the end."""
+    progress = JobProgress(total=4, publish_every=100, publish_interval=3600)
+    percents = []
+    for index in (3, 0, 3, 2):
+        progress.start_image(index)
+        progress.finish_image(index, f'img{index}.jpg')
+        percents.append(progress.snapshot()['percent'])
+
+    # The repeated report of image 3 is counted once
+    assert percents == [25, 50, 50, 75]
+    assert list(progress.states) == [DONE, PENDING, DONE, DONE]
+
+    progress(1, 'img1.jpg')
+    snapshot = progress.snapshot()
+    assert snapshot['completed'] == 4
+    assert snapshot['percent'] == 100
+    assert snapshot['current_file'] == 'img1.jpg'
+    assert snapshot['eta_seconds'] == 0
+
+def test_counters_are_published_in_batches():
+    """Test that the dict fields lag until a batch of images is done, while snapshots are current."""
+    progress = JobProgress(total=10, publish_every=3, publish_interval=3600, result_id='r')
+    progress.finish_image(0)
+    progress.finish_image(1)
+    assert progress['completed'] == 0
+    assert progress.snapshot()['completed'] == 2
+    assert progress_snapshot(progress)['result_id'] == 'r'
+
+    progress.finish_image(2)
+    assert progress['completed'] == 3
+
+def test_throughput_latency_and_eta():
+    """Test that timed images produce images/sec, a rolling latency and an ETA."""
+    progress = JobProgress(total=3)
+    progress.start_image(0)
+    progress.start_image(1)
+    assert progress.snapshot()['running'] == 2
+    assert list(progress.states[:2]) == [RUNNING, RUNNING]
+
+    progress.finish_image(0)
+    snapshot = progress.snapshot()
+    assert snapshot['running'] == 1
+    assert snapshot['images_per_second'] > 0
+    assert snapshot['latency'] is not None
+    assert snapshot['eta_seconds'] is not None
+
+def test_concurrent_workers():
+    """Test that counts stay exact when many threads report at once."""
+    progress = JobProgress(total=800, publish_every=1)
+
+    def worker(offset):
+        for index in range(offset, 800, 8):
+            progress.start_image(index)
+            progress.finish_image(index)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert progress['completed'] == 800
+    assert progress['running'] == 0
+    assert progress.states.count(DONE) == 800
+
+def test_set_status_publishes_fields_and_counters():
+    """Test that a status change sets its fields and republishes the lagging counters."""
+    progress = JobProgress(total=10, publish_every=100, publish_interval=3600)
+    progress.finish_image(0)
+    assert progress['completed'] == 0
+
+    progress.set_status('error', error='timeout')
+    assert progress['status'] == 'error'
+    assert progress['error'] == 'timeout'
+    assert progress['completed'] == 1
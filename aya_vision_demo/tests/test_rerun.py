@@ -0,0 +1,99 @@
+import time
+from app import routes
+from app.models import DetectionRecord, ResultSet
+from app.pagination import ResultIndex
+from app.rerun import forget_images, rerun_batch
+
+class FakeClassifier:
+    """Re-classifies records as positive when their filename contains the word, counting calls."""
+
+    def __init__(self, word):
+        self.word = word
+        self.classified = []
+
+    def __call__(self, records):
+        self.classified.extend(r.filename for r in records)
+        return [DetectionRecord(id=r.id, filename=r.filename, image_data=r.image_data,
+                                detection_result=self.word in r.filename, success=True) for r in records]
+
+def _batch():
+    results = ResultSet([
+        DetectionRecord(filename='flare-1.jpg', image_data=b'1', detection_result=True, success=True),
+        DetectionRecord(filename='smoke-2.jpg', image_data=b'2', detection_result=False, success=True),
+        DetectionRecord(filename='flare-3.jpg', image_data=b'3', detection_result=False, success=True)
+    ])
+    return {'results': results, 'index': ResultIndex(results), 'subject': 'Flare', 'prompt': 'flare?', 'model': 'm'}
+
+def test_rerun_batch_only_classifies_uncomputed_pairs():
+    """Test that a re-run reports flipped detections and switching back to a prompt costs no calls."""
+    batch = _batch()
+
+    smoke = FakeClassifier('smoke')
+    summary = rerun_batch(batch, 'm', 'smoke?', 'Smoke', smoke)
+    assert smoke.classified == ['flare-1.jpg', 'smoke-2.jpg', 'flare-3.jpg']
+    assert [(c['filename'], c['before'], c['after']) for c in summary['changed']] == [
+        ('flare-1.jpg', True, False), ('smoke-2.jpg', False, True)
+    ]
+    assert batch['results'].counts['detected'] == 1
+    assert batch['subject'] == 'Smoke'
+
+    # The original prompt's results were cached when the batch was first re-run
+    again = FakeClassifier('flare')
+    summary = rerun_batch(batch, 'm', 'flare?', 'Flare', again)
+    assert again.classified == []
+    assert summary['reused'] == 3
+    assert [r.detection_result for r in batch['results']] == [True, False, False]
+
+def test_rerun_retries_failed_classifications():
+    """Test that a re-run under the same prompt retries images whose classification failed."""
+    batch = _batch()
+
+    class FlakyClassifier(FakeClassifier):
+        def __call__(self, records):
+            classified = super().__call__(records)
+            for record in classified:
+                if record.filename == 'smoke-2.jpg':
+                    record.success, record.detection_result, record.error = False, None, 'timeout'
+            return classified
+
+    rerun_batch(batch, 'm', 'smoke?', 'Smoke', FlakyClassifier('smoke'))
+    assert batch['results'].counts['error'] == 1
+
+    retry = FakeClassifier('smoke')
+    summary = rerun_batch(batch, 'm', 'smoke?', 'Smoke', retry)
+    assert retry.classified == ['smoke-2.jpg']
+    assert summary['reused'] == 2
+    assert [(c['filename'], c['before'], c['after']) for c in summary['changed']] == [('smoke-2.jpg', None, True)]
+    assert all(record.success for record in batch['results'])
+
+def test_deleted_images_are_not_rerun():
+    """Test that images deleted from a batch drop out of the cached runs too."""
+    batch = _batch()
+    rerun_batch(batch, 'm', 'smoke?', 'Smoke', FakeClassifier('smoke'))
+    deleted = batch['results'].snapshot()[0].id
+    batch['results'].remove([deleted])
+    forget_images(batch, [deleted])
+
+    classifier = FakeClassifier('flare')
+    rerun_batch(batch, 'm', 'other?', 'Flare', classifier)
+    assert classifier.classified == ['smoke-2.jpg', 'flare-3.jpg']
+
+def test_api_rerun_results(app, monkeypatch):
+    """Test that the re-run endpoint runs as a job and reports the flipped detections."""
+    monkeypatch.setattr(routes, 'reclassify_records', lambda records, **kwargs: FakeClassifier('smoke')(records))
+    routes.results_storage['rerun-batch'] = _batch()
+
+    response = app.post('/api/results/rerun-batch/rerun', json={'prompt': 'smoke?', 'subject': 'Smoke'})
+    assert response.status_code == 202
+    job = response.get_json()
+
+    for _ in range(100):
+        status = app.get(job['status_url']).get_json()
+        if status['status'] == 'complete':
+            break
+        time.sleep(0.01)
+    assert len(status['rerun']['changed']) == 2
+
+    page = app.get('/api/results/rerun-batch?filter=detected').get_json()
+    assert [r['filename'] for r in page['results']] == ['smoke-2.jpg']
+    assert app.post('/api/results/missing/rerun').status_code == 404
@@ -0,0 +1,77 @@
+import threading
+from app.admission import AdmissionController
+from app.progress import JobProgress
+from app.scheduler import FairScheduler
+
+def _hold_worker(scheduler):
+    """Occupy the scheduler's only worker until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+    scheduler.submit(lambda: (started.set(), release.wait(5)), flow='hold')
+    started.wait(5)
+    return release
+
+def test_flows_are_served_in_turn():
+    """Test that a small batch is interleaved with a large one queued before it."""
+    scheduler = FairScheduler(max_workers=1)
+    release = _hold_worker(scheduler)
+    order = []
+    futures = [scheduler.submit(order.append, f'big{i}', flow='big') for i in range(5)]
+    futures += [scheduler.submit(order.append, f'small{i}', flow='small') for i in range(2)]
+    release.set()
+    for future in futures:
+        future.result(5)
+
+    assert order == ['big0', 'small0', 'big1', 'small1', 'big2', 'big3', 'big4']
+    stats = scheduler.stats()
+    assert stats['queued'] == 0
+    assert stats['completed'] == 8
+
+def test_costly_calls_use_up_more_of_a_turn():
+    """Test that deficit round robin shares credit, not call counts, between flows."""
+    scheduler = FairScheduler(max_workers=1, quantum=2)
+    release = _hold_worker(scheduler)
+    order = []
+    futures = [scheduler.submit(order.append, f'heavy{i}', flow='heavy', cost=2) for i in range(2)]
+    futures += [scheduler.submit(order.append, f'light{i}', flow='light') for i in range(4)]
+    release.set()
+    for future in futures:
+        future.result(5)
+
+    assert order == ['heavy0', 'light0', 'light1', 'heavy1', 'light2', 'light3']
+
+def test_cancelled_calls_are_dropped():
+    """Test that a call cancelled while queued never runs."""
+    scheduler = FairScheduler(max_workers=1)
+    release = _hold_worker(scheduler)
+    calls = []
+    dropped = scheduler.submit(calls.append, 'dropped')
+    kept = scheduler.submit(calls.append, 'kept')
+    assert dropped.cancel()
+    release.set()
+    kept.result(5)
+
+    assert calls == ['kept']
+
+def test_queued_batches_of_idle_clients_start_first():
+    """Test that admission starts the queued batch of a client with nothing running before another of a busy client."""
+    admission = AdmissionController(max_running_jobs=1)
+    release = threading.Event()
+    started = []
+
+    def job(name):
+        started.append(name)
+        release.wait(5)
+
+    progress = {name: JobProgress(total=1) for name in ('a1', 'a2', 'b1')}
+    admission.submit('a1', progress['a1'], 1, job, ('a1',), flow='a')
+    admission.submit('a2', progress['a2'], 1, job, ('a2',), flow='a')
+    admission.submit('b1', progress['b1'], 1, job, ('b1',), flow='b')
+    assert progress['b1']['queue_position'] == 1
+    assert progress['a2']['queue_position'] == 2
+
+    release.set()
+    for _ in range(100):
+        if len(started) == 3:
+            break
+        threading.Event().wait(0.05)
+    assert started == ['a1', 'b1', 'a2']
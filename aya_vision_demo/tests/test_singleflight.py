@@ -0,0 +1,100 @@
+import threading
+import time
+from types import SimpleNamespace
+from app import utils
+from app.singleflight import SingleFlight
+
+def test_concurrent_identical_calls_share_one_call():
+    """Test that callers arriving while a call is in flight get its result, and later callers call again."""
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow_call():
+        calls.append(1)
+        release.wait(5)
+        return {'response': 'true'}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', slow_call))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()['shared'] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    # Every caller gets its own copy of the result
+    assert len({id(result) for result, _ in results}) == 4
+
+    flight.do('key', lambda: {'response': 'false'})
+    assert flight.stats() == {'calls': 2, 'shared': 3, 'in_flight': 0}
+
+def test_errors_are_shared_too():
+    """Test that waiting callers receive the exception of the call they waited on."""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def failing_call():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('quota exceeded')
+
+    def caller():
+        try:
+            flight.do('key', failing_call)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=caller)
+    follower.start()
+    while flight.stats()['shared'] < 1:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert errors == ['quota exceeded', 'quota exceeded']
+
+def test_duplicate_images_in_a_batch_call_the_api_once(monkeypatch):
+    """Test that the same image twice in one batch makes a single Cohere request."""
+    release = threading.Event()
+    requests = []
+
+    class FakeClient:
+        def chat(self, **kwargs):
+            requests.append(kwargs)
+            release.wait(5)
+            usage = SimpleNamespace(billed_units=SimpleNamespace(input_tokens=10, output_tokens=1))
+            return SimpleNamespace(id='resp-1', usage=usage,
+                                   message=SimpleNamespace(content=[SimpleNamespace(text='true')]))
+
+    monkeypatch.setattr(utils, 'setup_client', lambda: FakeClient())
+    monkeypatch.setattr(utils, 'model_calls', SingleFlight())
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            utils.analyze_image_with_cohere('key', 'aW1hZ2U=', 'image/jpeg', 'model', 'Is there a flare?')
+        ))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    while utils.model_calls.stats()['shared'] < 1:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(requests) == 1
+    assert [result['response'] for result in results] == ['true', 'true']
+    assert sum(result.get('shared', False) for result in results) == 1
@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time allowed for the app package, in milliseconds. Generous so
+# that slow CI machines pass; a heavy module imported eagerly again blows well past it.
+IMPORT_TIME_BUDGET_MS = float(os.environ.get('IMPORT_TIME_BUDGET_MS', '1500'))
+
+def _import_times():
+    """Create the app in a fresh interpreter and return {module: cumulative microseconds}."""
+    env = dict(os.environ, FLASK_CONFIG='testing')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'from app import create_app; create_app()'],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+def test_startup_skips_heavy_imports():
+    """Creating the app neither imports the Cohere SDK nor Pillow, and stays within the time budget."""
+    times = _import_times()
+
+    assert 'app.routes' in times
+    assert not [name for name in times if name == 'cohere' or name.startswith('cohere.')]
+    assert 'PIL.Image' not in times
+    assert times['app'] / 1000 < IMPORT_TIME_BUDGET_MS
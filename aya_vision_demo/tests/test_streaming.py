@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+from app import utils
+from app.models import DetectionRecord
+
+def _delta(text):
+    """Build a fake content-delta stream event."""
+    return SimpleNamespace(
+        type='content-delta',
+        delta=SimpleNamespace(message=SimpleNamespace(content=SimpleNamespace(text=text)))
+    )
+
+class FakeStreamingClient:
+    """Minimal stand-in for cohere.ClientV2 that streams canned chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = []
+
+    def chat_stream(self, **kwargs):
+        self.calls.append(kwargs)
+        yield SimpleNamespace(type='message-start', id='resp-1')
+        for chunk in self.chunks:
+            yield _delta(chunk)
+        usage = SimpleNamespace(billed_units=SimpleNamespace(input_tokens=10, output_tokens=len(self.chunks)))
+        yield SimpleNamespace(type='message-end', delta=SimpleNamespace(usage=usage))
+
+def test_stream_image_analysis_reports_partial_text(monkeypatch):
+    """Test that streamed chunks are accumulated and reported as they arrive."""
+    client = FakeStreamingClient(['A flare ', 'is burning', '.'])
+    monkeypatch.setattr(utils, 'setup_client', lambda: client)
+
+    partials = []
+    result = utils.stream_image_analysis_with_cohere(
+        api_key='test-key',
+        base64_image='aGVsbG8=',
+        mime_type='image/jpeg',
+        model_name='test-model',
+        prompt='Describe the image',
+        delta_callback=partials.append,
+        max_tokens=64
+    )
+
+    assert result['success'] is True
+    assert result['response'] == 'A flare is burning.'
+    assert partials == ['A flare ', 'A flare is burning', 'A flare is burning.']
+    assert client.calls[0]['max_tokens'] == 64
+    assert result['model_response'].id == 'resp-1'
+    assert result['model_response'].output_tokens == 3
+
+def test_process_enhanced_analysis_streams_per_image(monkeypatch):
+    """Test that enhanced analysis pushes partial text per image index."""
+    monkeypatch.setattr(utils, 'setup_client', lambda: FakeStreamingClient(['Hot ', 'flame']))
+
+    images = [
+        DetectionRecord(filename=f'img{i}.jpg', image_data=b'hello', mime_type='image/jpeg',
+                        detection_result=True, success=True)
+        for i in range(3)
+    ]
+    partials = {}
+    results = utils.process_enhanced_analysis(
+        images=images,
+        api_key='test-key',
+        model_name='test-model',
+        prompt='Describe the image',
+        partial_callback=lambda index, text: partials.__setitem__(index, text),
+        max_workers=2
+    )
+
+    assert [r.enhanced_analysis for r in results] == ['Hot flame'] * 3
+    assert all(r.source is image for r, image in zip(results, images))
+    assert partials == {0: 'Hot flame', 1: 'Hot flame', 2: 'Hot flame'}
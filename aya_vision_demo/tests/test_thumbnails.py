@@ -0,0 +1,75 @@
+import io
+from PIL import Image
+from app import routes, thumbnails
+from app.models import DetectionRecord, ResultSet
+from app.utils import create_thumbnail_bytes
+
+def _photo(size=(1200, 900)):
+    """A noisy gradient, closer to a photo than a flat colour."""
+    image = Image.effect_noise(size, 40).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+def test_thumbnail_is_smaller_than_png_and_declares_its_encoding():
+    """Test that thumbnails are encoded compactly and the record reports the actual MIME type."""
+    data = _photo()
+    thumb = create_thumbnail_bytes(data)
+
+    png = io.BytesIO()
+    Image.open(io.BytesIO(data)).resize((300, 225)).save(png, format='PNG')
+    assert len(thumb) < len(png.getvalue())
+
+    record = DetectionRecord(filename='a.jpg', image_data=data, thumbnail_data=thumb)
+    assert record.thumbnail_mime_type == thumbnails.THUMBNAIL_FORMATS[thumbnails.thumbnail_format()][1]
+    assert max(Image.open(io.BytesIO(thumb)).size) == 300
+
+def test_jpeg_thumbnails_are_progressive_and_flatten_alpha():
+    """Test the progressive JPEG encoding used when WebP is unavailable."""
+    image = Image.new('RGBA', (640, 480), (255, 0, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+
+    thumb = Image.open(io.BytesIO(thumbnails.encode_thumbnail(buffer.getvalue(), 100, 'jpeg')))
+    assert thumb.format == 'JPEG'
+    assert thumb.info.get('progressive') or thumb.info.get('progression')
+    assert thumb.getpixel((0, 0)) == (255, 255, 255)
+
+def test_thumbnail_route_uses_content_hash_cache(app):
+    """Test that the thumbnail endpoint encodes an image once and honours its ETag."""
+    data = _photo((800, 600))
+    record = DetectionRecord(filename='a.jpg', image_data=data)
+    routes.results_storage['thumb-batch'] = {'results': ResultSet([record])}
+    thumbnails.cache.clear()
+    misses = thumbnails.cache.misses
+
+    response = app.get(f'/thumbnails/thumb-batch/{record.id}')
+    assert response.status_code == 200
+    assert response.mimetype == thumbnails.THUMBNAIL_FORMATS[thumbnails.thumbnail_format()][1]
+    assert app.get(f'/thumbnails/thumb-batch/{record.id}').data == response.data
+    assert thumbnails.cache.misses == misses + 1
+
+    cached = app.get(f'/thumbnails/thumb-batch/{record.id}', headers={'If-None-Match': response.headers['ETag']})
+    assert cached.status_code == 304
+    assert app.get(f'/thumbnails/thumb-batch/{record.id}?size=17').status_code == 400
+    assert app.get('/thumbnails/thumb-batch/missing').status_code == 404
+
+def test_gallery_loads_images_by_url(app):
+    """Test that the results page links images instead of inlining them, and the API pages by offset."""
+    data = _photo((400, 300))
+    records = [DetectionRecord(filename=f'{i}.jpg', image_data=data, mime_type='image/jpeg',
+                               detection_result=True, success=True) for i in range(3)]
+    routes.results_storage['gallery-batch'] = {'results': ResultSet(records), 'subject': 'Flare'}
+    with app.session_transaction() as session:
+        session['result_id'] = 'gallery-batch'
+
+    page = app.get('/results?per_page=2').get_data(as_text=True)
+    assert f'data-src="/thumbnails/gallery-batch/{records[0].id}"' in page
+    assert 'base64,/9j/' not in page
+
+    more = app.get('/api/results/gallery-batch?per_page=2&offset=2').get_json()
+    assert [r['filename'] for r in more['results']] == ['2.jpg']
+    assert more['next_offset'] is None
+    image = app.get(more['results'][0]['image_url'])
+    assert image.data == data
+    assert image.mimetype == 'image/jpeg'
@@ -0,0 +1,127 @@
+import base64
+import io
+import threading
+import time
+from PIL import Image
+from app import utils
+from app.scheduler import FairScheduler
+
+def _image(width, height, marker=None):
+    """A black PNG with an optional white square at marker (x, y)."""
+    image = Image.new('RGB', (width, height))
+    if marker:
+        image.paste((255, 255, 255), (marker[0], marker[1], marker[0] + 8, marker[1] + 8))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def test_split_into_tiles_covers_image_with_overlap():
+    """Test that tiles overlap, stay inside the image and end flush with its edges."""
+    tiles = utils.split_into_tiles(_image(1000, 600), tile_size=400, overlap=0.25)
+    boxes = [box for box, _ in tiles]
+
+    assert boxes[0] == (0, 0, 400, 400)
+    assert boxes[-1] == (600, 200, 1000, 600)
+    assert {box[0] for box in boxes} == {0, 300, 600}
+    assert {box[1] for box in boxes} == {0, 200}
+    assert Image.open(io.BytesIO(tiles[1][1])).size == (400, 400)
+
+    assert len(utils.split_into_tiles(_image(300, 200), tile_size=400)) == 1
+
+def _fake_analyze(calls, release):
+    """Stand-in for analyze_image_with_cohere that is positive for tiles containing a bright pixel.
+
+    Every call after the first waits for release, so the test controls what is in flight.
+    """
+    lock = threading.Lock()
+
+    def analyze(api_key, base64_image, mime_type, model_name, prompt, **kwargs):
+        tile = Image.open(io.BytesIO(base64.b64decode(base64_image))).convert('L')
+        with lock:
+            calls.append(tile.size)
+            first = len(calls) == 1
+        if not first:
+            release.wait(5)
+        return {'success': True, 'response': 'true' if tile.getextrema()[1] > 0 else 'false'}
+
+    return analyze
+
+def test_analyze_image_tiled_stops_at_first_positive(monkeypatch):
+    """Test that the matching tile is reported and tiles queued behind it are never sent."""
+    calls = []
+    release = threading.Event()
+    monkeypatch.setattr(utils, 'analyze_image_with_cohere', _fake_analyze(calls, release))
+
+    result = utils.analyze_image_tiled('key', _image(1600, 400, marker=(100, 100)), 'image/png', 'model', 'prompt',
+                                       tile_size=400, overlap=0.0, max_workers=1)
+    release.set()
+    assert result['detection_result'] is True
+    assert result['tile'] == {'index': 0, 'box': [0, 0, 400, 400], 'tiles': 4, 'analyzed': 1}
+    # At most the next tile was already in flight; the rest were cancelled
+    assert len(calls) <= 2
+
+def test_analyze_image_tiled_negative_needs_every_tile(monkeypatch):
+    """Test that an image is only negative once every tile has been analyzed."""
+    calls = []
+    release = threading.Event()
+    release.set()
+    monkeypatch.setattr(utils, 'analyze_image_with_cohere', _fake_analyze(calls, release))
+
+    result = utils.analyze_image_tiled('key', _image(1200, 400), 'image/png', 'model', 'prompt',
+                                       tile_size=400, overlap=0.0, max_workers=2)
+    assert result['detection_result'] is False
+    assert result['tile'] == {'index': None, 'box': None, 'tiles': 3, 'analyzed': 3}
+    assert len(calls) == 3
+
+def test_tiles_share_the_scheduler_workers(monkeypatch):
+    """Test that tiles of images already holding every worker still finish, within MODEL_CONCURRENCY calls."""
+    monkeypatch.setattr(utils, 'model_scheduler', FairScheduler(max_workers=2))
+    monkeypatch.setattr(utils, 'create_thumbnail_bytes', lambda data: b'')
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def analyze(api_key, base64_image, mime_type, model_name, prompt, **kwargs):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return {'success': True, 'response': 'false'}
+
+    monkeypatch.setattr(utils, 'analyze_image_with_cohere', analyze)
+    images = [{'filename': f'wide{i}.png', 'data': _image(1200, 400)} for i in range(4)]
+    results = utils.process_image_batch(images, 'key', 'model', 'prompt', max_workers=4,
+                                        tile_size=400, tile_overlap=0.0, tile_workers=3)
+
+    assert [result.tile['analyzed'] for result in results] == [3, 3, 3, 3]
+    assert in_flight[1] <= 2
+
+def test_tiles_run_in_the_flow_of_their_image(monkeypatch):
+    """Test that tiles submitted from a scheduler worker are queued and run in their image's flow."""
+    scheduler = FairScheduler(max_workers=2)
+    monkeypatch.setattr(utils, 'model_scheduler', scheduler)
+    monkeypatch.setattr(utils, 'create_thumbnail_bytes', lambda data: b'')
+    lock = threading.Lock()
+    flows = []
+
+    def analyze(api_key, base64_image, mime_type, model_name, prompt, **kwargs):
+        with lock:
+            flows.append(scheduler.current_flow())
+        time.sleep(0.01)
+        return {'success': True, 'response': 'false'}
+
+    monkeypatch.setattr(utils, 'analyze_image_with_cohere', analyze)
+
+    def client(key, width):
+        with scheduler.flow(key):
+            utils.process_image_batch([{'filename': f'{key}.png', 'data': _image(width, 400)}], 'key', 'model',
+                                      'prompt', max_workers=1, tile_size=400, tile_overlap=0.0, tile_workers=3)
+
+    threads = [threading.Thread(target=client, args=args) for args in (('a', 1200), ('b', 800))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(flows) == ['a'] * 3 + ['b'] * 2
@@ -0,0 +1,109 @@
+import io
+import json
+import time
+from app import routes, utils
+from app.scheduler import FairScheduler
+from app.tracing import Tracer, critical_path, otlp_trace_id, waterfall
+
+JOB_ID = '6f1c2a52-5d55-4f5e-9a39-1f0f3b7d9c11'
+
+def test_spans_follow_work_onto_workers_and_export_as_otlp(tmp_path):
+    """Test that spans nest across scheduler workers and a finished trace is appended as OTLP/JSON."""
+    tracer = Tracer(path=str(tmp_path / 'traces.jsonl'))
+    scheduler = FairScheduler(max_workers=2)
+
+    def analyze(index):
+        with tracer.span('image', **{'image.index': index}):
+            with tracer.span('cohere.chat', attempt=1):
+                pass
+
+    started = time.time_ns()
+    with tracer.trace(JOB_ID, 'process_image_batch_background'):
+        tracer.record('admission.queued', started)
+        with tracer.span('process_image_batch'):
+            for future in [scheduler.submit(analyze, index) for index in range(2)]:
+                future.result(5)
+
+    spans = {span['span_id']: span for span in tracer.spans(JOB_ID)}
+    names = sorted(span['name'] for span in spans.values())
+    assert names == ['admission.queued', 'cohere.chat', 'cohere.chat', 'image', 'image',
+                     'process_image_batch', 'process_image_batch_background']
+    for span in spans.values():
+        if span['name'] == 'cohere.chat':
+            assert spans[span['parent_id']]['name'] == 'image'
+        if span['name'] == 'image':
+            assert spans[span['parent_id']]['name'] == 'process_image_batch'
+
+    lines = (tmp_path / 'traces.jsonl').read_text().splitlines()
+    assert len(lines) == 1
+    exported = json.loads(lines[0])['resourceSpans'][0]['scopeSpans'][0]['spans']
+    assert len(exported) == 7
+    assert {span['traceId'] for span in exported} == {otlp_trace_id(JOB_ID)} == {JOB_ID.replace('-', '')}
+
+def test_errors_waterfall_and_summary():
+    """Test that a failed stage is marked, and the waterfall lists children under their parents."""
+    tracer = Tracer()
+    try:
+        with tracer.trace('job', 'root'):
+            with tracer.span('first'):
+                pass
+            with tracer.span('second'):
+                raise RuntimeError('timeout')
+    except RuntimeError:
+        pass
+
+    rows = waterfall(tracer.spans('job'))
+    assert [(row['name'], row['depth']) for row in rows] == [('root', 0), ('first', 1), ('second', 1)]
+    assert rows[2]['error'] == 'RuntimeError: timeout'
+    assert all(0 <= row['left_percent'] <= 100 for row in rows)
+
+    summary = critical_path(tracer.spans('job'))
+    assert summary['stages'][0]['name'] == 'root'
+    assert summary['slowest_image'] is None
+
+def test_disabled_tracer_records_nothing():
+    """Test that a disabled tracer keeps no spans."""
+    tracer = Tracer(enabled=False)
+    with tracer.trace('job', 'root') as root:
+        with tracer.span('stage') as span:
+            tracer.record('queued', time.time_ns())
+    assert root is None and span is None
+    assert tracer.spans('job') is None
+
+def test_job_trace_endpoints(app, monkeypatch):
+    """Test that an analysis job's trace runs from the request to each image and is shown as a waterfall."""
+    def classify(*args, **options):
+        utils.usage_ledger.record(40, 2, request_bytes=1000, response_bytes=10)
+        return {'success': True, 'detection_result': True, 'latency': 0.0, 'prefilter_score': None}
+
+    monkeypatch.setattr(utils, 'classify_image', classify)
+    monkeypatch.setattr(utils, 'create_thumbnail_bytes', lambda data: b'')
+    monkeypatch.setattr(utils, 'get_image_mime_type', lambda data: 'image/jpeg')
+
+    upload = {'images': [(io.BytesIO(b'fake-image'), f'frame{i}.jpg') for i in range(2)]}
+    job = app.post('/api/analyze', data=upload, content_type='multipart/form-data').get_json()
+    for _ in range(100):
+        if app.get(job['status_url']).get_json()['status'] == 'complete':
+            break
+        time.sleep(0.05)
+    time.sleep(0.05)
+
+    trace = app.get(f"/api/jobs/{job['job_id']}/trace").get_json()
+    names = {span['name'] for span in trace['spans']}
+    assert {'routes.api_analyze', 'admission.queued', 'process_image_batch_background',
+            'process_image_batch', 'scheduler.queued', 'image', 'thumbnail', 'store_results'} <= names
+    images = [span for span in trace['spans'] if span['name'] == 'image']
+    assert sorted(span['attributes']['image.filename'] for span in images) == ['frame0.jpg', 'frame1.jpg']
+    assert all(span['attributes']['image.id'] for span in images)
+
+    page = app.get(f"/jobs/{job['job_id']}/trace")
+    assert page.status_code == 200
+    assert b'waterfall-bar' in page.data
+    assert app.get('/api/jobs/missing/trace').status_code == 404
+
+    # The results page opened by result ID shows the batch's usage and links its trace
+    result_id = routes.analysis_progress[job['job_id']]['result_id']
+    results = app.get(f'/analysis-results/{result_id}')
+    assert results.status_code == 200
+    assert b'Model usage: 2 calls,\n80 input and 4 output tokens' in results.data
+    assert f"/jobs/{job['job_id']}/trace".encode() in results.data
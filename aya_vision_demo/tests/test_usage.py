@@ -0,0 +1,99 @@
+import datetime
+import threading
+import time
+from types import SimpleNamespace
+from app import routes, utils
+from app.progress import JobProgress
+from app.scheduler import FairScheduler
+from app.singleflight import SingleFlight
+from app.usage import UsageLedger, usage_scope
+
+class FakeClient:
+    """Answers every chat request with 'true' once released, billing 120 input and 1 output token."""
+
+    def __init__(self, release):
+        self.release = release
+        self.requests = []
+
+    def chat(self, **kwargs):
+        self.requests.append(kwargs)
+        self.release.wait(5)
+        usage = SimpleNamespace(billed_units=SimpleNamespace(input_tokens=120, output_tokens=1))
+        return SimpleNamespace(id='resp-1', usage=usage,
+                               message=SimpleNamespace(content=[SimpleNamespace(text='true')]))
+
+def test_usage_is_totalled_per_batch_session_and_day():
+    """Test that a call is charged to the batch and session of its scope, and to the day."""
+    ledger = UsageLedger()
+    with usage_scope('job-1', 'session:a'):
+        ledger.record(100, 2, request_bytes=5000, response_bytes=4)
+        ledger.record(request_bytes=5000, error=True)
+    with usage_scope('job-2', 'session:a'):
+        ledger.record(50, 1, request_bytes=2000, response_bytes=5)
+    ledger.record(10, 1)
+
+    assert ledger.batch('job-1') == {
+        'calls': 2, 'errors': 1, 'input_tokens': 100, 'output_tokens': 2,
+        'request_bytes': 10000, 'response_bytes': 4
+    }
+    assert ledger.session('session:a')['input_tokens'] == 150
+    assert ledger.batch('missing')['calls'] == 0
+
+    stats = ledger.stats()
+    assert stats['total']['calls'] == 4
+    assert stats['today'] == stats['days'][datetime.date.today().isoformat()] == stats['total']
+
+def test_scope_follows_calls_onto_scheduler_workers():
+    """Test that calls run by the scheduler's workers are charged to the submitter's scope."""
+    ledger = UsageLedger()
+    scheduler = FairScheduler(max_workers=2)
+    with usage_scope('job-1', 'session:a'):
+        futures = [scheduler.submit(ledger.record, 10, 1) for _ in range(3)]
+    for future in futures:
+        future.result(5)
+
+    assert ledger.batch('job-1')['calls'] == 3
+    assert ledger.session('session:a')['input_tokens'] == 30
+
+def test_batch_usage_counts_shared_results_once(monkeypatch):
+    """Test that a duplicate image answered by single-flight adds no tokens or bytes to the batch."""
+    release = threading.Event()
+    client = FakeClient(release)
+    ledger = UsageLedger()
+    monkeypatch.setattr(utils, 'setup_client', lambda: client)
+    monkeypatch.setattr(utils, 'model_calls', SingleFlight())
+    monkeypatch.setattr(utils, 'usage_ledger', ledger)
+
+    results = []
+
+    def analyze():
+        with usage_scope('job-1', 'session:a'):
+            results.append(utils.analyze_image_with_cohere('key', 'aW1hZ2U=', 'image/jpeg', 'model', 'Is there a flare?'))
+
+    threads = [threading.Thread(target=analyze) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    while utils.model_calls.stats()['shared'] < 1:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert sum(result.get('shared', False) for result in results) == 1
+    usage = ledger.batch('job-1')
+    assert usage['calls'] == len(client.requests) == 1
+    assert usage['input_tokens'] == 120
+    assert usage['request_bytes'] == len('data:image/jpeg;base64,aW1hZ2U=') + len('Is there a flare?')
+
+def test_usage_on_job_status_and_metrics(app):
+    """Test that job status and /api/metrics report usage."""
+    with usage_scope('job-usage', 'addr:127.0.0.1'):
+        utils.usage_ledger.record(40, 2, request_bytes=1000, response_bytes=10)
+    routes.analysis_progress['job-usage'] = JobProgress(total=1, result_id='r')
+
+    status = app.get('/api/jobs/job-usage').get_json()
+    assert status['usage']['input_tokens'] == 40
+
+    usage = app.get('/api/metrics').get_json()['usage']
+    assert usage['total']['calls'] >= 1
+    assert usage['session']['input_tokens'] >= 40
@@ -0,0 +1,50 @@
+import io
+import time
+from PIL import Image
+from app import routes
+from app.video import format_timestamp, select_scene_changes
+from tests.test_jobs import _fake_process_image_batch
+
+def _frame(shade):
+    return Image.new('RGB', (64, 48), (shade, shade, shade))
+
+def test_format_timestamp():
+    """Test that timestamps are zero-padded so frame filenames sort in time order."""
+    assert format_timestamp(0) == '00:00:00.000'
+    assert format_timestamp(83.5) == '00:01:23.500'
+    assert format_timestamp(3 * 3600 + 7.25) == '03:00:07.250'
+
+def test_select_scene_changes_skips_static_frames():
+    """Test that unchanged frames are dropped and slow drift is caught against the last kept frame."""
+    shades = [100, 101, 102, 120, 121, 126, 132]
+    frames = [(float(t), _frame(shade)) for t, shade in enumerate(shades)]
+    stats = {}
+
+    kept = list(select_scene_changes(frames, threshold=10 / 255, stats=stats))
+
+    assert [t for t, _ in kept] == [0.0, 3.0, 6.0]
+    assert stats == {'sampled': 7, 'kept': 3}
+
+    stats = {}
+    kept = list(select_scene_changes(frames, threshold=10 / 255, max_frames=2, stats=stats))
+    assert len(kept) == 2
+    assert stats['truncated'] is True
+
+def test_undecodable_video_becomes_failed_result(app, monkeypatch):
+    """Test that a video that cannot be decoded fails on its own without failing the job."""
+    monkeypatch.setattr(routes, 'process_image_batch', _fake_process_image_batch)
+    data = {'images': [(io.BytesIO(b'not a video'), 'clip.mp4'), (io.BytesIO(b'fake-image'), 'frame.jpg')]}
+
+    assert app.post('/api/analyze?sync=true', data=data, content_type='multipart/form-data').status_code == 400
+
+    data = {'images': [(io.BytesIO(b'not a video'), 'clip.mp4'), (io.BytesIO(b'fake-image'), 'frame.jpg')]}
+    job = app.post('/api/analyze', data=data, content_type='multipart/form-data').get_json()
+    for _ in range(100):
+        status = app.get(job['status_url']).get_json()
+        if status['status'] == 'complete':
+            break
+        time.sleep(0.01)
+
+    assert status['total'] == 2
+    assert status['videos'][0]['filename'] == 'clip.mp4'
+    assert 'error' in status['videos'][0]
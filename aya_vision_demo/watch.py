@@ -0,0 +1,46 @@
+import argparse
+import logging
+import os
+from app import create_app
+from app.ingest import create_watcher
+
+def main():
+    """Watch directories for new images and analyze them in micro-batches."""
+    parser = argparse.ArgumentParser(description='Continuously analyze images dropped into watched directories.')
+    parser.add_argument('directories', nargs='*', help='Directories to watch (default: WATCH_DIRS)')
+    parser.add_argument('--batch-size', type=int, help='Files per micro-batch (default: WATCH_BATCH_SIZE)')
+    parser.add_argument('--window', type=float, help='Seconds to wait before sending a partial batch (default: WATCH_BATCH_WINDOW)')
+    parser.add_argument('--ledger', help='Path of the processed-files ledger (default: WATCH_LEDGER)')
+    parser.add_argument('--serve', action='store_true', help='Also serve the web app so ingested batches can be browsed')
+    args = parser.parse_args()
+
+    app = create_app()
+    if args.directories:
+        app.config['WATCH_DIRS'] = args.directories
+    if args.batch_size:
+        app.config['WATCH_BATCH_SIZE'] = args.batch_size
+    if args.window is not None:
+        app.config['WATCH_BATCH_WINDOW'] = args.window
+    if args.ledger:
+        app.config['WATCH_LEDGER'] = args.ledger
+
+    if not app.config['WATCH_DIRS']:
+        parser.error('No directories to watch. Pass them as arguments or set WATCH_DIRS.')
+
+    watcher = create_watcher(app)
+
+    if args.serve:
+        # Results live in this process's result store, so serve them from here
+        watcher.start()
+        port = int(os.environ.get('PORT', 5001))
+        app.run(host='0.0.0.0', port=port, use_reloader=False)
+        watcher.stop()
+        return
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        logging.getLogger('app.ingest').info('Stopping directory watcher')
+
+if __name__ == '__main__':
+    main()